@@ -1,18 +1,72 @@
-from fastapi import APIRouter, HTTPException, Depends
+import asyncio
+import base64
+import json
+from fastapi import APIRouter, HTTPException, Depends, Header, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
+from sqlalchemy import and_, or_, select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from datetime import datetime, date
-from app.schemas.sms import SMSIngest, SMSResponse, QueryRequest, QueryResponse, DigestResponse
-from app.core.database import get_db
+from typing import List, Optional, Tuple
+from datetime import datetime, date, timedelta
+from app.schemas.sms import SMSIngest, SMSResponse, QueryRequest, QueryResponse, DigestResponse, SearchResponse, SenderReputationResponse, TemplateGroup, EntityResponse, SpendRow, SyncResponse
+from app.core.config import settings
+from app.core.database import get_db, serialized_write
+from app.core.metrics import metrics
 from app.models.sms_model import SMS
+from app.services import bulk_ingest, digest_store, entities, sync_log, templates
 from app.services.sms_processor import sms_processor
+from app.services.digest_summarizer import digest_summarizer
+from app.services.event_bus import OVERFLOW, event_bus
+from app.services.ingest_queue import ingest_queue
 from app.services.llm_client import llm_client
+from app.services.read_cache import read_cache, render_json, render_rows
+from app.services.retrieval import retrieval_index
+from app.services.sender_reputation import sender_reputation
+from app.services.search import search_messages
 
 router = APIRouter()
 
+# Handlers that only do blocking SQL are plain `def` so FastAPI runs them in
+# its threadpool instead of on the event loop.
+
+def _find_duplicate(db: Session, sms: SMS) -> Optional[SMS]:
+    """Stored message sharing the new message's message_id or content hash"""
+    if sms.message_id:
+        return db.query(SMS).filter(SMS.message_id == sms.message_id).first()
+    if sms.content_hash:
+        return db.query(SMS).filter(SMS.content_hash == sms.content_hash).first()
+    return None
+
 @router.post("/sms", response_model=dict, status_code=200)
-async def ingest_sms(payload: SMSIngest, db: Session = Depends(get_db)):
-    """Receive and process incoming SMS from forwarder"""
+async def ingest_sms(payload: SMSIngest, response: Response, db: Session = Depends(get_db)):
+    """Receive and process incoming SMS from forwarder
+    
+    In queued mode the message is acknowledged with 202 and written by the
+    background batch writer; a full queue answers 503 so the forwarder
+    backs off and retries.
+    """
+    if ingest_queue.enabled:
+        # Hash what the forwarder sent, so its retries dedupe like direct writes
+        digest = None if payload.message_id else bulk_ingest.content_hash(
+            payload.sender, payload.body, payload.timestamp
+        )
+        # Stamp at receipt, not when the batch is written
+        queued = payload.model_copy(update={"timestamp": payload.timestamp or datetime.utcnow()})
+        if not ingest_queue.submit(queued, digest):
+            raise HTTPException(
+                status_code=503,
+                detail="Ingest queue is full, retry later",
+                headers={"Retry-After": "1"}
+            )
+        response.status_code = 202
+        return {"status": "queued", "queue_depth": ingest_queue.depth}
+    
+    return await run_in_threadpool(_store_sms, payload, db)
+
+def _store_sms(payload: SMSIngest, db: Session) -> dict:
+    """Classify and persist one message in its own transaction"""
     try:
         # Process message
         processed = sms_processor.process_message(
@@ -32,12 +86,40 @@ async def ingest_sms(payload: SMSIngest, db: Session = Depends(get_db)):
             urls=processed['urls'],
             has_money_request=processed['has_money_request'],
             has_otp=processed['has_otp'],
-            message_id=payload.message_id
+            message_id=payload.message_id,
+            content_hash=None if payload.message_id else bulk_ingest.content_hash(
+                payload.sender, payload.body, payload.timestamp
+            ),
+            template_id=processed['template_id']
         )
         
-        db.add(sms)
-        db.commit()
+        try:
+            with serialized_write(db.get_bind()), metrics.stage('db_commit'):
+                db.add(sms)
+                digest_store.record(db, [processed])
+                sender_reputation.record(db, [processed])
+                db.flush()
+                entities.record(db, [{**processed, 'id': sms.id}])
+                sync_log.record_inserted(db, [sms.id])
+                db.commit()
+        except IntegrityError:
+            # Forwarder retry or re-import of a message we already have
+            db.rollback()
+            existing = _find_duplicate(db, sms)
+            if existing is None:
+                raise
+            return {
+                "status": "duplicate",
+                "message_id": existing.id,
+                "category": existing.category,
+                "is_threat": existing.is_threat
+            }
         db.refresh(sms)
+        sender_reputation.refresh(db, [processed])
+        read_cache.bump_rows([processed])
+        retrieval_index.add(sms.id, sms.sender, sms.body, sms.timestamp)
+        event_bus.publish_ingested([SMSResponse.model_validate(sms).model_dump()])
+        digest_summarizer.schedule_rows([processed])
         
         return {
             "status": "success",
@@ -50,46 +132,270 @@ async def ingest_sms(payload: SMSIngest, db: Session = Depends(get_db)):
         db.rollback()
         raise HTTPException(status_code=500, detail=f"Error processing SMS: {str(e)}")
 
+# Columns a /messages caller may project with ?fields=
+MESSAGE_FIELDS = list(SMSResponse.model_fields)
+
+def _encode_cursor(timestamp: datetime, sms_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{timestamp.isoformat()}|{sms_id}".encode()).decode()
+
+def _decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    try:
+        timestamp, sms_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(sms_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+    if not fields:
+        return None
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in MESSAGE_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    # id is always returned so rows stay addressable
+    return ["id"] + [f for f in requested if f != "id"]
+
 @router.get("/messages", response_model=List[SMSResponse])
-async def get_messages(
+def get_messages(
+    request: Request,
     date_filter: Optional[str] = None,
     category: Optional[str] = None,
     threats_only: bool = False,
+    limit: Optional[int] = Query(None, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    fields: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
-    """Get filtered SMS messages"""
+    """Get filtered SMS messages
+    
+    With `limit`, results are paged by (timestamp, id); pass the
+    X-Next-Cursor response header back as `cursor` for the next page.
+    `fields` is a comma-separated projection (e.g. id,sender,timestamp).
+    Responses carry an ETag and are served from the read cache until
+    the next write.
+    """
+    after = _decode_cursor(cursor) if cursor else None
+    projection = _parse_fields(fields)
     try:
-        query = db.query(SMS)
+        target_date = datetime.strptime(date_filter, "%Y-%m-%d").date() if date_filter else None
+    except ValueError as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
+    
+    def build():
+        try:
+            # Plain result tuples rendered straight to JSON: no ORM objects
+            # or per-row SMSResponse validation (see read_cache.render_rows)
+            columns = projection or MESSAGE_FIELDS
+            query = select(*[getattr(SMS, f) for f in columns])
+            if "timestamp" not in columns:
+                # Ordering columns are needed to build the next cursor
+                query = query.add_columns(SMS.timestamp.label("_cursor_ts"))
+            
+            # Filter by date
+            if target_date:
+                # Use datetime range for portability across backends
+                start_datetime = datetime.combine(target_date, datetime.min.time())
+                end_datetime = datetime.combine(target_date, datetime.max.time())
+                query = query.where(
+                    SMS.timestamp >= start_datetime,
+                    SMS.timestamp <= end_datetime
+                )
+            
+            # Filter by category
+            if category:
+                query = query.where(SMS.category == category)
+            
+            # Filter threats
+            if threats_only:
+                query = query.where(SMS.is_threat == True)
+            
+            # Resume after the last row of the previous page
+            if after:
+                after_timestamp, after_id = after
+                query = query.where(or_(
+                    SMS.timestamp < after_timestamp,
+                    and_(SMS.timestamp == after_timestamp, SMS.id < after_id)
+                ))
+            
+            # Order by timestamp descending (id breaks ties for stable pages)
+            query = query.order_by(SMS.timestamp.desc(), SMS.id.desc())
+            if limit:
+                query = query.limit(limit)
+            rows = db.execute(query).all()
+            
+            headers = {}
+            if limit and len(rows) == limit:
+                last = rows[-1]
+                last_timestamp = last.timestamp if "timestamp" in columns else last._cursor_ts
+                headers["X-Next-Cursor"] = _encode_cursor(last_timestamp, last.id)
+            
+            return render_rows(columns, rows), headers
         
-        # Filter by date
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
+    
+    return read_cache.serve(request, build, day=target_date)
+
+@router.delete("/messages/{sms_id}", response_model=dict)
+def delete_message(sms_id: int, db: Session = Depends(get_db)):
+    """Delete one message; synced clients receive a tombstone for it"""
+    sms = db.get(SMS, sms_id)
+    if sms is None:
+        raise HTTPException(status_code=404, detail="Message not found")
+    row = {
+        'sender': sms.sender, 'timestamp': sms.timestamp, 'category': sms.category, 'is_threat': sms.is_threat,
+        'threat_reason': sms.threat_reason, 'urls': sms.urls,
+    }
+    body = sms.body
+    
+    try:
+        with serialized_write(db.get_bind()), metrics.stage('db_commit'):
+            db.delete(sms)
+            digest_store.record(db, [row], sign=-1)
+            sender_reputation.record(db, [row], sign=-1)
+            entities.forget(db, [sms_id])
+            sync_log.record_deleted(db, [sms_id])
+            db.commit()
+    except Exception as e:
+        db.rollback()
+        raise HTTPException(status_code=500, detail=f"Error deleting message: {str(e)}")
+    
+    sender_reputation.reload(db, [row['sender']])
+    read_cache.bump_rows([row])
+    retrieval_index.remove(sms_id, row['sender'] or "", body or "")
+    digest_summarizer.schedule_rows([row])
+    return {"status": "deleted", "message_id": sms_id}
+
+@router.get("/sync", response_model=SyncResponse)
+def sync(
+    since: int = Query(0, ge=0),
+    limit: int = Query(500, ge=1, le=5000),
+    db: Session = Depends(get_db)
+):
+    """Changes after a sync cursor, for clients that keep a local copy
+    
+    Start with since=0, store the returned `cursor` and send it next
+    time; repeat while `has_more`. `deleted` lists ids to drop locally and
+    `reset` means the cursor is unknown, so start over from 0.
+    """
+    try:
+        return sync_log.changes_since(db, since, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching changes: {str(e)}")
+
+@router.get("/search", response_model=SearchResponse)
+def search(
+    q: str,
+    sender: Optional[str] = None,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Full-text search over message bodies and senders"""
+    try:
+        start_datetime = None
+        end_datetime = None
+        if date_from:
+            start_datetime = datetime.combine(datetime.strptime(date_from, "%Y-%m-%d").date(), datetime.min.time())
+        if date_to:
+            end_datetime = datetime.combine(datetime.strptime(date_to, "%Y-%m-%d").date(), datetime.max.time())
+        
+        page = search_messages(db, q, sender, start_datetime, end_datetime, limit, offset)
+        
+        return {
+            "query": q,
+            "results": page["results"],
+            "limit": limit,
+            "offset": offset,
+            "has_more": page["has_more"]
+        }
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error searching messages: {str(e)}")
+
+@router.get("/senders", response_model=List[SenderReputationResponse])
+def list_senders(
+    sort: str = Query("count", pattern="^(count|threats|last_seen)$"),
+    limit: int = Query(50, ge=1, le=500),
+    offset: int = Query(0, ge=0),
+    db: Session = Depends(get_db)
+):
+    """Sender reputations: message counts, category mix, threat rate, first/last seen"""
+    try:
+        return sender_reputation.list_senders(db, sort, limit, offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching senders: {str(e)}")
+
+@router.get("/senders/{sender}", response_model=SenderReputationResponse)
+def get_sender(sender: str, db: Session = Depends(get_db)):
+    """Reputation of one sender"""
+    reputation = sender_reputation.get(db, sender)
+    if reputation is None:
+        raise HTTPException(status_code=404, detail=f"Unknown sender: {sender}")
+    return reputation
+
+@router.get("/templates", response_model=List[TemplateGroup])
+def get_templates(
+    date_filter: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=200),
+    db: Session = Depends(get_db)
+):
+    """Messages grouped by body template, most frequent first ("37 HDFC debit alerts")"""
+    try:
+        start_datetime, end_datetime = None, None
         if date_filter:
             target_date = datetime.strptime(date_filter, "%Y-%m-%d").date()
-            # Use datetime range for portability across backends
             start_datetime = datetime.combine(target_date, datetime.min.time())
             end_datetime = datetime.combine(target_date, datetime.max.time())
-            query = query.filter(
-                SMS.timestamp >= start_datetime,
-                SMS.timestamp <= end_datetime
-            )
-        
-        # Filter by category
-        if category:
-            query = query.filter(SMS.category == category)
-        
-        # Filter threats
-        if threats_only:
-            query = query.filter(SMS.is_threat == True)
         
-        # Order by timestamp descending
-        messages = query.order_by(SMS.timestamp.desc()).all()
-        
-        return messages
+        return templates.group_by_template(db, start_datetime, end_datetime, category, limit)
     
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {str(e)}")
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error fetching messages: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error grouping templates: {str(e)}")
 
-@router.get("/digest", response_model=DigestResponse)
-async def get_digest(date_filter: Optional[str] = None, db: Session = Depends(get_db)):
+@router.get("/entities", response_model=List[EntityResponse])
+def get_entities(
+    kind: Optional[str] = Query(None, pattern="^(amount|account|otp|pnr|flight|merchant)$"),
+    value: Optional[str] = None,
+    date_filter: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db)
+):
+    """Extracted amounts, account suffixes, OTPs, PNR/flight numbers and merchants, newest first"""
+    try:
+        start_datetime, end_datetime = _query_window(date_filter) if date_filter else (None, None)
+        return entities.find(db, kind, value.upper() if value else None, start_datetime, end_datetime, limit)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching entities: {str(e)}")
+
+@router.get("/entities/spend", response_model=List[SpendRow])
+def get_spend(
+    date_filter: Optional[str] = None,
+    direction: str = Query("debit", pattern="^(debit|credit)$"),
+    db: Session = Depends(get_db)
+):
+    """Debited (or credited) totals per day and merchant; one day, or the last 7 days"""
+    try:
+        start_datetime, end_datetime = _query_window(date_filter)
+        return entities.spend_by_merchant(db, start_datetime, end_datetime, direction)
+    
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid date: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error aggregating spend: {str(e)}")
+
+@router.get("/digest", response_model=DigestResponse, response_model_exclude_none=True)
+def get_digest(request: Request, date_filter: Optional[str] = None, db: Session = Depends(get_db)):
     """Get daily digest of SMS messages"""
     try:
         # Default to today
@@ -97,83 +403,268 @@ async def get_digest(date_filter: Optional[str] = None, db: Session = Depends(ge
             target_date = datetime.strptime(date_filter, "%Y-%m-%d").date()
         else:
             target_date = date.today()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating digest: {str(e)}")
+    
+    def build():
+        try:
+            # Served from the daily_digest counters maintained on ingest
+            category_counts, threat_count = digest_store.get_digest_counts(db, target_date)
+            
+            # Generate digest
+            digest = sms_processor.digest_from_counts(category_counts, threat_count, target_date.strftime("%Y-%m-%d"))
+            
+            # LLM summaries computed after ingest, when available; never waits on the LLM
+            digest_summarizer.annotate(digest, target_date)
+            
+            content = DigestResponse.model_validate(digest).model_dump(mode="json", exclude_none=True)
+            return render_json(content), {}
         
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating digest: {str(e)}")
+    
+    # Keyed on the resolved day so "today" rolls over at midnight
+    return read_cache.serve(request, build, day=target_date, key=f"{request.url.path}?{target_date}")
+
+def _query_window(date_filter: Optional[str]) -> Tuple[datetime, Optional[datetime]]:
+    """Time range a query covers: the given day, or the last 7 days"""
+    if date_filter:
+        target_date = datetime.strptime(date_filter, "%Y-%m-%d").date()
         # Create start and end datetime for the target date
-        start_datetime = datetime.combine(target_date, datetime.min.time())
-        end_datetime = datetime.combine(target_date, datetime.max.time())
-        
-        # Get messages for the day using datetime range
-        messages = db.query(SMS).filter(
-            SMS.timestamp >= start_datetime,
-            SMS.timestamp <= end_datetime
-        ).all()
-        
-        # Generate digest
-        digest = sms_processor.generate_digest(messages, target_date.strftime("%Y-%m-%d"))
-        
-        return digest
+        return (
+            datetime.combine(target_date, datetime.min.time()),
+            datetime.combine(target_date, datetime.max.time())
+        )
+    # Default to last 7 days
+    return datetime.utcnow() - timedelta(days=7), None
+
+def _load_query_messages(db: Session, date_filter: Optional[str]) -> List[SMS]:
+    """Load every message in the query window"""
+    start_datetime, end_datetime = _query_window(date_filter)
+    query = db.query(SMS).filter(SMS.timestamp >= start_datetime)
+    if end_datetime is not None:
+        query = query.filter(SMS.timestamp <= end_datetime)
     
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error generating digest: {str(e)}")
+    return query.order_by(SMS.timestamp.desc()).all()
+
+def _select_query_context(db: Session, query_text: str, date_filter: Optional[str]) -> List[SMS]:
+    """Load only the messages most relevant to the query, within the token budget"""
+    retrieval_index.sync(db)
+    start_datetime, end_datetime = _query_window(date_filter)
+    ids = retrieval_index.search(
+        query_text,
+        start_datetime,
+        end_datetime,
+        limit=settings.query_context_messages,
+        token_budget=settings.query_context_tokens
+    )
+    if not ids:
+        return []
+    
+    rows = {m.id: m for m in db.query(SMS).filter(SMS.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
+
+def _entity_answer(db: Session, query_text: str, date_filter: Optional[str]) -> Optional[Tuple[str, List[int]]]:
+    """Exact answer from extracted entities (spend totals, latest PNR/flight/OTP), if the question has one"""
+    start_datetime, end_datetime = _query_window(date_filter)
+    return entities.answer_query(db, query_text, start_datetime, end_datetime)
 
 @router.post("/query", response_model=QueryResponse)
 async def query_messages(request: QueryRequest, db: Session = Depends(get_db)):
     """Answer natural language queries about messages"""
     try:
-        # Get messages (filter by date if provided)
-        query = db.query(SMS)
+        # Factual questions are answered with SQL alone, skipping the LLM
+        facts = await run_in_threadpool(_entity_answer, db, request.query, request.date)
+        if facts is not None:
+            answer, sources = facts
+            return {"answer": answer, "sources": sources}
         
-        if request.date:
-            target_date = datetime.strptime(request.date, "%Y-%m-%d").date()
-            # Create start and end datetime for the target date
-            start_datetime = datetime.combine(target_date, datetime.min.time())
-            end_datetime = datetime.combine(target_date, datetime.max.time())
-            query = query.filter(
-                SMS.timestamp >= start_datetime,
-                SMS.timestamp <= end_datetime
-            )
-        else:
-            # Default to last 7 days
-            from datetime import timedelta
-            week_ago = datetime.utcnow() - timedelta(days=7)
-            query = query.filter(SMS.timestamp >= week_ago)
+        # Blocking SQL runs in the threadpool; the LLM call is awaited
+        context = await run_in_threadpool(_select_query_context, db, request.query, request.date)
         
-        messages = query.order_by(SMS.timestamp.desc()).all()
+        async def load_window():
+            return await run_in_threadpool(_load_query_messages, db, request.date)
         
-        # Get answer from LLM or fallback
-        answer = llm_client.answer_query(request.query, messages)
+        # Get answer from LLM or fallback, with the messages it actually saw
+        answer, sources = await llm_client.answer_query(request.query, context, load_all=load_window)
         
         return {
             "answer": answer,
-            "sources": [m.id for m in messages[:5]]
+            "sources": sources
         }
     
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
 
+@router.post("/query/stream")
+async def query_messages_stream(request: QueryRequest, accept: Optional[str] = Header(None), db: Session = Depends(get_db)):
+    """Streaming /query: answer tokens are sent as the model produces them
+    
+    Server-Sent Events by default (`sources`, `start`, `delta`..., `done`);
+    with `Accept: application/x-ndjson` the same events are sent as JSON
+    lines carrying an "event" field.
+    """
+    try:
+        facts = await run_in_threadpool(_entity_answer, db, request.query, request.date)
+        context = [] if facts else await run_in_threadpool(_select_query_context, db, request.query, request.date)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing query: {str(e)}")
+    
+    async def load_window():
+        return await run_in_threadpool(_load_query_messages, db, request.date)
+    
+    async def events():
+        if facts is not None:
+            answer, sources = facts
+            yield {"event": "sources", "sources": sources}
+            yield {"event": "start", "model": None}
+            yield {"event": "delta", "text": answer}
+            yield {"event": "done", "source": "entities", "model": None, "complete": True}
+            return
+        async for event in llm_client.stream_answer(request.query, context, load_all=load_window):
+            yield event
+    
+    if accept and "application/x-ndjson" in accept:
+        async def ndjson():
+            async for event in events():
+                yield json.dumps(event) + "\n"
+        return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+    
+    async def sse():
+        async for event in events():
+            data = {k: v for k, v in event.items() if k != "event"}
+            yield f"event: {event['event']}\ndata: {json.dumps(data)}\n\n"
+    return StreamingResponse(
+        sse(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+STREAM_PARSERS = {
+    "text/csv": bulk_ingest.iter_csv_records,
+    "application/x-ndjson": bulk_ingest.iter_ndjson_records,
+    "application/ndjson": bulk_ingest.iter_ndjson_records,
+    "application/jsonl": bulk_ingest.iter_ndjson_records,
+}
+
 @router.post("/upload-csv")
-async def upload_csv(messages: List[SMSIngest], db: Session = Depends(get_db)):
-    """Bulk upload messages from CSV (fallback method)"""
+async def upload_csv(request: Request, db: Session = Depends(get_db)):
+    """Bulk upload messages from CSV (fallback method)
+    
+    Accepts a JSON array of SMSIngest objects, or a streamed text/csv or
+    NDJSON body. Rows are inserted in chunks of `upload_chunk_size`, each
+    committed separately and deduplicated on message_id/content hash.
+    """
+    content_type = request.headers.get("content-type", "application/json").split(";")[0].strip()
+    parser = STREAM_PARSERS.get(content_type)
+    
+    if parser is not None:
+        records = parser(request.stream())
+    else:
+        try:
+            payload = await request.json()
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Body must be a JSON array, CSV or NDJSON")
+        if not isinstance(payload, list):
+            raise HTTPException(status_code=400, detail="JSON body must be an array of messages")
+        
+        async def iter_payload():
+            for item in payload:
+                yield item
+        records = iter_payload()
+    
     try:
-        count = 0
-        for payload in messages:
-            processed = sms_processor.process_message(
-                sender=payload.sender,
-                body=payload.body,
-                timestamp=payload.timestamp or datetime.utcnow()
-            )
-            
-            sms = SMS(**processed)
-            db.add(sms)
-            count += 1
+        chunks = []
+        items: List[SMSIngest] = []
+        invalid = 0
         
-        db.commit()
+        async def flush():
+            result = await run_in_threadpool(bulk_ingest.ingest_chunk, db, items)
+            result["failed"] += invalid
+            chunks.append({"chunk": len(chunks), **result})
+        
+        async for record in records:
+            try:
+                items.append(SMSIngest(**record))
+            except (TypeError, ValidationError):
+                invalid += 1
+            if len(items) + invalid >= settings.upload_chunk_size:
+                await flush()
+                items, invalid = [], 0
+        if items or invalid:
+            await flush()
+        
+        accepted = sum(c["accepted"] for c in chunks)
+        failed = sum(c["failed"] for c in chunks)
         
         return {
-            "status": "success",
-            "messages_imported": count
+            "status": "success" if failed == 0 else "partial",
+            "messages_imported": accepted,
+            "duplicates": sum(c["duplicates"] for c in chunks),
+            "failed": failed,
+            "chunks": chunks
         }
     
     except Exception as e:
         db.rollback()
-        raise HTTPException(status_code=500, detail=f"Error uploading CSV: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error uploading CSV: {str(e)}")
+
+def _format_event(event) -> str:
+    return f"id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n"
+
+@router.get("/stream")
+async def stream(
+    request: Request,
+    last_event_id: Optional[int] = None,
+    last_event_id_header: Optional[str] = Header(None, alias="Last-Event-ID")
+):
+    """Server-Sent Events feed of new messages, digest deltas and threat alerts
+    
+    Reconnecting clients resume via the Last-Event-ID header (sent by
+    EventSource automatically) or the last_event_id query parameter. A
+    `reset` event means history was lost and the client should refetch.
+    """
+    if last_event_id_header and last_event_id_header.isdigit():
+        last_event_id = int(last_event_id_header)
+    queue, backlog, lost = event_bus.subscribe(last_event_id)
+    
+    async def events():
+        try:
+            yield f"retry: {settings.stream_retry_ms}\n\n"
+            if lost:
+                yield "event: reset\ndata: {}\n\n"
+            for event in backlog:
+                yield _format_event(event)
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), settings.stream_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": keep-alive\n\n"
+                    continue
+                if event is OVERFLOW:
+                    break
+                yield _format_event(event)
+        finally:
+            event_bus.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.get("/ingest/status")
+def ingest_status():
+    """Background ingest queue depth and counters"""
+    return ingest_queue.stats()
+
+@router.get("/llm/health")
+def llm_health():
+    """Per-model health, circuit state and current routing order"""
+    return {
+        "routing_order": llm_client.health.ranked(llm_client.models),
+        "models": llm_client.health.snapshot(llm_client.models),
+        "cache": llm_client.cache.stats()
+    }
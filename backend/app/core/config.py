@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Dict, Optional
 import os
 
 class Settings(BaseSettings):
@@ -12,9 +12,70 @@ class Settings(BaseSettings):
 
     # Database settings
     database_url: str = "sqlite:///./sms.db"
+    storage_profile: str = "production"  # "production" (WAL, busy_timeout, mmap) or "default" (SQLite defaults)
+    sqlite_pragmas: Dict[str, str] = {}  # Per-PRAGMA overrides, e.g. {"busy_timeout": "10000"}
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_recycle: int = 1800  # Seconds; server databases only
+
+    # Batch processing (0 or 1 keeps SMSProcessor.process_many in-process)
+    batch_process_workers: int = 0
+    upload_chunk_size: int = 1000  # Rows per transaction in /upload-csv
+
+    # Queued ingest: POST /sms returns 202 and a worker writes micro-batches
+    ingest_queue_enabled: bool = False
+    ingest_queue_maxsize: int = 10000  # Beyond this, POST /sms answers 503
+    ingest_batch_size: int = 100
+    ingest_batch_wait_ms: int = 50
 
     # LLM API Key (OpenRouter/OpenAI)
     openai_api_key: Optional[str] = None  # Also used for OpenRouter
+    llm_base_url: str = "https://openrouter.ai/api/v1/chat/completions"
+    llm_timeout: float = 30.0  # Per-request timeout in seconds
+    llm_total_budget: float = 60.0  # Upper bound for one answer_query call
+    llm_hedge_delay: Optional[float] = None  # Start the next model after this many seconds (None = sequential)
+    llm_first_token_timeout: float = 8.0  # /query/stream moves to the next model if no answer token arrives by then
+    llm_max_connections: int = 10
+    llm_circuit_failures: int = 3  # Consecutive failures before a model is skipped
+    llm_circuit_cooldown: float = 60.0  # Seconds a failing model is skipped
+    llm_rate_limit_cooldown: float = 30.0  # Seconds a 429'd model is skipped (unless Retry-After says otherwise)
+    llm_cache_ttl: float = 300.0  # Seconds a cached LLM answer/summary stays valid
+    llm_cache_max_entries: int = 512
+    llm_cache_max_bytes: int = 2 * 1024 * 1024
+    llm_cache_path: Optional[str] = None  # SQLite file to persist the cache across restarts
+
+    # /query context selection
+    query_context_messages: int = 20  # Max messages sent to the LLM
+    query_context_tokens: int = 1500  # Approximate prompt token budget for message context
+    llm_context_tokens: int = 1000  # Context budget for models without their own (see LLMClient.context_budgets)
+    llm_summary_context_tokens: int = 300  # Context budget for category summaries
+
+    # Digest summaries (one batched LLM call per day, computed after ingest)
+    digest_summaries_enabled: bool = True  # Only takes effect when an LLM key is configured
+    digest_summary_delay: float = 5.0  # Seconds to wait after ingest so a burst shares one request
+    digest_summary_samples: int = 8  # Recent messages per category sent to the LLM
+    digest_summary_cache_size: int = 1000  # (date, category) summaries kept in memory
+
+    # Read response cache (/messages, /digest, /): pre-serialized bodies, ETag/Last-Modified and 304s
+    read_cache_enabled: bool = True
+    read_cache_max_entries: int = 256
+    read_cache_max_bytes: int = 16 * 1024 * 1024  # Total body bytes kept; a larger single body is served uncached
+
+    # Body templates
+    template_cache_size: int = 50000  # Memoized analyses, one per masked body template
+
+    # Sender reputation
+    sender_cache_size: int = 10000  # Senders kept in the in-memory LRU
+    sender_trust_min_messages: int = 20  # History needed before reputation affects threat scoring (0 disables)
+    sender_trust_max_threat_rate: float = 0.0  # Senders with enough history whose share of messages flagged for shorteners, money requests or phishing is at or below this are trusted (plain links and sender-ID pattern stop counting)
+
+    # Live stream (SSE)
+    stream_keepalive_seconds: float = 15.0
+    stream_retry_ms: int = 3000  # Client reconnect delay advertised to EventSource
+
+    # Metrics (/metrics); when disabled, latency and stage timers are skipped
+    metrics_enabled: bool = True
 
     # Ngrok URL (for forwarder configuration)
     ngrok_url: Optional[str] = None
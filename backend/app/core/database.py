@@ -1,20 +1,145 @@
-from sqlalchemy import create_engine
+import threading
+from contextlib import nullcontext
+from typing import Dict
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 from app.core.config import settings
-from app.models.sms_model import Base
+from app.core.logging import logger
+from app.models.sms_model import Base, SMS
+
+# PRAGMAs applied to every new SQLite connection, per storage profile
+STORAGE_PROFILES: Dict[str, Dict[str, object]] = {
+    # SQLite defaults: rollback journal, writers block readers
+    "default": {},
+    # WAL lets readers run alongside the single writer; NORMAL sync is safe under WAL
+    "production": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": 5000,
+        "mmap_size": 268435456,
+        "cache_size": -65536,
+        "temp_store": "MEMORY",
+    },
+}
+
+def sqlite_pragmas() -> Dict[str, object]:
+    """Effective PRAGMAs: the selected profile plus explicit overrides"""
+    if settings.storage_profile not in STORAGE_PROFILES:
+        raise ValueError(f"Unknown storage_profile '{settings.storage_profile}'")
+    return {**STORAGE_PROFILES[settings.storage_profile], **settings.sqlite_pragmas}
+
+def build_engine(database_url: str) -> Engine:
+    """Create an engine with the configured pool and, for SQLite, PRAGMAs"""
+    url = make_url(database_url)
+    if url.get_backend_name() != "sqlite":
+        return create_engine(
+            database_url,
+            pool_size=settings.db_pool_size,
+            max_overflow=settings.db_max_overflow,
+            pool_timeout=settings.db_pool_timeout,
+            pool_recycle=settings.db_pool_recycle,
+            pool_pre_ping=True,
+        )
+    
+    kwargs = {"connect_args": {"check_same_thread": False}}
+    if url.database and url.database != ":memory:":
+        # File databases get a bounded pool of reader connections
+        kwargs.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow,
+                      pool_timeout=settings.db_pool_timeout)
+    sqlite_engine = create_engine(database_url, **kwargs)
+    pragmas = sqlite_pragmas()
+    
+    @event.listens_for(sqlite_engine, "connect")
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+    
+    return sqlite_engine
 
 # Create engine
-engine = create_engine(
-    settings.database_url, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
-)
+engine = build_engine(settings.database_url)
 
 # Create session factory
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# SQLite allows one writer at a time; serializing writers inside the process
+# avoids busy-waiting and "database is locked" errors between our own threads
+_write_lock = threading.Lock()
+
+def serialized_write(bind=None):
+    """Context manager held around write transactions (no-op for server databases)"""
+    bind = bind if bind is not None else engine
+    return _write_lock if bind.dialect.name == "sqlite" else nullcontext()
+
+def storage_report(bind=engine) -> Dict[str, object]:
+    """Effective storage settings, as reported by the database itself"""
+    report: Dict[str, object] = {"backend": bind.dialect.name, "profile": settings.storage_profile}
+    pool = bind.pool
+    report["pool"] = pool.__class__.__name__
+    if hasattr(pool, "size"):
+        report["pool_size"] = pool.size()
+    if bind.dialect.name == "sqlite":
+        with bind.connect() as conn:
+            for name in ("journal_mode", "synchronous", "busy_timeout", "mmap_size", "cache_size", "temp_store"):
+                report[name] = conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return report
+
+# FTS5 index over sms(sender, body), kept in sync by triggers (SQLite only)
+FTS_TABLE = "sms_fts"
+FTS_DDL = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(sender, body, content='sms', content_rowid='id')",
+    f"""CREATE TRIGGER IF NOT EXISTS sms_fts_ai AFTER INSERT ON sms BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, sender, body) VALUES (new.id, new.sender, new.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS sms_fts_ad AFTER DELETE ON sms BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, sender, body) VALUES ('delete', old.id, old.sender, old.body);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS sms_fts_au AFTER UPDATE OF sender, body ON sms BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, sender, body) VALUES ('delete', old.id, old.sender, old.body);
+        INSERT INTO {FTS_TABLE}(rowid, sender, body) VALUES (new.id, new.sender, new.body);
+    END""",
+]
+
+def init_search_index(bind=engine):
+    """Create the FTS5 table and triggers, backfilling existing rows on first run"""
+    if bind.dialect.name != "sqlite":
+        return
+    try:
+        with bind.begin() as conn:
+            existed = inspect(conn).has_table(FTS_TABLE)
+            for statement in FTS_DDL:
+                conn.execute(text(statement))
+            if not existed:
+                conn.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+    except OperationalError as e:
+        # SQLite builds without FTS5; /search falls back to LIKE matching
+        logger.warning(f"Full-text search unavailable: {e}")
+
+def add_missing_columns(bind=engine):
+    """Add nullable columns introduced after a table was first created"""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column['name'] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=bind.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
 # Create all tables
-def init_db():
-    Base.metadata.create_all(bind=engine)
+def init_db(bind=engine):
+    Base.metadata.create_all(bind=bind)
+    add_missing_columns(bind)
+    # create_all skips existing tables, so add indexes introduced later
+    for index in SMS.__table__.indexes:
+        index.create(bind=bind, checkfirst=True)
+    init_search_index(bind)
 
 # Dependency for routes
 def get_db():
@@ -0,0 +1,231 @@
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from app.core.config import settings
+
+# Prometheus client defaults, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Optional[Dict[str, str]]) -> LabelKey:
+    return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(key: LabelKey, extra: str = "") -> str:
+    parts = [f'{name}="{str(value)}"' for name, value in key]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+class _Histogram:
+    __slots__ = ('counts', 'sum', 'count')
+
+    def __init__(self, buckets: int):
+        self.counts = [0] * buckets
+        self.sum = 0.0
+        self.count = 0
+
+
+class MetricsRegistry:
+    """Minimal Prometheus-style registry: counters, histograms and gauge callbacks
+
+    Counters and histograms are recorded in-process; gauges are read from
+    callbacks at scrape time so queue depths and cache stats need no
+    bookkeeping on the hot path. With `enabled` off, `observe`, `inc` and
+    the `stage`/`timed` helpers return immediately.
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._help: Dict[str, Tuple[str, str]] = {}
+        self._counters: Dict[str, Dict[LabelKey, float]] = {}
+        self._histograms: Dict[str, Dict[LabelKey, _Histogram]] = {}
+        self._gauges: List[Tuple[str, str, str, Callable[[], Iterable[Tuple[Dict[str, str], float]]]]] = []
+        self._lock = threading.Lock()
+
+    def describe(self, name: str, kind: str, help_text: str):
+        self._help[name] = (kind, help_text)
+
+    def inc(self, name: str, labels: Optional[Dict[str, str]] = None, amount: float = 1.0):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + amount
+
+    def observe(self, name: str, seconds: float, labels: Optional[Dict[str, str]] = None):
+        if not self.enabled:
+            return
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._histograms.setdefault(name, {})
+            histogram = series.get(key)
+            if histogram is None:
+                histogram = series[key] = _Histogram(len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def gauge(self, name: str, help_text: str, read: Callable[[], Iterable[Tuple[Dict[str, str], float]]],
+              kind: str = 'gauge'):
+        """Register a series whose (labels, value) samples are read at scrape time
+
+        Use kind='counter' for running totals kept elsewhere (e.g. cache hits).
+        """
+        self._gauges.append((name, kind, help_text, read))
+
+    @contextmanager
+    def _timer(self, name: str, labels: Dict[str, str]):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, labels)
+
+    def stage(self, stage: str, **labels):
+        """Context manager timing one pipeline stage into stage_duration_seconds"""
+        if not self.enabled:
+            return _NOOP
+        return self._timer('stage_duration_seconds', {'stage': stage, **labels})
+
+    def timed(self, stage: str):
+        """Decorator form of `stage` for functions on the hot path"""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                started = time.perf_counter()
+                try:
+                    return fn(*args, **kwargs)
+                finally:
+                    self.observe('stage_duration_seconds', time.perf_counter() - started, {'stage': stage})
+            return wrapper
+        return decorator
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def _header(self, lines: List[str], name: str, kind: str, help_text: str = ""):
+        help_text = help_text or self._help.get(name, (kind, ""))[1]
+        if help_text:
+            lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4)"""
+        lines: List[str] = []
+        with self._lock:
+            counters = {name: dict(series) for name, series in self._counters.items()}
+            histograms = {
+                name: {key: (list(h.counts), h.sum, h.count) for key, h in series.items()}
+                for name, series in self._histograms.items()
+            }
+
+        for name, series in sorted(counters.items()):
+            self._header(lines, name, 'counter')
+            for key, value in sorted(series.items()):
+                lines.append(f"{name}{_format_labels(key)} {value:g}")
+
+        for name, series in sorted(histograms.items()):
+            self._header(lines, name, 'histogram')
+            for key, (counts, total, count) in sorted(series.items()):
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, counts):
+                    cumulative += bucket_count
+                    le = 'le="%g"' % bound
+                    lines.append(f"{name}_bucket{_format_labels(key, le)} {cumulative}")
+                le = 'le="+Inf"'
+                lines.append(f"{name}_bucket{_format_labels(key, le)} {count}")
+                lines.append(f"{name}_sum{_format_labels(key)} {total:.6f}")
+                lines.append(f"{name}_count{_format_labels(key)} {count}")
+
+        for name, kind, help_text, read in self._gauges:
+            self._header(lines, name, kind, help_text)
+            for labels, value in read():
+                lines.append(f"{name}{_format_labels(_label_key(labels))} {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+
+def route_template(scope) -> str:
+    """Route path template ("/api/v1/senders/{sender}") for a routed request
+
+    Routes on an included router may report their path relative to the
+    router prefix; the prefix is then taken from the request path.
+    """
+    route = scope.get("route")
+    path_regex = getattr(route, "path_regex", None)
+    if path_regex is None:
+        return "unmatched"
+    path = scope["path"]
+    for index, char in enumerate(path):
+        if char == "/" and path_regex.match(path[index:]):
+            return path[:index] + route.path
+    return route.path
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording http_request_duration_seconds per route template
+
+    Latency runs until the last body chunk is sent, so streaming routes
+    report their connection lifetime. Unrouted paths share one label to keep
+    cardinality bounded.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.registry.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = {"code": 500}
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.registry.observe('http_request_duration_seconds', time.perf_counter() - started, {
+                'method': scope["method"],
+                'route': route_template(scope),
+                'status': str(status["code"]),
+            })
+
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP = _NoopTimer()
+
+
+# Singleton instance
+metrics = MetricsRegistry(enabled=settings.metrics_enabled)
+metrics.describe('http_request_duration_seconds', 'histogram', "Request latency by method, route and status")
+metrics.describe('stage_duration_seconds', 'histogram', "Time spent per pipeline stage")
+metrics.describe('llm_request_duration_seconds', 'histogram', "OpenRouter call latency by model and outcome")
+metrics.describe('llm_requests_total', 'counter', "OpenRouter calls by model and outcome")
+metrics.describe('llm_tokens_total', 'counter', "Tokens reported in OpenRouter usage, by model and kind")
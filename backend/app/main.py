@@ -1,8 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.api.v1.endpoints import sms
-from app.core.database import init_db
+from app.core.database import SessionLocal, init_db, storage_report
 from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import MetricsMiddleware, metrics
+from app.services import digest_store, entities, sync_log, templates
+from app.services.digest_summarizer import digest_summarizer
+from app.services.event_bus import event_bus
+from app.services.ingest_queue import ingest_queue
+from app.services.llm_client import llm_client
+from app.services.read_cache import read_cache, render_json
+from app.services.sender_reputation import sender_reputation
+from app.services.sms_processor import sms_processor
 
 app = FastAPI(
     title=settings.app_name,
@@ -17,34 +28,119 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Last-Modified"],
 )
+app.add_middleware(MetricsMiddleware, registry=metrics)
 
 # Initialize database
 @app.on_event("startup")
 async def startup_event():
     init_db()
-    print("Database initialized")
+    logger.info("Database initialized")
+    logger.info(f"Storage settings: {storage_report()}")
+    db = SessionLocal()
+    try:
+        if digest_store.ensure_backfilled(db):
+            logger.info("Daily digest counters rebuilt from existing messages")
+        if sender_reputation.ensure_backfilled(db):
+            logger.info("Sender reputations rebuilt from existing messages")
+        logger.info(f"Loaded {sender_reputation.warm(db)} sender reputations")
+        backfilled = templates.backfill(db)
+        if backfilled:
+            logger.info(f"Fingerprinted {backfilled} existing messages")
+        scanned = entities.backfill(db)
+        if scanned:
+            logger.info(f"Extracted entities from {scanned} existing messages")
+        logged = sync_log.backfill(db)
+        if logged:
+            logger.info(f"Seeded the sync change log with {logged} existing messages")
+    finally:
+        db.close()
+    await ingest_queue.start()
+    await digest_summarizer.start()
     if settings.ngrok_url:
-        print(f"Ngrok URL: {settings.ngrok_url}")
-    print(f"Server running on {settings.host}:{settings.port}")
+        logger.info(f"Ngrok URL: {settings.ngrok_url}")
+    logger.info(f"Server running on {settings.host}:{settings.port}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Flush queued messages before the process exits
+    await ingest_queue.stop()
+    await digest_summarizer.stop()
+    await llm_client.aclose()
 
 # Include routers
 app.include_router(sms.router, prefix="/api/v1", tags=["sms"])
 
-@app.get("/")
-def read_root():
-    return {
-        "message": "Welcome to SmartSense Inbox API",
-        "version": settings.api_version,
-        "endpoints": {
-            "ingest": "POST /api/v1/sms",
-            "messages": "GET /api/v1/messages",
-            "digest": "GET /api/v1/digest",
-            "query": "POST /api/v1/query",
-            "upload": "POST /api/v1/upload-csv"
-        }
+# Static, but served through the read cache for its ETag/304 handling
+ROOT_INFO = {
+    "message": "Welcome to SmartSense Inbox API",
+    "version": settings.api_version,
+    "endpoints": {
+        "ingest": "POST /api/v1/sms",
+        "messages": "GET /api/v1/messages",
+        "sync": "GET /api/v1/sync",
+        "search": "GET /api/v1/search",
+        "senders": "GET /api/v1/senders",
+        "templates": "GET /api/v1/templates",
+        "entities": "GET /api/v1/entities",
+        "spend": "GET /api/v1/entities/spend",
+        "stream": "GET /api/v1/stream",
+        "digest": "GET /api/v1/digest",
+        "query": "POST /api/v1/query",
+        "query_stream": "POST /api/v1/query/stream",
+        "upload": "POST /api/v1/upload-csv",
+        "llm_health": "GET /api/v1/llm/health",
+        "metrics": "GET /metrics"
     }
+}
+
+@app.get("/")
+def read_root(request: Request):
+    return read_cache.serve(request, lambda: (render_json(ROOT_INFO), {}))
 
 @app.get("/health")
 def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+# Gauges read at scrape time
+metrics.gauge('ingest_queue_depth', "Messages waiting in the ingest queue",
+              lambda: [({}, ingest_queue.depth)])
+metrics.gauge('ingest_queue_capacity', "Ingest queue size limit",
+              lambda: [({}, ingest_queue.maxsize)])
+metrics.gauge('ingest_queue_messages_total', "Ingest queue totals since start by outcome",
+              lambda: [({'outcome': k}, v) for k, v in ingest_queue.stats_counters.items()], kind='counter')
+metrics.gauge('sender_reputation_cached', "Senders held in the reputation LRU",
+              lambda: [({}, len(sender_reputation))])
+metrics.gauge('template_cache_lookups_total', "Body template cache lookups by result",
+              lambda: [({'result': 'hit'}, sms_processor.templates.hits),
+                       ({'result': 'miss'}, sms_processor.templates.misses)],
+              kind='counter')
+metrics.gauge('template_cache_entries', "Body templates with a memoized analysis",
+              lambda: [({}, len(sms_processor.templates))])
+metrics.gauge('digest_summaries_cached', "Daily digest category summaries held in memory",
+              lambda: [({}, len(digest_summarizer))])
+metrics.gauge('digest_summary_requests_total', "Batched digest summary LLM requests by outcome",
+              lambda: [({'outcome': 'requested'}, digest_summarizer.stats_counters['requests']),
+                       ({'outcome': 'failed'}, digest_summarizer.stats_counters['failed'])],
+              kind='counter')
+metrics.gauge('read_cache_requests_total', "Cached read endpoint requests by result",
+              lambda: [({'result': 'hit'}, read_cache.hits), ({'result': 'miss'}, read_cache.misses),
+                       ({'result': 'not_modified'}, read_cache.not_modified)],
+              kind='counter')
+metrics.gauge('read_cache_bytes', "Pre-serialized response bytes held by the read cache",
+              lambda: [({}, read_cache.stats()['bytes'])])
+metrics.gauge('stream_subscribers', "Connected live stream clients",
+              lambda: [({}, event_bus.subscriber_count)])
+metrics.gauge('llm_cache_lookups_total', "LLM response cache lookups by result",
+              lambda: [({'result': 'hit'}, llm_client.cache.hits), ({'result': 'miss'}, llm_client.cache.misses)],
+              kind='counter')
+metrics.gauge('llm_cache_hit_ratio', "LLM response cache hit ratio",
+              lambda: [({}, llm_client.cache.stats()['hit_rate'])])
+metrics.gauge('llm_cache_bytes', "Bytes held by the LLM response cache",
+              lambda: [({}, llm_client.cache.stats()['bytes'])])
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    """Prometheus text exposition of latency histograms, stage timers and gauges"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Boolean, Float, Text, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 
@@ -6,6 +6,11 @@ Base = declarative_base()
 
 class SMS(Base):
     __tablename__ = 'sms'
+    __table_args__ = (
+        # Keyset pagination on GET /messages: ORDER BY timestamp DESC, id DESC
+        Index('ix_sms_timestamp_id', 'timestamp', 'id'),
+        Index('ix_sms_content_hash', 'content_hash', unique=True),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     sender = Column(String, index=True)
@@ -24,6 +29,70 @@ class SMS(Base):
     
     # Metadata
     message_id = Column(String, unique=True, nullable=True)
+    content_hash = Column(String, nullable=True)  # Dedup key for forwarders that send no message_id
+    template_id = Column(String, nullable=True, index=True)  # Fingerprint of the masked body (app.services.templates)
     
     def __repr__(self):
-        return f"<SMS(id={self.id}, sender='{self.sender}', category='{self.category}', is_threat={self.is_threat})>"
\ No newline at end of file
+        return f"<SMS(id={self.id}, sender='{self.sender}', category='{self.category}', is_threat={self.is_threat})>"
+
+class DailyDigest(Base):
+    """Per-day, per-category message counters maintained on ingest"""
+    __tablename__ = 'daily_digest'
+
+    date = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    threat_count = Column(Integer, nullable=False, default=0)
+
+    def __repr__(self):
+        return f"<DailyDigest(date={self.date}, category='{self.category}', count={self.count})>"
+
+class SenderStats(Base):
+    """Per-sender, per-category message counters behind the sender reputation store"""
+    __tablename__ = 'sender_stats'
+
+    sender = Column(String, primary_key=True)
+    category = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    threat_count = Column(Integer, nullable=False, default=0)
+    strong_threat_count = Column(Integer, nullable=True, default=0)  # NULL until rebuilt after upgrade
+    first_seen = Column(DateTime, nullable=False)
+    last_seen = Column(DateTime, nullable=False, index=True)
+
+    def __repr__(self):
+        return f"<SenderStats(sender='{self.sender}', category='{self.category}', count={self.count})>"
+
+class SMSEntity(Base):
+    """Structured value extracted from a message body (app.services.entities)"""
+    __tablename__ = 'sms_entities'
+    __table_args__ = (
+        Index('ix_sms_entities_kind_value', 'kind', 'value'),
+        Index('ix_sms_entities_kind_timestamp', 'kind', 'timestamp'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    sms_id = Column(Integer, nullable=False, index=True)
+    kind = Column(String, nullable=False)  # amount, account, otp, pnr, flight, merchant
+    value = Column(String, nullable=False)  # normalized text: "2500.00", "1234", "6E123", "ZOMATO"
+    amount = Column(Float, nullable=True)  # amounts only
+    currency = Column(String, nullable=True)
+    direction = Column(String, nullable=True)  # amounts: debit, credit or balance
+    valid_until = Column(DateTime, nullable=True)  # OTPs with a stated validity
+    timestamp = Column(DateTime, nullable=False)  # copy of the message timestamp for window queries
+
+    def __repr__(self):
+        return f"<SMSEntity(sms_id={self.sms_id}, kind='{self.kind}', value='{self.value}')>"
+
+class SMSChange(Base):
+    """Change log behind GET /sync: one row per inserted or deleted message"""
+    __tablename__ = 'sms_changes'
+    # AUTOINCREMENT so a compacted-away top seq is never handed out again
+    __table_args__ = {'sqlite_autoincrement': True}
+
+    seq = Column(Integer, primary_key=True)  # the sync cursor
+    sms_id = Column(Integer, nullable=False, index=True)
+    deleted = Column(Boolean, nullable=False, default=False)  # tombstone
+    changed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"<SMSChange(seq={self.seq}, sms_id={self.sms_id}, deleted={self.deleted})>"
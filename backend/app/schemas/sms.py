@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 # Request schemas
@@ -33,6 +33,7 @@ class CategoryDigest(BaseModel):
     category: str
     count: int
     summary: str
+    stale: Optional[bool] = None  # Only set for LLM summaries; True once the count has moved on
 
 class DigestResponse(BaseModel):
     date: str
@@ -42,4 +43,64 @@ class DigestResponse(BaseModel):
 
 class QueryResponse(BaseModel):
     answer: str
-    sources: Optional[List[int]] = None  # message IDs
\ No newline at end of file
+    sources: Optional[List[int]] = None  # message IDs
+
+class SearchResult(BaseModel):
+    id: int
+    sender: str
+    timestamp: datetime
+    category: Optional[str] = None
+    is_threat: bool = False
+    snippet: str
+    rank: Optional[float] = None  # bm25 score, lower is better (None without FTS)
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    limit: int
+    offset: int
+    has_more: bool
+
+class SenderReputationResponse(BaseModel):
+    sender: str
+    message_count: int
+    threat_count: int
+    threat_rate: float
+    categories: Dict[str, int]
+    first_seen: datetime
+    last_seen: datetime
+    status: str  # new, established or trusted
+
+class TemplateGroup(BaseModel):
+    template_id: str
+    count: int
+    senders: int
+    category: Optional[str] = None
+    is_threat: bool = False
+    example_sender: str
+    example: str  # most recent message using the template
+    last_seen: datetime
+
+class EntityResponse(BaseModel):
+    sms_id: int
+    sender: str
+    kind: str  # amount, account, otp, pnr, flight, merchant
+    value: str
+    amount: Optional[float] = None
+    currency: Optional[str] = None
+    direction: Optional[str] = None  # debit, credit or balance
+    valid_until: Optional[datetime] = None
+    timestamp: datetime
+
+class SpendRow(BaseModel):
+    date: str
+    merchant: str  # UNKNOWN when the message names none
+    total: float
+    count: int
+
+class SyncResponse(BaseModel):
+    cursor: int  # pass back as ?since= on the next sync
+    changes: List[SMSResponse]  # inserted since the cursor
+    deleted: List[int]  # tombstones: ids removed since the cursor
+    has_more: bool
+    reset: bool = False  # cursor unknown to the server; resync from 0
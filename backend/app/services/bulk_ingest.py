@@ -0,0 +1,168 @@
+import codecs
+import csv
+import hashlib
+import json
+from datetime import datetime
+from typing import AsyncIterator, Dict, List, Optional
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from app.core.database import serialized_write
+from app.core.metrics import metrics
+from app.models.sms_model import SMS
+from app.schemas.sms import SMSIngest, SMSResponse
+from app.services import digest_store, entities, sync_log
+from app.services.digest_summarizer import digest_summarizer
+from app.services.event_bus import event_bus
+from app.services.read_cache import read_cache
+from app.services.retrieval import retrieval_index
+from app.services.sender_reputation import sender_reputation
+from app.services.sms_processor import sms_processor
+
+
+def content_hash(sender: str, body: str, timestamp: Optional[datetime]) -> Optional[str]:
+    """Stable dedup key for a message without a forwarder message_id
+
+    Only messages carrying their original timestamp get a hash: without it
+    two genuinely separate "Call me" texts would be indistinguishable.
+    """
+    if timestamp is None:
+        return None
+    key = f"{sender}\x1f{body}\x1f{timestamp.replace(tzinfo=None).isoformat()}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+def _insert_rows(db: Session, rows: List[Dict]) -> List[Dict]:
+    """Insert rows, skipping ones whose message_id/content_hash already exist
+
+    Returns the rows that were actually inserted, as SMSResponse-shaped dicts.
+    """
+    dialect = db.get_bind().dialect.name
+    returned = [getattr(SMS, field) for field in SMSResponse.model_fields]
+
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        stmt = dialect_insert(SMS).on_conflict_do_nothing().returning(*returned)
+        return [dict(row._mapping) for row in db.execute(stmt, rows)]
+
+    # Other backends: filter out known keys first, then insert one by one for ids
+    message_ids = {r['message_id'] for r in rows if r['message_id']}
+    hashes = {r['content_hash'] for r in rows if r['content_hash']}
+    seen = set(db.execute(select(SMS.message_id).where(SMS.message_id.in_(message_ids))).scalars())
+    seen |= set(db.execute(select(SMS.content_hash).where(SMS.content_hash.in_(hashes))).scalars())
+    inserted = []
+    for row in rows:
+        keys = {row['message_id'], row['content_hash']} - {None}
+        if keys & seen:
+            continue
+        seen |= keys
+        result = db.execute(insert(SMS).values(**row).returning(*returned)).one()
+        inserted.append(dict(result._mapping))
+    return inserted
+
+
+def ingest_chunk(db: Session, items: List[SMSIngest],
+                 hashes: Optional[List[Optional[str]]] = None) -> Dict:
+    """Classify and insert one chunk in its own transaction
+
+    `hashes` gives each item's content hash when it was computed before the
+    item was stamped with a receive time (queued ingest); by default it is
+    computed from the item. Returns accepted/duplicate/failed counts. If
+    the chunk's transaction fails, rows are retried one at a time so a
+    single bad row only fails itself.
+    """
+    if not items:
+        return {'accepted': 0, 'duplicates': 0, 'failed': 0}
+    if hashes is None:
+        hashes = [
+            None if item.message_id else content_hash(item.sender, item.body, item.timestamp)
+            for item in items
+        ]
+
+    processed_batch = sms_processor.process_many(
+        (item.sender, item.body, item.timestamp) for item in items
+    )
+    rows = [
+        {
+            **processed,
+            'message_id': item.message_id,
+            'content_hash': digest,
+        }
+        for item, digest, processed in zip(items, hashes, processed_batch)
+    ]
+
+    try:
+        with serialized_write(db.get_bind()), metrics.stage('db_commit'):
+            inserted = _insert_rows(db, rows)
+            digest_store.record(db, inserted)
+            sender_reputation.record(db, inserted)
+            entities.record(db, inserted)
+            sync_log.record_inserted(db, [row['id'] for row in inserted])
+            db.commit()
+    except Exception:
+        db.rollback()
+        if len(rows) == 1:
+            return {'accepted': 0, 'duplicates': 0, 'failed': 1}
+        totals = {'accepted': 0, 'duplicates': 0, 'failed': 0}
+        for item, digest in zip(items, hashes):
+            for key, value in ingest_chunk(db, [item], [digest]).items():
+                totals[key] += value
+        return totals
+
+    sender_reputation.refresh(db, inserted)
+    read_cache.bump_rows(inserted)
+    for row in inserted:
+        retrieval_index.add(row['id'], row['sender'], row['body'], row['timestamp'])
+    event_bus.publish_ingested(inserted)
+    digest_summarizer.schedule_rows(inserted)
+    return {'accepted': len(inserted), 'duplicates': len(rows) - len(inserted), 'failed': 0}
+
+
+async def iter_lines(stream: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a byte stream into lines without buffering the whole body"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    pending = ""
+    async for chunk in stream:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_ndjson_records(stream: AsyncIterator[bytes]) -> AsyncIterator[object]:
+    """One JSON object per line; unparseable lines are yielded as None"""
+    async for line in iter_lines(stream):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield None
+
+
+async def iter_csv_records(stream: AsyncIterator[bytes]) -> AsyncIterator[Dict]:
+    """Rows of a CSV with a header (sender, body[, timestamp][, message_id])
+
+    Lines are joined until their quotes balance, so quoted bodies may
+    contain newlines.
+    """
+    header = None
+    record = []
+    async for line in iter_lines(stream):
+        record.append(line)
+        text = "\n".join(record)
+        if text.count('"') % 2:
+            continue  # inside a quoted field
+        record = []
+        if not text.strip():
+            continue
+        values = next(csv.reader([text]))
+        if header is None:
+            header = [name.strip().lower() for name in values]
+            continue
+        yield {name: value for name, value in zip(header, values) if value != ""}
@@ -0,0 +1,145 @@
+import argparse
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Optional, Tuple
+from sqlalchemy import case, delete, func, insert, select
+from sqlalchemy.orm import Session
+from app.core.database import serialized_write
+from app.models.sms_model import SMS, DailyDigest
+
+
+def _counts(rows: Iterable[Dict]) -> Dict[Tuple[date, str], Tuple[int, int]]:
+    """Aggregate processed messages into {(day, category): (count, threats)}"""
+    counts = Counter()
+    threats = Counter()
+    for row in rows:
+        key = (row['timestamp'].date(), row['category'] or 'uncategorized')
+        counts[key] += 1
+        if row['is_threat']:
+            threats[key] += 1
+    return {key: (counts[key], threats[key]) for key in counts}
+
+
+def record(db: Session, rows: Iterable[Dict], sign: int = 1):
+    """Add processed messages to the daily counters in the caller's transaction
+
+    `rows` are SMSProcessor.process_message/process_many dicts (or any dict
+    with timestamp, category and is_threat). The caller commits, so the
+    counters land atomically with the inserted messages. sign=-1 takes
+    deleted messages back out.
+    """
+    counts = _counts(rows)
+    if not counts:
+        return
+
+    values = [
+        {'date': day, 'category': category, 'count': sign * count, 'threat_count': sign * threats}
+        for (day, category), (count, threats) in counts.items()
+    ]
+    dialect = db.get_bind().dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as upsert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as upsert
+        stmt = upsert(DailyDigest)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[DailyDigest.date, DailyDigest.category],
+            set_={
+                'count': DailyDigest.count + stmt.excluded.count,
+                'threat_count': DailyDigest.threat_count + stmt.excluded.threat_count,
+            },
+        )
+        db.execute(stmt, values)
+    else:
+        # Generic read-modify-write for other backends
+        for value in values:
+            row = db.get(DailyDigest, (value['date'], value['category']))
+            if row is None:
+                db.add(DailyDigest(**value))
+            else:
+                row.count += value['count']
+                row.threat_count += value['threat_count']
+        db.flush()
+    if sign < 0:
+        db.execute(delete(DailyDigest).where(DailyDigest.count <= 0))
+
+
+def get_digest_counts(db: Session, day: date) -> Tuple[Dict[str, int], int]:
+    """Per-category counts and the threat total for one day"""
+    rows = db.execute(
+        select(DailyDigest.category, DailyDigest.count, DailyDigest.threat_count)
+        .where(DailyDigest.date == day)
+    ).all()
+    return {row.category: row.count for row in rows}, sum(row.threat_count for row in rows)
+
+
+def rebuild(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Recompute the counters from the sms table (all days, or start..end inclusive)
+
+    Returns the number of (date, category) rows written. Use after
+    backfills or manual edits that bypass the ingest paths.
+    """
+    day = func.date(SMS.timestamp)
+    category = func.coalesce(SMS.category, 'uncategorized')
+    stmt = select(
+        day.label('day'),
+        category.label('category'),
+        func.count().label('count'),
+        func.sum(case((SMS.is_threat == True, 1), else_=0)).label('threat_count'),
+    ).group_by(day, category)
+
+    clear = delete(DailyDigest)
+    if start is not None:
+        stmt = stmt.where(SMS.timestamp >= datetime.combine(start, datetime.min.time()))
+        clear = clear.where(DailyDigest.date >= start)
+    if end is not None:
+        stmt = stmt.where(SMS.timestamp < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        clear = clear.where(DailyDigest.date <= end)
+
+    with serialized_write(db.get_bind()):
+        return _replace_counters(db, db.execute(stmt).all(), clear)
+
+
+def _replace_counters(db: Session, rows, clear) -> int:
+    db.execute(clear)
+    values = [
+        {
+            'date': row.day if isinstance(row.day, date) else date.fromisoformat(str(row.day)[:10]),
+            'category': row.category,
+            'count': row.count,
+            'threat_count': row.threat_count or 0,
+        }
+        for row in rows
+    ]
+    if values:
+        db.execute(insert(DailyDigest), values)
+    db.commit()
+    return len(values)
+
+
+def ensure_backfilled(db: Session) -> bool:
+    """Rebuild once if the counters are empty but messages exist (first start after upgrade)"""
+    has_counters = db.execute(select(DailyDigest.date).limit(1)).first() is not None
+    has_messages = db.execute(select(SMS.id).limit(1)).first() is not None
+    if has_counters or not has_messages:
+        return False
+    rebuild(db)
+    return True
+
+
+if __name__ == "__main__":
+    from app.core.database import SessionLocal, init_db
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily_digest counters from the sms table")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    init_db()
+    session = SessionLocal()
+    try:
+        written = rebuild(session, args.start, args.end)
+        print(f"Rebuilt {written} daily digest rows")
+    finally:
+        session.close()
@@ -0,0 +1,202 @@
+import asyncio
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.models.sms_model import SMS
+from app.services import digest_store
+from app.services.llm_client import LLMClient, llm_client
+from app.services.read_cache import read_cache
+
+
+def count_bucket(count: int) -> int:
+    """Message-count bucket a summary was written for: 1, 2-3, 4-7, 8-15, ..."""
+    return count.bit_length()
+
+
+class DigestSummarizer:
+    """LLM summaries for the daily digest, computed off the read path
+
+    Ingest marks the affected days dirty; a background task waits
+    `delay` seconds so a burst of messages shares one request, then asks
+    the LLM for every category whose count moved into a new bucket in a
+    single call. /digest only reads the kept summaries: an entry whose
+    bucket no longer matches the day's count is still served, marked
+    stale, and a refresh is scheduled.
+    """
+
+    def __init__(self, llm: LLMClient, enabled: bool, delay: float, samples: int, max_entries: int,
+                 session_factory=SessionLocal):
+        self.llm = llm
+        self.enabled = enabled
+        self.delay = delay
+        self.samples = samples
+        self.max_entries = max_entries
+        self.session_factory = session_factory
+        # (day, category) -> (count bucket, summary)
+        self._entries: "OrderedDict[Tuple[date, str], Tuple[int, str]]" = OrderedDict()
+        self._dirty: Set[date] = set()
+        self._lock = threading.Lock()
+        self._wake: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.stats_counters = {'requests': 0, 'summaries': 0, 'failed': 0}
+
+    @property
+    def active(self) -> bool:
+        return self.enabled and self.llm.enabled
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._dirty.clear()
+
+    async def start(self):
+        if not self.active or self._worker is not None:
+            return
+        self._wake = asyncio.Event()
+        self._loop = asyncio.get_running_loop()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def schedule(self, days: Iterable[date]):
+        """Mark days for a summary refresh; safe to call from any thread"""
+        if self._worker is None:
+            return
+        with self._lock:
+            self._dirty.update(days)
+        try:
+            self._loop.call_soon_threadsafe(self._wake.set)
+        except RuntimeError:
+            # Loop already closed (shutdown)
+            pass
+
+    def schedule_rows(self, rows: Iterable[Dict]):
+        """schedule() for the days of processed messages"""
+        self.schedule({row['timestamp'].date() for row in rows})
+
+    async def _run(self):
+        while True:
+            await self._wake.wait()
+            await asyncio.sleep(self.delay)
+            self._wake.clear()
+            with self._lock:
+                days, self._dirty = self._dirty, set()
+            for day in sorted(days):
+                try:
+                    await self.refresh(day)
+                except Exception as e:
+                    self.stats_counters['failed'] += 1
+                    logger.error(f"Digest summary refresh for {day} failed: {e}")
+
+    def lookup(self, day: date, category: str, count: int) -> Optional[Tuple[str, bool]]:
+        """(summary, stale) for a digest row, or None if none was computed"""
+        with self._lock:
+            entry = self._entries.get((day, category))
+            if entry is None:
+                return None
+            self._entries.move_to_end((day, category))
+        bucket, summary = entry
+        return summary, bucket != count_bucket(count)
+
+    def annotate(self, digest: Dict, day: date):
+        """Swap in kept LLM summaries and flag stale ones; never waits on the LLM"""
+        if not self.active:
+            return
+        needs_refresh = False
+        for row in digest['categories']:
+            found = self.lookup(day, row['category'], row['count'])
+            if found is None:
+                needs_refresh = True
+                continue
+            row['summary'], row['stale'] = found
+            needs_refresh = needs_refresh or row['stale']
+        if needs_refresh:
+            self.schedule([day])
+
+    def _outdated(self, day: date, counts: Dict[str, int]) -> Dict[str, int]:
+        with self._lock:
+            return {
+                category: count for category, count in counts.items()
+                if count > 0 and self._entries.get((day, category), (None,))[0] != count_bucket(count)
+            }
+
+    def _load_samples(self, day: date) -> Dict[str, Tuple[int, List[SMS]]]:
+        """Recent messages of each category whose summary is missing or stale"""
+        db = self.session_factory()
+        try:
+            counts, _ = digest_store.get_digest_counts(db, day)
+            start = datetime.combine(day, datetime.min.time())
+            category = func.coalesce(SMS.category, 'uncategorized')
+            samples = {}
+            for name, count in self._outdated(day, counts).items():
+                messages = (
+                    db.query(SMS)
+                    .filter(SMS.timestamp >= start, SMS.timestamp < start + timedelta(days=1), category == name)
+                    .order_by(SMS.timestamp.desc())
+                    .limit(self.samples)
+                    .all()
+                )
+                samples[name] = (count, messages)
+            return samples
+        finally:
+            db.close()
+
+    def _put(self, key: Tuple[date, str], value: Tuple[int, str]):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def refresh(self, day: date) -> int:
+        """Summarize every outdated category of `day` in one LLM call; returns summaries written"""
+        samples = await run_in_threadpool(self._load_samples, day)
+        if not samples:
+            return 0
+        self.stats_counters['requests'] += 1
+        summaries = await self.llm.summarize_categories(day.isoformat(), samples)
+        if not summaries:
+            self.stats_counters['failed'] += 1
+            return 0
+        with self._lock:
+            for category, summary in summaries.items():
+                self._put((day, category), (count_bucket(samples[category][0]), summary))
+        # Cached /digest responses for the day carry the old summaries
+        read_cache.bump([day], include_global=False)
+        self.stats_counters['summaries'] += len(summaries)
+        return len(summaries)
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.active,
+            'entries': len(self._entries),
+            'pending_days': len(self._dirty),
+            **self.stats_counters,
+        }
+
+
+# Singleton instance
+digest_summarizer = DigestSummarizer(
+    llm=llm_client,
+    enabled=settings.digest_summaries_enabled,
+    delay=settings.digest_summary_delay,
+    samples=settings.digest_summary_samples,
+    max_entries=settings.digest_summary_cache_size,
+)
@@ -0,0 +1,308 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import and_, delete, func, insert, select
+from sqlalchemy.orm import Session, aliased
+from app.core.database import serialized_write
+from app.core.metrics import metrics
+from app.models.sms_model import SMS, SMSEntity
+
+# Currency followed by an amount: "Rs.2,500", "INR 45,000.00", "₹799"
+AMOUNT_RE = re.compile(r'(rs\.?|inr|₹)\s*\d[\d,]*(?:\.\d+)?', re.IGNORECASE)
+_NUMBER = re.compile(r'\d[\d,]*(?:\.\d+)?')
+_BALANCE = re.compile(r'\b(?:bal|balance)\b[^\d]{0,12}$', re.IGNORECASE)
+# Card limits and dues quoted next to a transaction ("Avl Lmt: Rs.48,750", "min due Rs.750")
+_STANDING = re.compile(r'\b(?:limit|lmt|outstanding|due)\b[^\d]{0,12}$', re.IGNORECASE)
+_DEBIT = re.compile(r'\b(?:debited|spent|paid|sent|withdrawn|deducted|purchase|charged)\b', re.IGNORECASE)
+_CREDIT = re.compile(r'\b(?:credited|received|refund(?:ed)?|deposited)\b', re.IGNORECASE)
+# Masked account/card fragments ("XXXX1234", "****8910") or "A/C no. 1234"
+_ACCOUNT = re.compile(
+    r'[x*]{2,}(\d{2,6})\b|\b(?:a/c|acct|account|card)\s*(?:no\.?\s*|ending\s*(?:with\s*)?)?(\d{4})\b',
+    re.IGNORECASE,
+)
+_CODE = re.compile(r'(?<![\d-])\d{4,8}(?![\d-])')
+_VALIDITY = re.compile(r'\bvalid\s+(?:for\s+|till\s+|upto\s+)?(\d+)\s*(min|minute|hr|hour|sec|second)s?\b', re.IGNORECASE)
+_VALIDITY_UNITS = {'min': 'minutes', 'minute': 'minutes', 'hr': 'hours', 'hour': 'hours', 'sec': 'seconds', 'second': 'seconds'}
+_PNR = re.compile(r'\bpnr\b(?:\s*(?:no\.?|number|is))?\s*[:#-]?\s*([a-z0-9]{6,10})\b', re.IGNORECASE)
+_FLIGHT = re.compile(
+    r'\bflight\s+(?:no\.?\s*)?([a-z0-9]{2})[\s-]?(\d{1,4})\b|\b(6E|AI|UK|SG|QP|IX|I5|G8)[\s-](\d{2,4})\b',
+    re.IGNORECASE,
+)
+# Merchants are the upper-case name after at/to in payment messages ("paid to ZOMATO via UPI")
+_MERCHANT = re.compile(r"\b(?:at|to|towards)\s+([A-Z][A-Z0-9&'-]+(?:\s[A-Z][A-Z0-9&'-]+){0,2})")
+_VPA = re.compile(r'\b(?:to|from)\s+([\w.-]+)@[a-z]+\b', re.IGNORECASE)
+NOT_MERCHANTS = {'A/C', 'AC', 'ACCOUNT', 'CARD', 'UPI', 'VPA', 'YOUR', 'INR', 'RS', 'RS.', 'BANK', 'SMS'}
+
+KINDS = ('amount', 'account', 'otp', 'pnr', 'flight', 'merchant')
+
+
+def _entity(kind: str, value: str, **fields) -> Dict:
+    return {'kind': kind, 'value': value, 'amount': None, 'currency': None, 'direction': None,
+            'valid_until': None, **fields}
+
+
+def _amounts(body: str) -> List[Dict]:
+    """Amounts in a body; only the transaction amount carries the debit/credit direction
+
+    The transaction amount is the first one that is not a balance, limit
+    or due. Balances are tagged 'balance'; limits, dues and any further
+    amounts get no direction, so spend totals count each message once.
+    """
+    debit, credit = _DEBIT.search(body), _CREDIT.search(body)
+    # The verb that comes first describes the message ("Rs.1500 cashback credited")
+    direction = None
+    if debit or credit:
+        direction = 'debit' if credit is None or (debit is not None and debit.start() < credit.start()) else 'credit'
+    found = []
+    for match in AMOUNT_RE.finditer(body):
+        value = float(_NUMBER.search(match.group(0)[len(match.group(1)):]).group(0).replace(",", ""))
+        before = body[max(0, match.start() - 20):match.start()]
+        if _BALANCE.search(before):
+            kind = 'balance'
+        elif _STANDING.search(before):
+            kind = None
+        else:
+            kind, direction = direction, None
+        found.append(_entity('amount', f"{value:.2f}", amount=value, currency='INR', direction=kind))
+    return found
+
+
+def _otp(body: str, timestamp: datetime) -> Optional[Dict]:
+    masked = AMOUNT_RE.sub(" ", body)
+    code = _CODE.search(masked)
+    if code is None:
+        return None
+    validity = _VALIDITY.search(masked)
+    valid_until = None
+    if validity is not None:
+        unit = _VALIDITY_UNITS[validity.group(2).lower()]
+        valid_until = timestamp + timedelta(**{unit: int(validity.group(1))})
+    return _entity('otp', code.group(0), valid_until=valid_until)
+
+
+def _merchant(body: str) -> Optional[Dict]:
+    for match in _MERCHANT.finditer(body):
+        name = match.group(1).rstrip("-'")
+        if name.split()[0] not in NOT_MERCHANTS:
+            return _entity('merchant', name)
+    vpa = _VPA.search(body)
+    if vpa is not None:
+        return _entity('merchant', vpa.group(1).upper())
+    return None
+
+
+@metrics.timed('entity_extraction')
+def extract(body: str, timestamp: datetime, category: Optional[str] = None) -> List[Dict]:
+    """Amounts, account suffixes, OTPs, PNR/flight numbers and merchants in a body
+
+    OTP codes are only looked for in otp messages, and merchants only
+    next to a debited/credited amount, so promo codes and prices do not
+    turn into entities.
+    """
+    if not body:
+        return []
+    entities = _amounts(body)
+    accounts = {m.group(1) or m.group(2) for m in _ACCOUNT.finditer(body)}
+    entities.extend(_entity('account', suffix[-4:]) for suffix in sorted(accounts))
+
+    if category == 'otp':
+        otp = _otp(body, timestamp)
+        if otp is not None:
+            entities.append(otp)
+    pnrs = [m.group(1).upper() for m in _PNR.finditer(body) if any(c.isdigit() for c in m.group(1))]
+    entities.extend(_entity('pnr', pnr) for pnr in dict.fromkeys(pnrs))
+    flights = [
+        f"{(m.group(1) or m.group(3)).upper()}{m.group(2) or m.group(4)}" for m in _FLIGHT.finditer(body)
+    ]
+    entities.extend(_entity('flight', flight) for flight in dict.fromkeys(flights))
+    if any(e['direction'] in ('debit', 'credit') for e in entities):
+        merchant = _merchant(body)
+        if merchant is not None:
+            entities.append(merchant)
+    return entities
+
+
+def record(db: Session, rows: Iterable[Dict]):
+    """Store the entities of inserted messages in the caller's transaction
+
+    `rows` need id, body, timestamp and category (the dicts bulk_ingest
+    gets back from its insert, or a processed message plus its id).
+    """
+    values = [
+        {**entity, 'sms_id': row['id'], 'timestamp': row['timestamp']}
+        for row in rows
+        for entity in extract(row['body'], row['timestamp'], row.get('category'))
+    ]
+    if values:
+        db.execute(insert(SMSEntity), values)
+
+
+def forget(db: Session, sms_ids: Iterable[int]):
+    """Drop the entities of deleted messages in the caller's transaction"""
+    db.execute(delete(SMSEntity).where(SMSEntity.sms_id.in_(list(sms_ids))))
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """Extract entities for messages stored before extraction existed; returns messages scanned
+
+    Runs when the table is empty but messages exist (first start after
+    upgrade), in id-ordered batches. If the newest message with several
+    amounts no longer extracts to what is stored (the amount rules
+    changed since), every message is extracted again.
+    """
+    newest = db.execute(
+        select(SMSEntity.sms_id).where(SMSEntity.kind == 'amount')
+        .group_by(SMSEntity.sms_id).having(func.count() > 1)
+        .order_by(SMSEntity.sms_id.desc()).limit(1)
+    ).scalar()
+    if newest is not None:
+        sms = db.get(SMS, newest)
+        stored = db.execute(
+            select(SMSEntity.value, SMSEntity.direction)
+            .where(SMSEntity.sms_id == newest, SMSEntity.kind == 'amount').order_by(SMSEntity.id)
+        ).all()
+        fresh = [(e['value'], e['direction']) for e in _amounts(sms.body or "")] if sms is not None else None
+        if fresh is not None and [tuple(row) for row in stored] != fresh:
+            with serialized_write(db.get_bind()):
+                db.execute(delete(SMSEntity))
+                db.commit()
+
+    has_entities = db.execute(select(SMSEntity.id).limit(1)).first() is not None
+    if has_entities:
+        return 0
+    scanned = 0
+    last_id = 0
+    while True:
+        batch = db.execute(
+            select(SMS.id, SMS.body, SMS.timestamp, SMS.category)
+            .where(SMS.id > last_id).order_by(SMS.id).limit(batch_size)
+        ).all()
+        if not batch:
+            return scanned
+        with serialized_write(db.get_bind()):
+            record(db, [dict(row._mapping) for row in batch if row.timestamp is not None])
+            db.commit()
+        scanned += len(batch)
+        last_id = batch[-1].id
+
+
+def _in_window(stmt, column, start: Optional[datetime], end: Optional[datetime]):
+    if start is not None:
+        stmt = stmt.where(column >= start)
+    if end is not None:
+        stmt = stmt.where(column <= end)
+    return stmt
+
+
+def find(db: Session, kind: Optional[str] = None, value: Optional[str] = None, start: Optional[datetime] = None,
+         end: Optional[datetime] = None, limit: int = 50) -> List[Dict]:
+    """Entities newest first, with the sender of their message"""
+    stmt = select(SMSEntity, SMS.sender).join(SMS, SMS.id == SMSEntity.sms_id)
+    if kind:
+        stmt = stmt.where(SMSEntity.kind == kind)
+    if value:
+        stmt = stmt.where(SMSEntity.value == value)
+    stmt = _in_window(stmt, SMSEntity.timestamp, start, end)
+    stmt = stmt.order_by(SMSEntity.timestamp.desc(), SMSEntity.id.desc()).limit(limit)
+    return [
+        {
+            'sms_id': entity.sms_id, 'sender': sender, 'kind': entity.kind, 'value': entity.value,
+            'amount': entity.amount, 'currency': entity.currency, 'direction': entity.direction,
+            'valid_until': entity.valid_until, 'timestamp': entity.timestamp,
+        }
+        for entity, sender in db.execute(stmt).all()
+    ]
+
+
+def spend_by_merchant(db: Session, start: Optional[datetime] = None, end: Optional[datetime] = None,
+                      direction: str = 'debit') -> List[Dict]:
+    """Per-day, per-merchant totals of debited (or credited) amounts, newest day first"""
+    amount, merchant = aliased(SMSEntity), aliased(SMSEntity)
+    day = func.date(amount.timestamp)
+    name = func.coalesce(merchant.value, 'UNKNOWN')
+    total = func.sum(amount.amount)
+    stmt = (
+        select(day.label('day'), name.label('merchant'), total.label('total'), func.count().label('count'))
+        .select_from(amount)
+        .outerjoin(merchant, and_(merchant.sms_id == amount.sms_id, merchant.kind == 'merchant'))
+        .where(amount.kind == 'amount', amount.direction == direction)
+        .group_by(day, name)
+        .order_by(day.desc(), total.desc())
+    )
+    stmt = _in_window(stmt, amount.timestamp, start, end)
+    return [
+        {'date': str(row.day)[:10], 'merchant': row.merchant, 'total': round(row.total, 2), 'count': row.count}
+        for row in db.execute(stmt).all()
+    ]
+
+
+# Factual questions answered from the table ("how much did I spend on UPI", "what's my PNR")
+_SPEND_QUESTION = re.compile(r'\bhow much\b.*\b(spen[dt]|paid|pay|debited|receive[d]?|got|credited)\b', re.IGNORECASE)
+_SPEND_TARGET = re.compile(r'\b(?:on|at|to|for|from)\s+([a-z0-9&.\'-]+)', re.IGNORECASE)
+# Only whole lookups ("what's my PNR?", "show my last OTP code"); questions that merely
+# mention an OTP or flight ("is my flight message a scam?") go to the LLM
+_LATEST_QUESTION = re.compile(
+    r"^\s*(?:(?:what(?:'s|\s+is|\s+was)|show(?:\s+me)?|tell\s+me|give\s+me)\s+)?(?:my\s+|the\s+)?"
+    r"(?:(?:latest|last|recent|current)\s+)?(pnr|flight|otp)(?:\s+(?:number|no\.?|code|details))?\s*[?.!]*\s*$",
+    re.IGNORECASE,
+)
+# Words after on/at/to/for that describe the window, not a merchant
+_WINDOW_WORDS = {'today', 'yesterday', 'this', 'last', 'week', 'month', 'the', 'my'}
+
+
+def _format_amount(value: float) -> str:
+    return f"Rs.{value:,.0f}" if value.is_integer() else f"Rs.{value:,.2f}"
+
+
+def _spend_answer(db: Session, query: str, start, end) -> Optional[Tuple[str, List[int]]]:
+    question = _SPEND_QUESTION.search(query)
+    if question is None:
+        return None
+    direction = 'debit' if question.group(1).lower() in ('spend', 'spent', 'paid', 'pay', 'debited') else 'credit'
+    target = next((m.group(1) for m in _SPEND_TARGET.finditer(query) if m.group(1).lower() not in _WINDOW_WORDS), None)
+
+    merchant = aliased(SMSEntity)
+    stmt = (
+        select(SMSEntity.sms_id, SMSEntity.amount)
+        .join(SMS, SMS.id == SMSEntity.sms_id)
+        .outerjoin(merchant, and_(merchant.sms_id == SMSEntity.sms_id, merchant.kind == 'merchant'))
+        .where(SMSEntity.kind == 'amount', SMSEntity.direction == direction)
+    )
+    if target:
+        # A merchant name, or a channel/keyword in the body ("UPI", "credit card")
+        stmt = stmt.where((merchant.value == target.upper()) | SMS.body.ilike(f"%{target}%"))
+    rows = db.execute(_in_window(stmt, SMSEntity.timestamp, start, end)).all()
+
+    verb = 'spent' if direction == 'debit' else 'received'
+    scope = f" on {target.upper()}" if target else ""
+    if not rows:
+        return f"No {'payments' if direction == 'debit' else 'credits'}{scope} found in this period.", []
+    total = sum(row.amount for row in rows)
+    return (
+        f"You {verb} {_format_amount(total)}{scope} across {len(rows)} transaction{'s' if len(rows) != 1 else ''}.",
+        [row.sms_id for row in rows],
+    )
+
+
+def _latest_answer(db: Session, query: str, start, end) -> Optional[Tuple[str, List[int]]]:
+    # Singular only: "show OTPs" / "how many flights" stay with the list and count answers
+    question = _LATEST_QUESTION.match(query)
+    if question is None:
+        return None
+    kind = question.group(1).lower()
+    found = find(db, kind=kind, start=start, end=end, limit=1)
+    label = {'pnr': 'PNR', 'flight': 'flight', 'otp': 'OTP'}[kind]
+    if not found:
+        return f"No {label} found in this period.", []
+    entity = found[0]
+    answer = f"Your latest {label} is {entity['value']} (from {entity['sender']}, {entity['timestamp']:%Y-%m-%d %H:%M})"
+    if entity['valid_until'] is not None:
+        state = "expired" if entity['valid_until'] < datetime.utcnow() else "valid"
+        answer += f", {state} until {entity['valid_until']:%H:%M}"
+    return answer + ".", [entity['sms_id']]
+
+
+def answer_query(db: Session, query: str, start: Optional[datetime] = None,
+                 end: Optional[datetime] = None) -> Optional[Tuple[str, List[int]]]:
+    """(answer, source message ids) for questions the entity table answers exactly, else None"""
+    return _spend_answer(db, query, start, end) or _latest_answer(db, query, start, end)
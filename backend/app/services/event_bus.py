@@ -0,0 +1,119 @@
+import asyncio
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+from fastapi.encoders import jsonable_encoder
+
+# Sent to a subscriber whose queue overflowed; the stream closes and the
+# client reconnects with Last-Event-ID to replay what it missed
+OVERFLOW = object()
+
+
+class Event:
+    __slots__ = ('id', 'type', 'data')
+
+    def __init__(self, event_id: int, event_type: str, data: Dict):
+        self.id = event_id
+        self.type = event_type
+        self.data = data
+
+
+class EventBus:
+    """In-process pub/sub fan-out for the live stream
+
+    Publishing is thread-safe (ingest runs in the threadpool); delivery
+    happens on each subscriber's event loop. The last `history` events are
+    kept so reconnecting clients can resume from Last-Event-ID. Ids start
+    from the boot time in milliseconds, so an id from an earlier process
+    is always older than the kept history and reports lost.
+    """
+
+    def __init__(self, history: int = 1000, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._history = deque(maxlen=history)
+        self._subscribers: Dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+        self._first_id = self._next_id = time.time_ns() // 1_000_000
+        self._lock = threading.Lock()
+
+    @property
+    def subscriber_count(self) -> int:
+        return len(self._subscribers)
+
+    def publish(self, event_type: str, data: Dict) -> int:
+        with self._lock:
+            event = Event(self._next_id, event_type, jsonable_encoder(data))
+            self._next_id += 1
+            self._history.append(event)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._deliver, queue, event)
+            except RuntimeError:
+                # Subscriber's loop already closed
+                self._subscribers.pop(queue, None)
+        return event.id
+
+    @staticmethod
+    def _deliver(queue: asyncio.Queue, event: Event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow consumer: replace its backlog with the overflow marker
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(OVERFLOW)
+
+    def subscribe(self, last_event_id: Optional[int] = None) -> Tuple[asyncio.Queue, List[Event], bool]:
+        """Register a subscriber on the running loop
+
+        Returns the queue, the events to replay after `last_event_id`, and
+        whether events were lost (the id is older than the kept history, or
+        newer than any published).
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers[queue] = asyncio.get_running_loop()
+            if last_event_id is None:
+                return queue, [], False
+            if last_event_id >= self._next_id:
+                return queue, [], True
+            backlog = [e for e in self._history if e.id > last_event_id]
+            oldest = self._history[0].id if self._history else self._next_id
+            # Ids below our first one came from an earlier process
+            return queue, backlog, last_event_id < max(oldest - 1, self._first_id)
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    def publish_ingested(self, rows: Iterable[Dict]):
+        """Publish new messages, digest counter deltas and threat alerts"""
+        rows = list(rows)
+        if not rows:
+            return
+        deltas = Counter()
+        threat_deltas = Counter()
+        for row in rows:
+            self.publish('sms', row)
+            key = (row['timestamp'].date(), row['category'] or 'uncategorized')
+            deltas[key] += 1
+            if row['is_threat']:
+                threat_deltas[key] += 1
+                self.publish('threat', {
+                    'id': row['id'],
+                    'sender': row['sender'],
+                    'threat_reason': row.get('threat_reason'),
+                    'timestamp': row['timestamp'],
+                })
+        for (day, category), count in deltas.items():
+            self.publish('digest', {
+                'date': day,
+                'category': category,
+                'count_delta': count,
+                'threat_delta': threat_deltas[(day, category)],
+            })
+
+
+# Singleton instance
+event_bus = EventBus()
@@ -0,0 +1,125 @@
+import asyncio
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.logging import logger
+from app.schemas.sms import SMSIngest
+from app.services import bulk_ingest
+
+
+class IngestQueue:
+    """Bounded in-process queue that writes forwarded SMS in micro-batches
+
+    POST /sms enqueues and returns 202. A single worker task drains the
+    queue in batches of up to `batch_size` messages or `batch_wait_ms`,
+    whichever comes first, and writes each batch in one transaction via
+    bulk_ingest.ingest_chunk (so retries are deduplicated). `stop` flushes
+    whatever is still queued.
+    """
+
+    def __init__(self, enabled: bool, maxsize: int, batch_size: int, batch_wait_ms: int,
+                 session_factory=SessionLocal):
+        self.enabled = enabled
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.batch_wait_ms = batch_wait_ms
+        self.session_factory = session_factory
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._accepting = False
+        self.stats_counters = {'enqueued': 0, 'rejected': 0, 'written': 0, 'duplicates': 0, 'failed': 0, 'batches': 0}
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def start(self):
+        if not self.enabled or self._worker is not None:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._accepting = True
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting, write everything still queued, then stop the worker"""
+        if self._worker is None:
+            return
+        self._accepting = False
+        await self._queue.join()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def submit(self, payload: SMSIngest, content_hash: Optional[str] = None) -> bool:
+        """Enqueue without waiting; False means the caller should back off
+
+        `content_hash` is the message's dedup key, computed from what the
+        forwarder sent before the payload was stamped with a receive time.
+        """
+        if not self._accepting:
+            return False
+        try:
+            self._queue.put_nowait((payload, content_hash))
+        except asyncio.QueueFull:
+            self.stats_counters['rejected'] += 1
+            return False
+        self.stats_counters['enqueued'] += 1
+        return True
+
+    async def _next_batch(self) -> List[Tuple[SMSIngest, Optional[str]]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_wait_ms / 1000
+        while len(batch) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    def _write(self, batch: List[Tuple[SMSIngest, Optional[str]]]) -> Dict:
+        db = self.session_factory()
+        try:
+            return bulk_ingest.ingest_chunk(db, [item for item, _ in batch], [digest for _, digest in batch])
+        finally:
+            db.close()
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                result = await run_in_threadpool(self._write, batch)
+                self.stats_counters['written'] += result['accepted']
+                self.stats_counters['duplicates'] += result['duplicates']
+                self.stats_counters['failed'] += result['failed']
+            except Exception as e:
+                self.stats_counters['failed'] += len(batch)
+                logger.error(f"Ingest batch of {len(batch)} failed: {e}")
+            finally:
+                self.stats_counters['batches'] += 1
+                for _ in batch:
+                    self._queue.task_done()
+
+    def stats(self) -> Dict:
+        return {
+            'enabled': self.enabled,
+            'depth': self.depth,
+            'capacity': self.maxsize,
+            **self.stats_counters,
+        }
+
+
+# Singleton instance
+ingest_queue = IngestQueue(
+    enabled=settings.ingest_queue_enabled,
+    maxsize=settings.ingest_queue_maxsize,
+    batch_size=settings.ingest_batch_size,
+    batch_wait_ms=settings.ingest_batch_wait_ms,
+)
@@ -1,8 +1,52 @@
-from typing import List, Optional
-import requests
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import time
+import httpx
 import json
 from app.core.config import settings
+from app.core.logging import logger
+from app.core.metrics import metrics
 from app.models.sms_model import SMS
+from app.services.model_health import ModelHealthTracker
+from app.services.prompt_context import build_context
+from app.services.response_cache import ResponseCache, message_fingerprint, normalize_query
+
+class _ReasoningFilter:
+    """Drops <think>...</think> spans that some providers inline in streamed content
+
+    Tags may be split across chunks, so a possible partial tag at the end
+    of a chunk is held back until the next one.
+    """
+    OPEN, CLOSE = "<think>", "</think>"
+
+    def __init__(self):
+        self.inside = False
+        self.pending = ""
+
+    def feed(self, text: str) -> str:
+        text = self.pending + text
+        self.pending = ""
+        out = []
+        while text:
+            tag = self.CLOSE if self.inside else self.OPEN
+            index = text.find(tag)
+            if index >= 0:
+                if not self.inside:
+                    out.append(text[:index])
+                text = text[index + len(tag):]
+                self.inside = not self.inside
+                continue
+            keep = next((k for k in range(len(tag) - 1, 0, -1) if text.endswith(tag[:k])), 0)
+            if not self.inside:
+                out.append(text[:len(text) - keep])
+            self.pending = text[len(text) - keep:]
+            break
+        return "".join(out)
+
+    def flush(self) -> str:
+        pending, self.pending = self.pending, ""
+        return "" if self.inside else pending
+
 
 class LLMClient:
     """LLM client using OpenRouter's AI models"""
@@ -11,7 +55,7 @@ class LLMClient:
         # Check for OpenRouter API key
         self.enabled = settings.openai_api_key is not None
         self.api_key = settings.openai_api_key
-        self.base_url = "https://openrouter.ai/api/v1/chat/completions"
+        self.base_url = settings.llm_base_url
         # Multiple free models for better availability
         self.models = [
             "deepseek/deepseek-r1:free",           # Primary: DeepSeek R1 (best reasoning)
@@ -19,53 +63,345 @@ class LLMClient:
             "meta-llama/llama-3.2-3b-instruct:free", # Fallback 2: Llama 3.2 (reliable)
             "qwen/qwen-2-7b-instruct:free",        # Fallback 3: Qwen 2 (good quality)
         ]
+        # Prompt context tokens per model; others get settings.llm_context_tokens
+        self.context_budgets = {
+            "deepseek/deepseek-r1:free": 1200,              # reasoning time grows with the prompt
+            "google/gemini-2.0-flash-exp:free": 2500,       # large window, fast prefill
+            "meta-llama/llama-3.2-3b-instruct:free": 600,   # small model loses focus on long context
+            "qwen/qwen-2-7b-instruct:free": 1000,
+        }
+        self.timeout = settings.llm_timeout
+        self.hedge_delay = settings.llm_hedge_delay
+        self.total_budget = settings.llm_total_budget
+        self.first_token_timeout = settings.llm_first_token_timeout
+        self.health = ModelHealthTracker(
+            failure_threshold=settings.llm_circuit_failures,
+            cooldown=settings.llm_circuit_cooldown,
+            rate_limit_cooldown=settings.llm_rate_limit_cooldown,
+        )
+        
+        self.cache = ResponseCache(
+            ttl=settings.llm_cache_ttl,
+            max_entries=settings.llm_cache_max_entries,
+            max_bytes=settings.llm_cache_max_bytes,
+            path=settings.llm_cache_path,
+        )
+        
+        # Shared keep-alive connection pool, created lazily on the running loop
+        self._client: Optional[httpx.AsyncClient] = None
+        self._client_loop: Optional[asyncio.AbstractEventLoop] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        """Return the pooled HTTP client, recreating it if the event loop changed"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._client.is_closed or self._client_loop is not loop:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=settings.llm_max_connections,
+                    max_keepalive_connections=settings.llm_max_connections,
+                ),
+            )
+            self._client_loop = loop
+        return self._client
+    
+    async def aclose(self):
+        """Close the pooled HTTP client (called on application shutdown)"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._client_loop = None
     
-    def answer_query(self, query: str, messages: List[SMS]) -> str:
-        """Answer a natural language query about messages using AI"""
+    async def answer_query(
+        self,
+        query: str,
+        messages: List[SMS],
+        load_all: Optional[Callable[[], Awaitable[List[SMS]]]] = None,
+    ) -> Tuple[str, List[int]]:
+        """Answer a natural language query about messages using AI
+        
+        `messages` is the context sent to the model. The rule-based fallback
+        counts over the whole window, so when it is needed the full set is
+        fetched with `load_all` (defaults to `messages`).
+        
+        Returns the answer and the ids of the messages it was based on:
+        those that fit in the prompt of the model that answered, or all of
+        `messages` for the rule-based fallback.
+        """
         if not self.enabled:
-            print("⚠️ LLM disabled - using fallback (API key not configured)")
-            return self._fallback_answer(query, messages)
+            logger.debug("LLM disabled - using fallback (API key not configured)")
+            return self._fallback_answer(query, await load_all() if load_all else messages), [m.id for m in messages]
         
-        # Try all models in order until one succeeds
-        for i, model in enumerate(self.models):
-            if i > 0:
-                print(f"🔄 Trying fallback model {i}: {model}")
-            
-            result = self._call_llm(query, messages, model)
-            if result:
-                return result
+        cache_key = f"query|{normalize_query(query)}|{message_fingerprint(messages)}"
+        cached = self._cached_answer(cache_key, messages)
+        if cached is not None:
+            return cached
+        
+        # Fastest healthy model first; models with an open circuit are skipped
+        models = self.health.ranked(self.models)
+        
+        try:
+            if self.hedge_delay is None:
+                result = await asyncio.wait_for(self._ask_sequential(query, messages, models), self.total_budget)
+            else:
+                result = await asyncio.wait_for(self._ask_hedged(query, messages, models), self.total_budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM latency budget of {self.total_budget}s exhausted")
+            result = None
+        
+        if result:
+            self._cache_answer(cache_key, *result)
+            return result
         
         # If all models fail, use rule-based fallback
-        print("↩️ All AI models unavailable, using rule-based answer")
-        return self._fallback_answer(query, messages)
+        logger.warning("All AI models unavailable, using rule-based answer")
+        return self._fallback_answer(query, await load_all() if load_all else messages), [m.id for m in messages]
+    
+    async def stream_answer(
+        self,
+        query: str,
+        messages: List[SMS],
+        load_all: Optional[Callable[[], Awaitable[List[SMS]]]] = None,
+    ) -> AsyncIterator[Dict]:
+        """Streaming variant of answer_query
+        
+        Yields {'event': 'sources', 'sources'} (as answer_query reports
+        them) and {'event': 'start', 'model'} once the answering model is
+        known, then {'event': 'delta', 'text'} as tokens arrive, then
+        {'event': 'done', 'source', 'model', 'complete'}. A model that
+        sends no answer token within first_token_timeout is abandoned for
+        the next one; cached and rule-based answers arrive as a single delta.
+        """
+        if not self.enabled:
+            fallback = self._fallback_answer(query, await load_all() if load_all else messages)
+            async for event in self._single_answer(fallback, [m.id for m in messages], 'fallback'):
+                yield event
+            return
+        
+        cache_key = f"query|{normalize_query(query)}|{message_fingerprint(messages)}"
+        cached = self._cached_answer(cache_key, messages)
+        if cached is not None:
+            async for event in self._single_answer(*cached, 'cache'):
+                yield event
+            return
+        
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.total_budget
+        for model in self.health.ranked(self.models):
+            if loop.time() >= deadline:
+                break
+            started = time.monotonic()
+            # The HTTP stream is read by its own task so waiting on it can time out cleanly
+            chunks: asyncio.Queue = asyncio.Queue()
+            prompt, sources = self._query_prompt(query, messages, model)
+            reader = asyncio.ensure_future(self._pump(self._stream_completion(model, prompt), chunks))
+            parts = []
+            try:
+                while True:
+                    timeout = deadline - loop.time()
+                    if not parts:
+                        timeout = min(timeout, self.first_token_timeout)
+                    item = await asyncio.wait_for(chunks.get(), max(timeout, 0))
+                    if item is None:
+                        break
+                    if isinstance(item, Exception):
+                        raise item
+                    if not parts:
+                        item = item.lstrip()
+                        if not item:
+                            continue
+                        yield {'event': 'sources', 'sources': sources}
+                        yield {'event': 'start', 'model': model}
+                    parts.append(item)
+                    yield {'event': 'delta', 'text': item}
+            except Exception as e:
+                self.health.record_failure(model)
+                if isinstance(e, asyncio.TimeoutError):
+                    self._record_call(model, 'timeout', started)
+                    logger.warning(f"{model} timed out {'mid-answer' if parts else 'before the first token'}")
+                else:
+                    self._record_call(model, 'error', started)
+                    logger.warning(f"Error streaming from {model}: {e}")
+                if parts:
+                    # Tokens already went out; the answer cannot switch models now
+                    yield {'event': 'done', 'source': 'llm', 'model': model, 'complete': False}
+                    return
+                continue
+            finally:
+                reader.cancel()
+            
+            if parts:
+                self._cache_answer(cache_key, "".join(parts).strip(), sources)
+                yield {'event': 'done', 'source': 'llm', 'model': model, 'complete': True}
+                return
+        
+        logger.warning("All AI models unavailable, using rule-based answer")
+        fallback = self._fallback_answer(query, await load_all() if load_all else messages)
+        async for event in self._single_answer(fallback, [m.id for m in messages], 'fallback'):
+            yield event
     
-    def _call_llm(self, query: str, messages: List[SMS], model: str) -> Optional[str]:
-        """Call LLM API with specified model"""
+    @staticmethod
+    async def _pump(source: AsyncIterator[str], chunks: asyncio.Queue):
+        """Copy a stream into a queue, ending with None or the exception raised"""
         try:
-            print(f"🤖 Calling {model} for query: '{query}'")
-            print(f"📊 Context: {len(messages)} messages")
+            async for text in source:
+                chunks.put_nowait(text)
+            chunks.put_nowait(None)
+        except Exception as e:
+            chunks.put_nowait(e)
+    
+    @staticmethod
+    async def _single_answer(answer: str, sources: List[int], source: str) -> AsyncIterator[Dict]:
+        yield {'event': 'sources', 'sources': sources}
+        yield {'event': 'start', 'model': None}
+        yield {'event': 'delta', 'text': answer}
+        yield {'event': 'done', 'source': source, 'model': None, 'complete': True}
+    
+    async def _stream_completion(self, model: str, prompt: str) -> AsyncIterator[str]:
+        """Answer text of one streamed chat completion as it arrives
+        
+        Reasoning is excluded from the request and any reasoning deltas or
+        inline <think> spans are dropped. Error statuses end the stream
+        without output (recorded like _complete); transport errors raise.
+        """
+        started = time.monotonic()
+        usage = None
+        reasoning = _ReasoningFilter()
+        async with self._get_client().stream(
+            "POST",
+            self.base_url,
+            headers=self._headers(),
+            json={
+                "model": model,
+                "messages": [{"role": "user", "content": prompt}],
+                "stream": True,
+                "reasoning": {"exclude": True},
+            },
+        ) as response:
+            if response.status_code != 200:
+                body = (await response.aread())[:200]
+                if response.status_code == 429:
+                    self.health.record_rate_limit(model, self._retry_after(response))
+                    self._record_call(model, 'rate_limited', started)
+                    logger.warning(f"{model} is rate-limited")
+                else:
+                    self.health.record_failure(model)
+                    self._record_call(model, 'error', started)
+                    logger.warning(f"{model} API error ({response.status_code}): {body!r}")
+                return
             
-            # Prepare context
-            context = self._prepare_context(messages)
+            async for line in response.aiter_lines():
+                # SSE: "data: {...}" chunks, ": keep-alive" comments, "data: [DONE]"
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    break
+                chunk = json.loads(data)
+                usage = chunk.get('usage') or usage
+                for choice in chunk.get('choices') or []:
+                    text = reasoning.feed((choice.get('delta') or {}).get('content') or "")
+                    if text:
+                        yield text
+            text = reasoning.flush()
+            if text:
+                yield text
+        
+        self.health.record_success(model, time.monotonic() - started)
+        self._record_call(model, 'success', started, usage)
+    
+    async def _ask_sequential(self, query: str, messages: List[SMS], models: List[str]) -> Optional[Tuple[str, List[int]]]:
+        """Try all models in order until one succeeds"""
+        for i, model in enumerate(models):
+            if i > 0:
+                logger.info(f"Trying fallback model {i}: {model}")
             
-            prompt = f"""You are an SMS assistant. Answer the user's question based on their SMS messages.
+            result = await self._call_llm(query, messages, model)
+            if result:
+                return result
+        return None
+    
+    async def _ask_hedged(self, query: str, messages: List[SMS], models: List[str]) -> Optional[Tuple[str, List[int]]]:
+        """Start the next model whenever the in-flight ones fail or exceed hedge_delay
+        
+        The first good answer wins and the remaining requests are cancelled.
+        """
+        remaining = list(models)
+        pending = set()
+        try:
+            while remaining or pending:
+                if remaining and not pending:
+                    pending.add(asyncio.ensure_future(self._call_llm(query, messages, remaining.pop(0))))
+                
+                done, pending = await asyncio.wait(
+                    pending,
+                    timeout=self.hedge_delay if remaining else None,
+                    return_when=asyncio.FIRST_COMPLETED,
+                )
+                for task in done:
+                    result = task.result()
+                    if result:
+                        return result
+                
+                # Hedge on a slow request, or replace a failed one while others still run
+                if remaining and (pending or not done):
+                    model = remaining.pop(0)
+                    logger.info(f"Starting {model} alongside {len(pending)} in-flight request(s)")
+                    pending.add(asyncio.ensure_future(self._call_llm(query, messages, model)))
+            return None
+        finally:
+            for task in pending:
+                task.cancel()
+    
+    async def _call_llm(self, query: str, messages: List[SMS], model: str) -> Optional[Tuple[str, List[int]]]:
+        """Call LLM API with specified model; the answer and the ids in its prompt"""
+        logger.debug(f"Calling {model} with {len(messages)} context messages")
+        prompt, sources = self._query_prompt(query, messages, model)
+        answer = await self._complete(model, prompt)
+        return (answer, sources) if answer else None
+    
+    def _query_prompt(self, query: str, messages: List[SMS], model: str) -> Tuple[str, List[int]]:
+        # Prepare context
+        context, sources = self._prepare_context(messages, model)
+        
+        return f"""You are an SMS assistant. Answer the user's question based on their SMS messages.
 
-Messages context:
+Messages (one row per message template, newest example shown; n = number of similar messages):
 {context}
 
 User question: {query}
 
-Provide a concise, helpful answer."""
-
-            # Use OpenRouter API
-            response = requests.post(
+Provide a concise, helpful answer.""", sources
+    
+    def _cached_answer(self, cache_key: str, messages: List[SMS]) -> Optional[Tuple[str, List[int]]]:
+        cached = self.cache.get(cache_key)
+        if cached is None:
+            return None
+        try:
+            entry = json.loads(cached)
+            return entry['answer'], entry['sources']
+        except (ValueError, TypeError, KeyError):
+            # Entry written before sources were cached alongside the answer
+            return cached, [m.id for m in messages]
+    
+    def _cache_answer(self, cache_key: str, answer: str, sources: List[int]):
+        self.cache.set(cache_key, json.dumps({'answer': answer, 'sources': sources}))
+    
+    def _headers(self) -> Dict[str, str]:
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "Content-Type": "application/json",
+            "HTTP-Referer": "http://localhost:4200",
+            "X-Title": "SmartSense Inbox",
+        }
+    
+    async def _complete(self, model: str, prompt: str, **options) -> Optional[str]:
+        """Send one chat completion to OpenRouter; None on any failure"""
+        started = time.monotonic()
+        try:
+            response = await self._get_client().post(
                 self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                    "HTTP-Referer": "http://localhost:4200",
-                    "X-Title": "SmartSense Inbox",
-                },
+                headers=self._headers(),
                 json={
                     "model": model,
                     "messages": [
@@ -73,84 +409,156 @@ Provide a concise, helpful answer."""
                             "role": "user",
                             "content": prompt
                         }
-                    ]
-                },
-                timeout=30
+                    ],
+                    **options
+                }
             )
             
             if response.status_code == 200:
                 result = response.json()
                 answer = result['choices'][0]['message']['content'].strip()
-                print(f"✅ {model} responded successfully")
+                self.health.record_success(model, time.monotonic() - started)
+                self._record_call(model, 'success', started, result.get('usage'))
+                logger.debug(f"{model} responded successfully")
                 return answer
             elif response.status_code == 429:
-                print(f"⏳ {model} is rate-limited")
+                self.health.record_rate_limit(model, self._retry_after(response))
+                self._record_call(model, 'rate_limited', started)
+                logger.warning(f"{model} is rate-limited")
                 return None
             else:
-                print(f"❌ API error ({response.status_code}): {response.text[:200]}")
+                self.health.record_failure(model)
+                self._record_call(model, 'error', started)
+                logger.warning(f"{model} API error ({response.status_code}): {response.text[:200]}")
                 return None
         
         except Exception as e:
-            print(f"❌ Error with {model}: {e}")
+            self.health.record_failure(model)
+            self._record_call(model, 'error', started)
+            logger.warning(f"Error with {model}: {e}")
+            return None
+    
+    @staticmethod
+    def _record_call(model: str, outcome: str, started: float, usage: Optional[dict] = None):
+        """Count an OpenRouter call, its latency and the token usage it reports"""
+        labels = {'model': model, 'outcome': outcome}
+        metrics.inc('llm_requests_total', labels)
+        metrics.observe('llm_request_duration_seconds', time.monotonic() - started, labels)
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if usage and usage.get(kind):
+                metrics.inc('llm_tokens_total', {'model': model, 'kind': kind.split('_')[0]}, usage[kind])
+    
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        """Seconds from a numeric Retry-After header, if present"""
+        try:
+            return float(response.headers["Retry-After"])
+        except (KeyError, ValueError):
             return None
 
     
-    def generate_summary(self, category: str, messages: List[SMS]) -> str:
-        """Generate an abstractive summary for a category"""
+    async def generate_summary(self, category: str, messages: List[SMS]) -> str:
+        """Generate an abstractive summary for a category
+        
+        Uses the same health-ranked model routing and latency budget as
+        answer_query, with a smaller context budget.
+        """
         if not self.enabled or len(messages) == 0:
             return f"{len(messages)} {category} messages"
         
-        try:
-            # Sample first few messages
-            sample = messages[:5]
-            bodies = "\n".join([f"- {msg.body[:100]}" for msg in sample])
-            
-            prompt = f"""Summarize these {category} SMS messages in one concise line (max 15 words):
+        cache_key = f"summary|{category}|{message_fingerprint(messages)}"
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
+        async def ask_models() -> Optional[str]:
+            for model in self.health.ranked(self.models):
+                budget = min(self.context_budget(model), settings.llm_summary_context_tokens)
+                prompt = f"""Summarize these {category} SMS messages in one concise line (max 15 words):
 
-{bodies}
+{self._prepare_context(messages, token_budget=budget)[0]}
 
 Summary:"""
-
-            response = requests.post(
-                self.base_url,
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json",
-                },
-                json={
-                    "model": self.model,
-                    "messages": [
-                        {
-                            "role": "user",
-                            "content": prompt
-                        }
-                    ],
-                    "max_tokens": 50,
-                    "temperature": 0.5
-                }
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result['choices'][0]['message']['content'].strip()
-            else:
-                return f"{len(messages)} {category} messages"
+                summary = await self._complete(model, prompt, max_tokens=50, temperature=0.5)
+                if summary:
+                    return summary
+            return None
+        
+        try:
+            summary = await asyncio.wait_for(ask_models(), self.total_budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM latency budget of {self.total_budget}s exhausted")
+            summary = None
         
-        except Exception:
+        if not summary:
             return f"{len(messages)} {category} messages"
+        self.cache.set(cache_key, summary)
+        return summary
     
-    def _prepare_context(self, messages: List[SMS], max_messages: int = 20) -> str:
-        """Prepare message context for LLM"""
-        lines = []
-        for i, msg in enumerate(messages[:max_messages]):
-            date_str = msg.timestamp.strftime("%Y-%m-%d %H:%M")
-            lines.append(f"{i+1}. From: {msg.sender} | {date_str} | Category: {msg.category}")
-            lines.append(f"   Message: {msg.body[:150]}")
+    async def summarize_categories(self, day: str, samples: Dict[str, Tuple[int, List[SMS]]]) -> Optional[Dict[str, str]]:
+        """One-line summaries for several categories from a single request
         
-        if len(messages) > max_messages:
-            lines.append(f"\n... and {len(messages) - max_messages} more messages")
+        `samples` maps a category to (message count, recent messages). The
+        model is asked for a JSON object keyed by category; returns the
+        parsed map, or None if no model produced a usable one.
+        """
+        if not self.enabled or not samples:
+            return None
         
-        return "\n".join(lines)
+        async def ask_models() -> Optional[Dict[str, str]]:
+            for model in self.health.ranked(self.models):
+                # Split the model's budget between categories, capped like single summaries
+                budget = min(self.context_budget(model) // len(samples), settings.llm_summary_context_tokens)
+                sections = "\n\n".join(
+                    f"## {category} ({count} messages)\n{self._prepare_context(messages, token_budget=budget)[0]}"
+                    for category, (count, messages) in samples.items()
+                )
+                prompt = f"""Summarize the SMS messages received on {day}, one concise line (max 15 words) per category.
+Reply with only a JSON object mapping each category name to its summary, for example {{"finance": "..."}}.
+
+{sections}"""
+                answer = await self._complete(model, prompt, max_tokens=40 * len(samples) + 20, temperature=0.5)
+                summaries = self._parse_summary_map(answer, samples) if answer else None
+                if summaries:
+                    return summaries
+                if answer:
+                    logger.warning(f"{model} returned no usable summary map")
+            return None
+        
+        try:
+            return await asyncio.wait_for(ask_models(), self.total_budget)
+        except asyncio.TimeoutError:
+            logger.warning(f"LLM latency budget of {self.total_budget}s exhausted")
+            return None
+    
+    @staticmethod
+    def _parse_summary_map(answer: str, categories) -> Optional[Dict[str, str]]:
+        """{category: summary} from a model reply, tolerating code fences or surrounding text"""
+        start, end = answer.find("{"), answer.rfind("}")
+        if start < 0 or end < start:
+            return None
+        try:
+            parsed = json.loads(answer[start:end + 1])
+        except ValueError:
+            return None
+        if not isinstance(parsed, dict):
+            return None
+        summaries = {
+            category: " ".join(parsed[category].split())
+            for category in categories
+            if isinstance(parsed.get(category), str) and parsed[category].strip()
+        }
+        return summaries or None
+    
+    def context_budget(self, model: Optional[str]) -> int:
+        """Prompt context tokens for a model"""
+        return self.context_budgets.get(model, settings.llm_context_tokens)
+    
+    @metrics.timed('context_preparation')
+    def _prepare_context(self, messages: List[SMS], model: Optional[str] = None,
+                         token_budget: Optional[int] = None) -> Tuple[str, List[int]]:
+        """Prepare message context for LLM within the model's token budget, and the ids it includes"""
+        return build_context(messages, token_budget if token_budget is not None else self.context_budget(model))
     
     def _fallback_answer(self, query: str, messages: List[SMS]) -> str:
         """Rule-based fallback when LLM unavailable"""
@@ -0,0 +1,102 @@
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+
+class ModelHealth:
+    """Rolling health state for one LLM model"""
+
+    def __init__(self, window: int):
+        self.latencies = deque(maxlen=window)  # seconds, successful calls only
+        self.outcomes = deque(maxlen=window)  # True for success
+        self.rate_limited_at = deque(maxlen=window)  # 429 timestamps
+        self.consecutive_failures = 0
+        self.open_until = 0.0  # circuit is open while time.monotonic() < open_until
+
+    @property
+    def avg_latency(self) -> Optional[float]:
+        return sum(self.latencies) / len(self.latencies) if self.latencies else None
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return 1 - sum(self.outcomes) / len(self.outcomes)
+
+
+class ModelHealthTracker:
+    """Per-model latency/error tracking with circuit breaking
+
+    A model's circuit opens after `failure_threshold` consecutive failures
+    or on any 429, and stays open for the cooldown. Open models are skipped
+    by `ranked`; once the cooldown passes the model gets another try.
+    """
+
+    def __init__(self, failure_threshold: int = 3, cooldown: float = 60.0,
+                 rate_limit_cooldown: float = 30.0, window: int = 20):
+        self.failure_threshold = failure_threshold
+        self.cooldown = cooldown
+        self.rate_limit_cooldown = rate_limit_cooldown
+        self.window = window
+        self._models: Dict[str, ModelHealth] = {}
+
+    def _get(self, model: str) -> ModelHealth:
+        if model not in self._models:
+            self._models[model] = ModelHealth(self.window)
+        return self._models[model]
+
+    def record_success(self, model: str, latency: float):
+        health = self._get(model)
+        health.latencies.append(latency)
+        health.outcomes.append(True)
+        health.consecutive_failures = 0
+        health.open_until = 0.0
+
+    def record_failure(self, model: str):
+        health = self._get(model)
+        health.outcomes.append(False)
+        health.consecutive_failures += 1
+        if health.consecutive_failures >= self.failure_threshold:
+            health.open_until = time.monotonic() + self.cooldown
+
+    def record_rate_limit(self, model: str, retry_after: Optional[float] = None):
+        health = self._get(model)
+        now = time.monotonic()
+        health.outcomes.append(False)
+        health.rate_limited_at.append(time.time())
+        health.consecutive_failures += 1
+        health.open_until = now + (retry_after if retry_after is not None else self.rate_limit_cooldown)
+
+    def is_available(self, model: str) -> bool:
+        return time.monotonic() >= self._get(model).open_until
+
+    def ranked(self, models: List[str]) -> List[str]:
+        """Available models, fastest healthy first; untried models keep configured order after measured ones"""
+        def sort_key(item):
+            index, model = item
+            health = self._get(model)
+            latency = health.avg_latency
+            return (round(health.error_rate, 1), latency is None, latency or 0.0, index)
+
+        available = [(i, m) for i, m in enumerate(models) if self.is_available(m)]
+        return [model for _, model in sorted(available, key=sort_key)]
+
+    def snapshot(self, models: List[str]) -> List[Dict]:
+        """Current health of each model, for the health endpoint"""
+        now = time.monotonic()
+        result = []
+        for model in models:
+            health = self._get(model)
+            latency = health.avg_latency
+            result.append({
+                'model': model,
+                'available': now >= health.open_until,
+                'cooldown_remaining': round(max(0.0, health.open_until - now), 2),
+                'avg_latency_ms': round(latency * 1000, 1) if latency is not None else None,
+                'error_rate': round(health.error_rate, 3),
+                'calls': len(health.outcomes),
+                'consecutive_failures': health.consecutive_failures,
+                'recent_rate_limits': len(health.rate_limited_at),
+                'last_rate_limited_at': health.rate_limited_at[-1] if health.rate_limited_at else None,
+            })
+        return result
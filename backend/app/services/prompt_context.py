@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional, Tuple
+from app.models.sms_model import SMS
+from app.services.entities import AMOUNT_RE
+
+HEADER = "when|from|category|n|flags|text"
+
+# Body characters kept per category; OTP/offer details rarely matter to an answer
+BODY_LIMITS = {'otp': 60, 'offers': 80}
+DEFAULT_BODY_LIMIT = 160
+MAX_AMOUNTS = 5  # distinct amounts listed for a collapsed template
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def _clean(text: str) -> str:
+    return " ".join(text.replace("|", "/").split())
+
+
+def _truncate(text: str, limit: int) -> str:
+    return text if len(text) <= limit else text[:limit - 1].rstrip() + "…"
+
+
+class _Group:
+    """Messages sharing one template, in the order they were ranked"""
+    __slots__ = ('latest', 'count', 'ids', 'senders', 'amounts')
+
+    def __init__(self, msg: SMS):
+        self.latest = msg
+        self.count = 0
+        self.ids: List[int] = []
+        self.senders: List[str] = []
+        self.amounts: List[str] = []
+
+    def add(self, msg: SMS):
+        self.count += 1
+        self.ids.append(msg.id)
+        if msg.timestamp and (self.latest.timestamp is None or msg.timestamp > self.latest.timestamp):
+            self.latest = msg
+        if msg.sender not in self.senders:
+            self.senders.append(msg.sender)
+        if msg.category != 'otp':
+            for match in AMOUNT_RE.finditer(msg.body or ""):
+                amount = " ".join(match.group(0).split())
+                if amount not in self.amounts:
+                    self.amounts.append(amount)
+
+    def row(self) -> str:
+        msg = self.latest
+        when = msg.timestamp.strftime("%Y-%m-%d %H:%M") if msg.timestamp else ""
+        sender = self.senders[0] if len(self.senders) == 1 else f"{self.senders[0]} +{len(self.senders) - 1}"
+        category = msg.category or 'other'
+        flags = "threat" if msg.is_threat else ""
+        text = _truncate(_clean(msg.body or ""), BODY_LIMITS.get(category, DEFAULT_BODY_LIMIT))
+        if self.count > 1 and len(self.amounts) > 1:
+            shown = ", ".join(self.amounts[:MAX_AMOUNTS])
+            more = f" +{len(self.amounts) - MAX_AMOUNTS}" if len(self.amounts) > MAX_AMOUNTS else ""
+            text += f" [amounts: {shown}{more}]"
+        return f"{when}|{_clean(sender)}|{category}|{self.count}|{flags}|{text}"
+
+
+def group_messages(messages: List[SMS]) -> List[_Group]:
+    """Collapse messages with the same template (or identical body) into one group
+
+    Groups keep the order of their first message, so retrieval ranking is preserved.
+    """
+    groups: Dict[str, _Group] = {}
+    for msg in messages:
+        key = msg.template_id or f"body:{msg.body}"
+        group = groups.get(key)
+        if group is None:
+            group = groups[key] = _Group(msg)
+        group.add(msg)
+    return list(groups.values())
+
+
+def build_context(messages: List[SMS], token_budget: Optional[int] = None) -> Tuple[str, List[int]]:
+    """Compact pipe-separated table of messages that fits in `token_budget`
+
+    One row per template with its message count; the row shows the newest
+    message and, for collapsed finance-style templates, the distinct
+    amounts. Rows are added in ranking order until the budget is spent
+    (at least one row is always included).
+
+    Returns the table and the ids of the messages its rows stand for.
+    """
+    if not messages:
+        return "(no messages)", []
+
+    lines = [HEADER]
+    used = estimate_tokens(HEADER)
+    groups = group_messages(messages)
+    included = 0
+    ids: List[int] = []
+    for group in groups:
+        row = group.row()
+        cost = estimate_tokens(row)
+        if token_budget is not None and included and used + cost > token_budget:
+            break
+        lines.append(row)
+        ids += group.ids
+        used += cost
+        included += 1
+
+    if included < len(groups):
+        omitted = sum(group.count for group in groups[included:])
+        lines.append(f"... {omitted} more messages in {len(groups) - included} templates omitted")
+    return "\n".join(lines), ids
@@ -0,0 +1,230 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+try:
+    import orjson
+except ImportError:  # optional: render_rows falls back to the stdlib encoder
+    orjson = None
+
+Version = Tuple[int, float]  # (write generation, when it last moved)
+
+
+class CachedResponse:
+    """A pre-serialized 200 response and its validators"""
+    __slots__ = ('version', 'body', 'etag', 'last_modified', 'headers')
+
+    def __init__(self, version: Version, body: bytes, headers: Dict[str, str]):
+        self.version = version
+        self.body = body
+        self.etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+        self.last_modified = formatdate(version[1], usegmt=True)
+        self.headers = headers
+
+
+class ReadCache:
+    """Read-through cache of JSON read responses, invalidated by write generations
+
+    Ingest paths `bump` a global generation plus one per affected day.
+    Responses scoped to a day (a dated digest or message list) only go
+    stale when that day is written; everything else follows the global
+    generation. Entries hold the rendered body, so a hit does no SQL or
+    serialization, and carry an ETag (hash of the body) and Last-Modified
+    (time of the last write in scope, once its second has passed) for 304
+    answers.
+
+    Generations live in process memory: with several workers each one
+    only sees its own writes.
+    """
+
+    def __init__(self, enabled: bool, max_entries: int, max_bytes: int):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._bytes = 0
+        self._sequence = 0  # every bump takes the next number
+        self._global: Version = (0, time.time())
+        self._days: Dict[date, Version] = {}
+        self._started = self._global[1]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            self._sequence += 1
+            self._global = (self._sequence, time.time())
+            self._started = self._global[1]
+            self._days.clear()
+            self.hits = 0
+            self.misses = 0
+            self.not_modified = 0
+
+    def bump(self, days: Iterable[date], include_global: bool = True):
+        """Mark data as changed; call after the write committed
+
+        include_global=False is for changes that only show up in per-day
+        responses (digest summaries).
+        """
+        with self._lock:
+            # Stamped under the lock so a reader that sees the old version
+            # started before this write (see serve)
+            self._sequence += 1
+            version = (self._sequence, time.time())
+            for day in days:
+                self._days[day] = version
+            if include_global:
+                self._global = version
+
+    def bump_rows(self, rows: Iterable[Dict]):
+        """bump() for the days of written messages; no rows, no bump"""
+        days = {row['timestamp'].date() for row in rows}
+        if days:
+            self.bump(days)
+
+    def version(self, day: Optional[date] = None) -> Version:
+        """Current generation of one day's data, or of everything
+
+        Days not written since start report the start time as modified.
+        """
+        with self._lock:
+            if day is None:
+                return self._global
+            return self._days.get(day, (0, self._started))
+
+    def get(self, key: str, version: Version) -> Optional[CachedResponse]:
+        if not self.enabled:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def store(self, key: str, version: Version, body: bytes,
+              headers: Optional[Dict[str, str]] = None) -> CachedResponse:
+        """Wrap a rendered body; keep it unless caching is off or it is too large"""
+        entry = CachedResponse(version, body, headers or {})
+        if not self.enabled or len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def serve(self, request: Request, build: Callable[[], Tuple[bytes, Dict[str, str]]],
+              day: Optional[date] = None, key: Optional[str] = None) -> Response:
+        """Answer a read from the cache, or run `build` (body, extra headers) and keep the result
+
+        `key` defaults to the path and query string; pass one when the
+        response depends on something else (e.g. today's date). Errors
+        raised by `build` propagate and nothing is kept.
+        """
+        if key is None:
+            key = f"{request.url.path}?{sorted(request.query_params.multi_items())}"
+        checked_at = time.time()
+        version = self.version(day)
+        entry = self.get(key, version)
+        if entry is None:
+            body, headers = build()
+            entry = self.store(key, version, body, headers)
+        # Last-Modified has one-second resolution: a write later in the same
+        # second would share it, so it is only sent once that second is over
+        return self.respond(request, entry, dated=int(version[1]) + 1 <= checked_at)
+
+    def respond(self, request: Request, entry: CachedResponse, dated: bool = True) -> Response:
+        """200 with the body, or 304 if the client's copy is current
+
+        Without `dated`, Last-Modified is left out and If-Modified-Since
+        ignored; the ETag alone validates.
+        """
+        headers = {'ETag': entry.etag, 'Cache-Control': 'no-cache'}
+        if dated:
+            headers['Last-Modified'] = entry.last_modified
+        if _not_modified(request, entry, dated):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+        return Response(entry.body, media_type='application/json', headers={**headers, **entry.headers})
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'enabled': self.enabled,
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def render_json(content) -> bytes:
+    """Body bytes exactly as FastAPI's default JSONResponse would send them"""
+    return JSONResponse(content).body
+
+
+def render_rows(fields: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    """JSON array of objects from result tuples (first len(fields) columns), without model validation
+
+    Byte-for-byte what render_json produces for the same rows passed
+    through their response model, as long as the columns already hold
+    the model's types (naive datetimes, lists, bools). Uses orjson when
+    installed.
+    """
+    objects = [dict(zip(fields, row)) for row in rows]
+    if orjson is not None:
+        try:
+            return orjson.dumps(objects)
+        except orjson.JSONEncodeError:
+            pass  # e.g. lone surrogates, which the stdlib encoder escapes
+    return render_json(jsonable_encoder(objects))
+
+
+def _not_modified(request: Request, entry: CachedResponse, dated: bool) -> bool:
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None:
+        tags = {tag.strip().removeprefix('W/') for tag in if_none_match.split(',')}
+        return '*' in tags or entry.etag in tags
+    if_modified_since = request.headers.get('if-modified-since')
+    if if_modified_since is None or not dated:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since).timestamp()
+    except (TypeError, ValueError):
+        return False
+    return int(entry.version[1]) <= since
+
+
+# Singleton instance
+read_cache = ReadCache(
+    enabled=settings.read_cache_enabled,
+    max_entries=settings.read_cache_max_entries,
+    max_bytes=settings.read_cache_max_bytes,
+)
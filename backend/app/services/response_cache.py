@@ -0,0 +1,129 @@
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.models.sms_model import SMS
+
+_NON_WORD = re.compile(r'[^a-z0-9]+')
+
+
+def normalize_query(query: str) -> str:
+    """Lower-case and strip punctuation/extra whitespace so near-identical questions share a key"""
+    return " ".join(_NON_WORD.sub(" ", query.lower()).split())
+
+
+def message_fingerprint(messages: List[SMS]) -> str:
+    """Cheap identity of a message set: count plus id range"""
+    if not messages:
+        return "0"
+    ids = [m.id for m in messages if m.id is not None]
+    if not ids:
+        return str(len(messages))
+    return f"{len(messages)}:{min(ids)}:{max(ids)}"
+
+
+class ResponseCache:
+    """TTL + LRU cache for LLM responses, bounded by entry count and total bytes
+
+    With `path` set, entries are also written through to a SQLite file so
+    they survive restarts; memory misses then fall back to disk.
+    """
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 512,
+                 max_bytes: int = 2 * 1024 * 1024, path: Optional[str] = None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+
+        self._disk = None
+        if path:
+            self._disk = sqlite3.connect(path, check_same_thread=False)
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS llm_cache (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._disk.commit()
+
+    @staticmethod
+    def _size(key: str, value: str) -> int:
+        return len(key) + len(value)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                self._remove(key)
+
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?", (key, now)
+                ).fetchone()
+                if row is not None:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def set(self, key: str, value: str):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at),
+                )
+                self._disk.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+                self._disk.commit()
+
+    def _store(self, key: str, value: str, expires_at: float):
+        if key in self._entries:
+            self._remove(key)
+        size = self._size(key, value)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, expires_at)
+        self._bytes += size
+        # Evict least recently used until both bounds hold
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        value, _ = self._entries.pop(key)
+        self._bytes -= self._size(key, value)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM llm_cache")
+                self._disk.commit()
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self._bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'disk_hits': self.disk_hits,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            'persistent': self._disk is not None,
+        }
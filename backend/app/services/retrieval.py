@@ -0,0 +1,147 @@
+import heapq
+import math
+import re
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy.orm import Session
+from app.models.sms_model import SMS
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+
+# Question words that would otherwise match every message
+STOPWORDS = {
+    'a', 'an', 'the', 'is', 'are', 'was', 'were', 'do', 'did', 'does', 'i', 'me', 'my', 'you', 'your',
+    'of', 'to', 'in', 'on', 'at', 'for', 'from', 'and', 'or', 'any', 'what', 'which', 'who', 'when',
+    'how', 'many', 'much', 'show', 'list', 'tell', 'give', 'get', 'all', 'have', 'has', 'there', 'this',
+    'that', 'it', 'with', 'about', 'messages', 'message', 'sms', 'today', 'yesterday', 'week',
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+class RetrievalIndex:
+    """Incremental BM25 index over SMS bodies and senders
+
+    Documents are added one at a time on ingest and the index catches up
+    from the database (rows with a higher id) before each search, so it
+    stays current across workers without ever being rebuilt.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._lengths: Dict[int, int] = {}
+        self._timestamps: Dict[int, datetime] = {}
+        self._sizes: Dict[int, int] = {}  # approximate context characters per message
+        self._total_length = 0
+        self._last_id = 0
+        self._lock = threading.Lock()
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._lengths.clear()
+            self._timestamps.clear()
+            self._sizes.clear()
+            self._total_length = 0
+            self._last_id = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, sms_id: int, sender: str, body: str, timestamp: datetime):
+        """Index one message; re-adding a known id is a no-op"""
+        terms = Counter(tokenize(f"{sender} {body}"))
+        with self._lock:
+            if sms_id in self._lengths:
+                return
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[sms_id] = tf
+            length = sum(terms.values())
+            self._lengths[sms_id] = length
+            self._timestamps[sms_id] = timestamp
+            self._sizes[sms_id] = len(sender) + min(len(body), 150)
+            self._total_length += length
+            self._last_id = max(self._last_id, sms_id)
+
+    def remove(self, sms_id: int, sender: str, body: str):
+        """Drop a deleted message (its text finds the postings); unknown ids are ignored"""
+        terms = set(tokenize(f"{sender} {body}"))
+        with self._lock:
+            length = self._lengths.pop(sms_id, None)
+            if length is None:
+                return
+            for term in terms:
+                postings = self._postings.get(term)
+                if postings is not None and postings.pop(sms_id, None) is not None and not postings:
+                    del self._postings[term]
+            del self._timestamps[sms_id]
+            del self._sizes[sms_id]
+            self._total_length -= length
+
+    def sync(self, db: Session):
+        """Index rows persisted since the last sync (e.g. by another worker)"""
+        rows = db.query(SMS.id, SMS.sender, SMS.body, SMS.timestamp).filter(
+            SMS.id > self._last_id
+        ).order_by(SMS.id).all()
+        for sms_id, sender, body, timestamp in rows:
+            self.add(sms_id, sender or "", body or "", timestamp)
+
+    def _in_window(self, sms_id: int, start: Optional[datetime], end: Optional[datetime]) -> bool:
+        timestamp = self._timestamps[sms_id]
+        return (start is None or timestamp >= start) and (end is None or timestamp <= end)
+
+    def search(self, query: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+               limit: int = 20, token_budget: Optional[int] = None) -> List[int]:
+        """Ids of the most relevant messages in the window, best first
+
+        Remaining slots are filled with the newest messages so broad
+        questions ("summarize today") still get context. With token_budget,
+        selection stops once the estimated prompt tokens would exceed it.
+        """
+        with self._lock:
+            n_docs = len(self._lengths)
+            if n_docs == 0:
+                return []
+            avg_length = self._total_length / n_docs
+
+            scores: Dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for sms_id, tf in postings.items():
+                    if not self._in_window(sms_id, start, end):
+                        continue
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._lengths[sms_id] / avg_length)
+                    scores[sms_id] = scores.get(sms_id, 0.0) + idf * tf * (self.k1 + 1) / norm
+
+            ranked = heapq.nlargest(limit, scores, key=lambda i: (scores[i], i))
+            if len(ranked) < limit:
+                seen = set(ranked)
+                ranked.extend(heapq.nlargest(
+                    limit - len(ranked),
+                    (i for i in self._timestamps if i not in seen and self._in_window(i, start, end)),
+                    key=lambda i: (self._timestamps[i], i),
+                ))
+
+            selected = []
+            used_tokens = 0
+            for sms_id in ranked[:limit]:
+                # ~4 characters per token plus the per-line metadata
+                cost = (self._sizes[sms_id] + 60) // 4
+                if token_budget is not None and selected and used_tokens + cost > token_budget:
+                    break
+                selected.append(sms_id)
+                used_tokens += cost
+            return selected
+
+
+# Singleton instance
+retrieval_index = RetrievalIndex()
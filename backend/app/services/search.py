@@ -0,0 +1,100 @@
+import re
+from datetime import datetime
+from typing import Dict, List, Optional
+from sqlalchemy import column, inspect, literal_column, select, table, text
+from sqlalchemy.orm import Session
+from app.core.database import FTS_TABLE
+from app.models.sms_model import SMS
+
+_TERM = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_match_expression(query: str) -> Optional[str]:
+    """Turn free text into a safe FTS5 MATCH expression (all terms, quoted)"""
+    terms = _TERM.findall(query)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms)
+
+
+def _like_pattern(term: str) -> str:
+    """%term% with LIKE wildcards in the term matched literally (use with escape='\\')"""
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+_fts_by_database: Dict[str, bool] = {}
+_fts = table(FTS_TABLE, column('rowid'))
+
+
+def fts_available(db: Session) -> bool:
+    """Whether the session's database has the FTS5 table (checked once per database)"""
+    bind = db.get_bind()
+    key = str(bind.url)
+    if key not in _fts_by_database:
+        _fts_by_database[key] = bind.dialect.name == "sqlite" and inspect(bind).has_table(FTS_TABLE)
+    return _fts_by_database[key]
+
+
+def search_messages(
+    db: Session,
+    query: str,
+    sender: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> Dict:
+    """Ranked full-text search over message bodies and senders
+
+    Uses the FTS5 index on SQLite (bm25 ranking and highlighted snippets)
+    and falls back to case-insensitive LIKE matching, newest first,
+    on other databases.
+    """
+    match = fts_match_expression(query)
+    if match is None:
+        return {'results': [], 'has_more': False}
+
+    columns = [SMS.id, SMS.sender, SMS.timestamp, SMS.category, SMS.is_threat]
+    if fts_available(db):
+        fts_rank = literal_column(f"bm25({FTS_TABLE})")
+        stmt = (
+            select(
+                *columns,
+                literal_column(f"snippet({FTS_TABLE}, 1, '[', ']', '…', 12)").label('snippet'),
+                fts_rank.label('rank'),
+            )
+            .select_from(_fts)
+            .join(SMS, SMS.id == _fts.c.rowid)
+            .where(text(f"{FTS_TABLE} MATCH :match").bindparams(match=match))
+            .order_by(fts_rank, SMS.id.desc())
+        )
+    else:
+        stmt = select(*columns, SMS.body.label('snippet'), literal_column("NULL").label('rank'))
+        for term in _TERM.findall(query):
+            pattern = _like_pattern(term)
+            stmt = stmt.where(SMS.body.ilike(pattern, escape="\\") | SMS.sender.ilike(pattern, escape="\\"))
+        stmt = stmt.order_by(SMS.timestamp.desc(), SMS.id.desc())
+
+    if sender:
+        stmt = stmt.where(SMS.sender == sender)
+    if start is not None:
+        stmt = stmt.where(SMS.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(SMS.timestamp <= end)
+
+    # Fetch one extra row to know whether another page exists
+    rows = db.execute(stmt.limit(limit + 1).offset(offset)).all()
+    results: List[Dict] = [
+        {
+            'id': row.id,
+            'sender': row.sender,
+            'timestamp': row.timestamp,
+            'category': row.category,
+            'is_threat': row.is_threat,
+            'snippet': row.snippet if row.rank is not None else (row.snippet or "")[:120],
+            'rank': row.rank,
+        }
+        for row in rows[:limit]
+    ]
+    return {'results': results, 'has_more': len(rows) > limit}
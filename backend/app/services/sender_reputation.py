@@ -0,0 +1,352 @@
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import String, case, cast, delete, func, insert, or_, select
+from sqlalchemy.orm import Session
+from app.core.config import settings
+from app.core.database import serialized_write
+from app.models.sms_model import SMS, SenderStats
+
+NEW = 'new'
+ESTABLISHED = 'established'
+TRUSTED = 'trusted'
+
+# Signals that trust never relaxes (SMSProcessor checks them for every
+# sender). Only messages flagged for one of them count against trust, so
+# plain links and a short-code sender ID do not keep a bank from earning it.
+SHORTENER_HOSTS = ('bit.ly', 'tinyurl', 'goo.gl', 't.co')
+MONEY_REQUEST_REASON = "Requests money transfer or urgent payment"
+IMPERSONATION_REASON = "Possible account impersonation or phishing"
+_SHORTENER_RE = re.compile("|".join(re.escape(host) for host in SHORTENER_HOSTS), re.IGNORECASE)
+
+
+def strong_threat(row: Dict) -> bool:
+    """Whether a stored verdict rests on a signal trust does not relax"""
+    if not row.get('is_threat'):
+        return False
+    reason = row.get('threat_reason') or ""
+    return (
+        MONEY_REQUEST_REASON in reason
+        or IMPERSONATION_REASON in reason
+        or any(_SHORTENER_RE.search(url) for url in row.get('urls') or [])
+    )
+
+
+def _strong_threat_clause():
+    """strong_threat() over the sms table, for rebuilds"""
+    reason = func.coalesce(SMS.threat_reason, '')
+    urls = func.lower(func.coalesce(cast(SMS.urls, String), ''))
+    return (SMS.is_threat == True) & or_(
+        reason.contains(MONEY_REQUEST_REASON),
+        reason.contains(IMPERSONATION_REASON),
+        *[urls.contains(host) for host in SHORTENER_HOSTS],
+    )
+
+
+class SenderReputation:
+    """Aggregated history of one sender"""
+    __slots__ = ('sender', 'message_count', 'threat_count', 'strong_threat_count', 'categories',
+                 'first_seen', 'last_seen')
+
+    def __init__(self, sender: str):
+        self.sender = sender
+        self.message_count = 0
+        self.threat_count = 0
+        self.strong_threat_count = 0  # flagged for a signal trust does not relax
+        self.categories: Dict[str, int] = {}
+        self.first_seen: Optional[datetime] = None
+        self.last_seen: Optional[datetime] = None
+
+    @property
+    def threat_rate(self) -> float:
+        return self.threat_count / self.message_count if self.message_count else 0.0
+
+    @property
+    def strong_threat_rate(self) -> float:
+        return self.strong_threat_count / self.message_count if self.message_count else 0.0
+
+    def add(self, category: str, count: int, threats: int, strong_threats: int,
+            first_seen: datetime, last_seen: datetime):
+        self.message_count += count
+        self.threat_count += threats
+        self.strong_threat_count += strong_threats
+        self.categories[category] = self.categories.get(category, 0) + count
+        self.first_seen = first_seen if self.first_seen is None else min(self.first_seen, first_seen)
+        self.last_seen = last_seen if self.last_seen is None else max(self.last_seen, last_seen)
+
+
+def _counts(rows: Iterable[Dict]) -> Dict[Tuple[str, str], List]:
+    """Aggregate processed messages into {(sender, category): [count, threats, strong threats, first, last]}"""
+    counts: Dict[Tuple[str, str], List] = {}
+    for row in rows:
+        key = (row['sender'], row['category'] or 'uncategorized')
+        timestamp = row['timestamp']
+        threat, strong = int(bool(row['is_threat'])), int(strong_threat(row))
+        entry = counts.get(key)
+        if entry is None:
+            counts[key] = [1, threat, strong, timestamp, timestamp]
+        else:
+            entry[0] += 1
+            entry[1] += threat
+            entry[2] += strong
+            entry[3] = min(entry[3], timestamp)
+            entry[4] = max(entry[4], timestamp)
+    return counts
+
+
+class SenderReputationStore:
+    """Per-sender message counts, category mix, threat rate and first/last seen
+
+    The sender_stats table is the source of truth and is written in the
+    ingest transaction (like the daily digest counters). A bounded LRU of
+    aggregated reputations serves SMSProcessor lookups without touching the
+    database; entries are refreshed from the table after each commit.
+    """
+
+    def __init__(self, max_entries: int, min_messages: int, max_threat_rate: float):
+        self.max_entries = max_entries
+        self.min_messages = min_messages
+        self.max_threat_rate = max_threat_rate
+        self._entries: "OrderedDict[str, SenderReputation]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def lookup(self, sender: str) -> Optional[SenderReputation]:
+        """Cached reputation, or None for senders not in memory"""
+        with self._lock:
+            reputation = self._entries.get(sender)
+            if reputation is not None:
+                self._entries.move_to_end(sender)
+            return reputation
+
+    def status(self, reputation: Optional[SenderReputation]) -> str:
+        """new, established (enough history) or trusted (enough history, strong threat rate at most the limit)
+
+        The rate only counts strong signals (see strong_threat): the plain
+        links and sender ID that trust relaxes would otherwise keep every
+        new short-code sender from earning it. Only trusted senders get
+        relaxed checks; established senders stay on the full rules, like
+        new ones.
+        """
+        if reputation is None or self.min_messages <= 0 or reputation.message_count < self.min_messages:
+            return NEW
+        if reputation.strong_threat_rate <= self.max_threat_rate:
+            return TRUSTED
+        return ESTABLISHED
+
+    def _put(self, reputation: SenderReputation):
+        self._entries[reputation.sender] = reputation
+        self._entries.move_to_end(reputation.sender)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record(self, db: Session, rows: Iterable[Dict], sign: int = 1):
+        """Add processed messages to sender_stats in the caller's transaction
+
+        sign=-1 takes deleted messages back out; first/last seen keep their
+        bounds since the remaining messages are not rescanned.
+        """
+        counts = _counts(rows)
+        if not counts:
+            return
+
+        values = [
+            {
+                'sender': sender, 'category': category, 'count': sign * count, 'threat_count': sign * threats,
+                'strong_threat_count': sign * strong, 'first_seen': first_seen, 'last_seen': last_seen,
+            }
+            for (sender, category), (count, threats, strong, first_seen, last_seen) in counts.items()
+        ]
+        dialect = db.get_bind().dialect.name
+        if dialect in ('sqlite', 'postgresql'):
+            if dialect == 'sqlite':
+                from sqlalchemy.dialects.sqlite import insert as upsert
+                earliest, latest = func.min, func.max  # two-argument scalar forms
+            else:
+                from sqlalchemy.dialects.postgresql import insert as upsert
+                earliest, latest = func.least, func.greatest
+            stmt = upsert(SenderStats)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[SenderStats.sender, SenderStats.category],
+                set_={
+                    'count': SenderStats.count + stmt.excluded.count,
+                    'threat_count': SenderStats.threat_count + stmt.excluded.threat_count,
+                    'strong_threat_count': SenderStats.strong_threat_count + stmt.excluded.strong_threat_count,
+                    'first_seen': earliest(SenderStats.first_seen, stmt.excluded.first_seen),
+                    'last_seen': latest(SenderStats.last_seen, stmt.excluded.last_seen),
+                },
+            )
+            db.execute(stmt, values)
+        else:
+            # Generic read-modify-write for other backends
+            for value in values:
+                row = db.get(SenderStats, (value['sender'], value['category']))
+                if row is None:
+                    db.add(SenderStats(**value))
+                else:
+                    row.count += value['count']
+                    row.threat_count += value['threat_count']
+                    if row.strong_threat_count is not None:
+                        row.strong_threat_count += value['strong_threat_count']
+                    row.first_seen = min(row.first_seen, value['first_seen'])
+                    row.last_seen = max(row.last_seen, value['last_seen'])
+            db.flush()
+        if sign < 0:
+            db.execute(delete(SenderStats).where(SenderStats.count <= 0))
+
+    def refresh(self, db: Session, rows: Iterable[Dict]):
+        """Update the cache after `record` committed
+
+        Cached senders get the new counts applied in memory; others are
+        loaded from the table so the cache reflects every worker's writes.
+        """
+        counts = _counts(rows)
+        missing = set()
+        with self._lock:
+            for (sender, category), (count, threats, strong, first_seen, last_seen) in counts.items():
+                reputation = self._entries.get(sender)
+                if reputation is None:
+                    missing.add(sender)
+                else:
+                    reputation.add(category, count, threats, strong, first_seen, last_seen)
+        if missing:
+            loaded = self.load(db, missing)
+            with self._lock:
+                for reputation in loaded.values():
+                    self._put(reputation)
+
+    def reload(self, db: Session, senders: Iterable[str]):
+        """Replace cached entries with the committed table state (after deletes)"""
+        senders = set(senders)
+        loaded = self.load(db, senders)
+        with self._lock:
+            for sender in senders:
+                if sender in loaded:
+                    self._put(loaded[sender])
+                else:
+                    self._entries.pop(sender, None)
+
+    def load(self, db: Session, senders: Optional[Iterable[str]] = None) -> Dict[str, SenderReputation]:
+        """Aggregate sender_stats rows (for the given senders, or all)"""
+        stmt = select(SenderStats)
+        if senders is not None:
+            stmt = stmt.where(SenderStats.sender.in_(list(senders)))
+        reputations: Dict[str, SenderReputation] = {}
+        for row in db.execute(stmt).scalars():
+            reputation = reputations.get(row.sender)
+            if reputation is None:
+                reputation = reputations[row.sender] = SenderReputation(row.sender)
+            # Rows from before strong threats were counted: every threat counts
+            strong = row.threat_count if row.strong_threat_count is None else row.strong_threat_count
+            reputation.add(row.category, row.count, row.threat_count, strong, row.first_seen, row.last_seen)
+        return reputations
+
+    def warm(self, db: Session) -> int:
+        """Fill the cache with the most recently active senders (on startup)"""
+        recent = (
+            select(SenderStats.sender)
+            .group_by(SenderStats.sender)
+            .order_by(func.max(SenderStats.last_seen).desc())
+            .limit(self.max_entries)
+        )
+        senders = list(db.execute(recent).scalars())
+        loaded = self.load(db, senders)
+        with self._lock:
+            for sender in reversed(senders):
+                self._put(loaded[sender])
+        return len(loaded)
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute sender_stats from the sms table; returns rows written"""
+        category = func.coalesce(SMS.category, 'uncategorized')
+        stmt = select(
+            SMS.sender,
+            category.label('category'),
+            func.count().label('count'),
+            func.sum(case((SMS.is_threat == True, 1), else_=0)).label('threat_count'),
+            func.sum(case((_strong_threat_clause(), 1), else_=0)).label('strong_threat_count'),
+            func.min(SMS.timestamp).label('first_seen'),
+            func.max(SMS.timestamp).label('last_seen'),
+        ).where(SMS.sender.is_not(None)).group_by(SMS.sender, category)
+
+        with serialized_write(db.get_bind()):
+            values = [
+                {
+                    'sender': row.sender, 'category': row.category, 'count': row.count,
+                    'threat_count': row.threat_count or 0,
+                    'strong_threat_count': row.strong_threat_count or 0,
+                    'first_seen': row.first_seen, 'last_seen': row.last_seen,
+                }
+                for row in db.execute(stmt).all()
+            ]
+            db.execute(delete(SenderStats))
+            if values:
+                db.execute(insert(SenderStats), values)
+            db.commit()
+        self.clear()
+        return len(values)
+
+    def ensure_backfilled(self, db: Session) -> bool:
+        """Rebuild once if the table is empty (or predates strong threat counts) but messages exist"""
+        has_stats = db.execute(select(SenderStats.sender).limit(1)).first() is not None
+        outdated = db.execute(
+            select(SenderStats.sender).where(SenderStats.strong_threat_count.is_(None)).limit(1)
+        ).first() is not None
+        has_messages = db.execute(select(SMS.id).limit(1)).first() is not None
+        if (has_stats and not outdated) or not has_messages:
+            return False
+        self.rebuild(db)
+        return True
+
+    def describe(self, reputation: SenderReputation) -> Dict:
+        return {
+            'sender': reputation.sender,
+            'message_count': reputation.message_count,
+            'threat_count': reputation.threat_count,
+            'threat_rate': round(reputation.threat_rate, 4),
+            'categories': dict(sorted(reputation.categories.items(), key=lambda item: -item[1])),
+            'first_seen': reputation.first_seen,
+            'last_seen': reputation.last_seen,
+            'status': self.status(reputation),
+        }
+
+    def list_senders(self, db: Session, sort: str = 'count', limit: int = 50, offset: int = 0) -> List[Dict]:
+        """Senders ordered by message count, threat count or last seen (descending)"""
+        message_count = func.sum(SenderStats.count)
+        order = {
+            'count': message_count,
+            'threats': func.sum(SenderStats.threat_count),
+            'last_seen': func.max(SenderStats.last_seen),
+        }[sort]
+        page = list(db.execute(
+            select(SenderStats.sender)
+            .group_by(SenderStats.sender)
+            .order_by(order.desc(), SenderStats.sender)
+            .limit(limit)
+            .offset(offset)
+        ).scalars())
+        loaded = self.load(db, page)
+        return [self.describe(loaded[sender]) for sender in page]
+
+    def get(self, db: Session, sender: str) -> Optional[Dict]:
+        reputation = self.load(db, [sender]).get(sender)
+        return self.describe(reputation) if reputation is not None else None
+
+    def stats(self) -> Dict:
+        return {'cached_senders': len(self._entries), 'capacity': self.max_entries}
+
+
+# Singleton instance
+sender_reputation = SenderReputationStore(
+    max_entries=settings.sender_cache_size,
+    min_messages=settings.sender_trust_min_messages,
+    max_threat_rate=settings.sender_trust_max_threat_rate,
+)
@@ -1,7 +1,14 @@
 import re
-from typing import List, Dict, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Dict, Optional, Tuple
 from datetime import datetime
+from app.core.config import settings
+from app.core.metrics import metrics
 from app.models.sms_model import SMS
+from app.services.templates import TemplateCache, template_id
+from app.services.sender_reputation import (
+    IMPERSONATION_REASON, MONEY_REQUEST_REASON, SHORTENER_HOSTS, TRUSTED, SenderReputationStore, sender_reputation,
+)
 
 class SMSProcessor:
     """Rule-based SMS processor for classification, entity extraction, and threat detection"""
@@ -31,9 +38,9 @@ class SMSProcessor:
     }
     
     # Threat patterns
+    URL_SHORTENERS = [re.escape(host) for host in SHORTENER_HOSTS]
     THREAT_PATTERNS = {
-        'suspicious_links': [
-            r'bit\.ly', r'tinyurl', r'goo\.gl', r't\.co',  # URL shorteners
+        'suspicious_links': URL_SHORTENERS + [
             r'http[s]?://[^\s]+',  # Generic URLs
         ],
         'money_request': [
@@ -53,21 +60,48 @@ class SMSProcessor:
         r'^\d{5,}$',  # Long numeric senders
     ]
     
-    def classify(self, body: str) -> str:
-        """Classify SMS into category"""
-        body_lower = body.lower()
+    # Minimum number of distinct bodies before process_many uses a process pool
+    PARALLEL_MIN_BODIES = 5000
+    
+    SUSPICIOUS_LINK_REASON = "Contains suspicious shortened URL"
+    
+    URL_PATTERN = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
+    
+    def __init__(self, reputation: Optional[SenderReputationStore] = None):
+        # Sender history used to weight threat scoring (None: rules only)
+        self.reputation = reputation
+        # Analysis memoized per body template (digit runs masked, see templates.skeleton)
+        self.templates = TemplateCache(settings.template_cache_size)
         
-        # Check OTP first (highest priority)
-        for pattern in self.CATEGORY_KEYWORDS['otp']:
-            if re.search(pattern, body_lower, re.IGNORECASE):
-                return 'otp'
+        # Compile every rule once; per-message work is then a single pass per rule
+        self._url_re = re.compile(self.URL_PATTERN)
+        self._otp_re = self._compile_any(self.CATEGORY_KEYWORDS['otp'])
+        self._category_res = [
+            (category, [re.compile(pattern, re.IGNORECASE) for pattern in patterns])
+            for category, patterns in self.CATEGORY_KEYWORDS.items()
+            if category != 'otp'
+        ]
+        self._suspicious_link_re = self._compile_any(self.THREAT_PATTERNS['suspicious_links'])
+        self._shortener_re = self._compile_any(self.URL_SHORTENERS)
+        self._money_request_re = self._compile_any(self.THREAT_PATTERNS['money_request'])
+        self._impersonation_re = self._compile_any(self.THREAT_PATTERNS['impersonation'])
+        self._suspicious_sender_re = self._compile_any(self.SUSPICIOUS_SENDERS, flags=0)
+    
+    @staticmethod
+    def _compile_any(patterns: List[str], flags: int = re.IGNORECASE) -> re.Pattern:
+        """Compile a rule list into one alternation that matches if any rule matches"""
+        return re.compile("|".join(f"(?:{pattern})" for pattern in patterns), flags)
+    
+    @metrics.timed('classify')
+    def _classify_lower(self, body_lower: str, is_otp: bool) -> str:
+        """Classify an already lower-cased body"""
+        # OTP has the highest priority
+        if is_otp:
+            return 'otp'
         
-        # Check other categories
         category_scores = {}
-        for category, patterns in self.CATEGORY_KEYWORDS.items():
-            if category == 'otp':
-                continue
-            score = sum(1 for pattern in patterns if re.search(pattern, body_lower, re.IGNORECASE))
+        for category, patterns in self._category_res:
+            score = sum(1 for pattern in patterns if pattern.search(body_lower))
             if score > 0:
                 category_scores[category] = score
         
@@ -76,41 +110,122 @@ class SMSProcessor:
         
         return 'promotional'
     
+    @metrics.timed('threat_detection')
+    def _body_threat_reasons(self, urls: List[str], body_lower: str, is_money_request: bool) -> List[str]:
+        """Collect the threat reasons that depend only on the message body"""
+        reasons = []
+        
+        # Check for suspicious links
+        for url in urls:
+            if self._suspicious_link_re.search(url):
+                reasons.append(self.SUSPICIOUS_LINK_REASON)
+        
+        if is_money_request:
+            reasons.append(MONEY_REQUEST_REASON)
+        
+        if self._impersonation_re.search(body_lower):
+            reasons.append(IMPERSONATION_REASON)
+        
+        return reasons
+    
+    def _threat_reasons(self, sender: str, body_reasons: List[str]) -> List[str]:
+        """Append the sender check to the body threat reasons"""
+        if self._suspicious_sender_re.match(sender):
+            return body_reasons + ["Suspicious sender ID"]
+        return body_reasons
+    
+    def _analyze_body(self, body: str) -> Dict:
+        """Scan a body once; the result is independent of the sender and can be shared
+        
+        Threat reasons are filled in by `_body_reasons` on first use.
+        """
+        body_lower = body.lower()
+        urls = self._url_re.findall(body)
+        is_otp = self._otp_re.search(body_lower) is not None
+        is_money_request = self._money_request_re.search(body_lower) is not None
+        
+        return {
+            'category': self._classify_lower(body_lower, is_otp),
+            'urls': urls,
+            'body_lower': body_lower,
+            'body_reasons': None,
+            'has_money_request': is_money_request,
+            'has_otp': is_otp,
+        }
+    
+    def _scan(self, body: str) -> Dict:
+        """`_analyze_body` through the template cache
+        
+        Messages sharing a template reuse the first one's category, flags
+        and threat reasons; only URL extraction and fingerprinting run per
+        message.
+        """
+        urls = self._url_re.findall(body)
+        tid = template_id(body)
+        scan = self.templates.get(tid)
+        if scan is None:
+            scan = self._analyze_body(body)
+            self._body_reasons(scan)
+            self.templates.put(tid, scan)
+        return {**scan, 'urls': urls, 'template_id': tid}
+    
+    def _body_reasons(self, body_result: Dict) -> List[str]:
+        if body_result['body_reasons'] is None:
+            body_result['body_reasons'] = self._body_threat_reasons(
+                body_result['urls'], body_result['body_lower'], body_result['has_money_request']
+            )
+        return body_result['body_reasons']
+    
+    def _combine(self, sender: str, body_result: Dict) -> Dict:
+        """Merge a body scan with the sender check into the final verdict
+        
+        For trusted senders (long history, few strong threats) plain links
+        and the sender-ID pattern no longer count; shortened URLs, money
+        requests and phishing wording always do, so a trusted sender that
+        starts sending them is flagged and its strong threat rate rises
+        until the trust is lost. Everyone else gets the full rules.
+        """
+        status = self.reputation.status(self.reputation.lookup(sender)) if self.reputation is not None else None
+        if status == TRUSTED:
+            shortened = [self.SUSPICIOUS_LINK_REASON for url in body_result['urls'] if self._shortener_re.search(url)]
+            reasons = shortened + [
+                reason for reason in self._body_reasons(body_result) if reason != self.SUSPICIOUS_LINK_REASON
+            ]
+        else:
+            reasons = self._threat_reasons(sender, self._body_reasons(body_result))
+        
+        return {
+            'category': body_result['category'],
+            'is_threat': len(reasons) > 0,
+            'threat_reason': "; ".join(reasons) if reasons else None,
+            'urls': list(body_result['urls']),
+            'has_money_request': body_result['has_money_request'],
+            'has_otp': body_result['has_otp'],
+            'template_id': body_result.get('template_id'),
+        }
+    
+    def analyze(self, sender: str, body: str) -> Dict:
+        """Scan a message once and return category, URLs, threat verdict and flags"""
+        return self._combine(sender, self._scan(body))
+    
+    def classify(self, body: str) -> str:
+        """Classify SMS into category"""
+        body_lower = body.lower()
+        return self._classify_lower(body_lower, self._otp_re.search(body_lower) is not None)
+    
     def extract_urls(self, body: str) -> List[str]:
         """Extract all URLs from message"""
-        url_pattern = r'http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+'
-        return re.findall(url_pattern, body)
+        return self._url_re.findall(body)
     
     def detect_threat(self, sender: str, body: str) -> tuple[bool, Optional[str]]:
         """Detect if message is a potential threat"""
-        reasons = []
         body_lower = body.lower()
-        
-        # Check for suspicious links
-        urls = self.extract_urls(body)
-        for url in urls:
-            for pattern in self.THREAT_PATTERNS['suspicious_links']:
-                if re.search(pattern, url, re.IGNORECASE):
-                    reasons.append("Contains suspicious shortened URL")
-                    break
-        
-        # Check for money request patterns
-        for pattern in self.THREAT_PATTERNS['money_request']:
-            if re.search(pattern, body_lower, re.IGNORECASE):
-                reasons.append("Requests money transfer or urgent payment")
-                break
-        
-        # Check for impersonation patterns
-        for pattern in self.THREAT_PATTERNS['impersonation']:
-            if re.search(pattern, body_lower, re.IGNORECASE):
-                reasons.append("Possible account impersonation or phishing")
-                break
-        
-        # Check suspicious sender
-        for pattern in self.SUSPICIOUS_SENDERS:
-            if re.match(pattern, sender):
-                reasons.append("Suspicious sender ID")
-                break
+        body_reasons = self._body_threat_reasons(
+            self.extract_urls(body),
+            body_lower,
+            self._money_request_re.search(body_lower) is not None,
+        )
+        reasons = self._threat_reasons(sender, body_reasons)
         
         is_threat = len(reasons) > 0
         threat_reason = "; ".join(reasons) if reasons else None
@@ -119,39 +234,89 @@ class SMSProcessor:
     
     def has_money_request(self, body: str) -> bool:
         """Check if message contains money request"""
-        body_lower = body.lower()
-        for pattern in self.THREAT_PATTERNS['money_request']:
-            if re.search(pattern, body_lower, re.IGNORECASE):
-                return True
-        return False
+        return self._money_request_re.search(body.lower()) is not None
     
     def has_otp(self, body: str) -> bool:
         """Check if message contains OTP"""
-        for pattern in self.CATEGORY_KEYWORDS['otp']:
-            if re.search(pattern, body.lower(), re.IGNORECASE):
-                return True
-        return False
+        return self._otp_re.search(body.lower()) is not None
+    
+    def _build_record(self, sender: str, body: str, timestamp: datetime, result: Dict) -> Dict:
+        """Shape an analysis result into the dict stored on the SMS model"""
+        return {
+            'sender': sender,
+            'body': body,
+            'timestamp': timestamp,
+            'category': result['category'],
+            'is_threat': result['is_threat'],
+            'threat_reason': result['threat_reason'],
+            'urls': result['urls'] if result['urls'] else None,
+            'has_money_request': result['has_money_request'],
+            'has_otp': result['has_otp'],
+            'template_id': result['template_id'],
+        }
     
     def process_message(self, sender: str, body: str, timestamp: Optional[datetime] = None) -> Dict:
         """Process a single SMS message"""
         if timestamp is None:
             timestamp = datetime.utcnow()
         
-        category = self.classify(body)
-        urls = self.extract_urls(body)
-        is_threat, threat_reason = self.detect_threat(sender, body)
+        return self._build_record(sender, body, timestamp, self.analyze(sender, body))
+    
+    def process_many(
+        self,
+        messages: Iterable[Tuple[str, str, Optional[datetime]]],
+        workers: Optional[int] = None,
+    ) -> List[Dict]:
+        """Process a batch of (sender, body, timestamp) tuples in one call
         
-        return {
-            'sender': sender,
-            'body': body,
-            'timestamp': timestamp,
-            'category': category,
-            'is_threat': is_threat,
-            'threat_reason': threat_reason,
-            'urls': urls if urls else None,
-            'has_money_request': self.has_money_request(body),
-            'has_otp': self.has_otp(body),
+        Each distinct body is fingerprinted once and each template not
+        already in the cache is scanned once, so templated bank/OTP traffic
+        costs one scan per template. With workers > 1 and enough new
+        templates, scanning fans out to a process pool.
+        """
+        messages = list(messages)
+        unique_bodies = list(dict.fromkeys(body for _, body, _ in messages))
+        
+        fingerprints = {}
+        scans = {}
+        pending = {}  # template id -> first body using it
+        for body in unique_bodies:
+            urls = self._url_re.findall(body)
+            tid = template_id(body)
+            fingerprints[body] = (urls, tid)
+            if tid in scans or tid in pending:
+                continue
+            cached = self.templates.get(tid)
+            if cached is not None:
+                scans[tid] = cached
+            else:
+                pending[tid] = body
+        
+        new_bodies = list(pending.values())
+        if workers is None:
+            workers = settings.batch_process_workers
+        if workers > 1 and len(new_bodies) >= self.PARALLEL_MIN_BODIES:
+            chunk_size = max(1, len(new_bodies) // (workers * 4))
+            chunks = [new_bodies[i:i + chunk_size] for i in range(0, len(new_bodies), chunk_size)]
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                new_scans = [scan for chunk_scans in pool.map(_analyze_bodies, chunks) for scan in chunk_scans]
+        else:
+            new_scans = [self._analyze_body(body) for body in new_bodies]
+        for tid, scan in zip(pending, new_scans):
+            self._body_reasons(scan)
+            self.templates.put(tid, scan)
+            scans[tid] = scan
+        
+        body_results = {
+            body: {**scans[tid], 'urls': urls, 'template_id': tid}
+            for body, (urls, tid) in fingerprints.items()
         }
+        
+        now = datetime.utcnow()
+        return [
+            self._build_record(sender, body, timestamp or now, self._combine(sender, body_results[body]))
+            for sender, body, timestamp in messages
+        ]
     
     def generate_digest(self, messages: List[SMS], date: str) -> Dict:
         """Generate daily digest from messages"""
@@ -188,6 +353,28 @@ class SMSProcessor:
             'threat_count': threat_count
         }
     
+    def digest_from_counts(self, category_counts: Dict[str, int], threat_count: int, date: str) -> Dict:
+        """Build the daily digest from precomputed per-category counts"""
+        categories = [
+            {
+                'category': category,
+                'count': count,
+                'summary': self._generate_category_summary(category, count, [])
+            }
+            for category, count in category_counts.items()
+            if count > 0
+        ]
+        
+        # Sort by count descending
+        categories.sort(key=lambda x: x['count'], reverse=True)
+        
+        return {
+            'date': date,
+            'total_messages': sum(category_counts.values()),
+            'categories': categories,
+            'threat_count': threat_count
+        }
+    
     def _generate_category_summary(self, category: str, count: int, messages: List[SMS]) -> str:
         """Generate a one-line summary for a category"""
         templates = {
@@ -202,4 +389,11 @@ class SMSProcessor:
         return templates.get(category, f"{count} {category} messages")
 
 # Singleton instance
-sms_processor = SMSProcessor()
+sms_processor = SMSProcessor(reputation=sender_reputation)
+
+def _analyze_bodies(bodies: List[str]) -> List[Dict]:
+    """Process-pool entry point: scan a chunk of bodies with the worker's singleton"""
+    scans = [sms_processor._analyze_body(body) for body in bodies]
+    for scan in scans:
+        sms_processor._body_reasons(scan)
+    return scans
@@ -0,0 +1,87 @@
+from datetime import datetime
+from typing import Dict, Iterable, List
+from sqlalchemy import delete, false, func, insert, literal, select
+from sqlalchemy.orm import Session
+from app.core.database import serialized_write
+from app.models.sms_model import SMS, SMSChange
+
+# The change log is compacted to the latest change per message, so a
+# client's delta holds each message at most once and a full sync (since=0)
+# is one row per stored message plus the tombstones.
+
+
+def _append(db: Session, sms_ids: List[int], deleted: bool):
+    now = datetime.utcnow()
+    db.execute(insert(SMSChange), [
+        {'sms_id': sms_id, 'deleted': deleted, 'changed_at': now} for sms_id in sms_ids
+    ])
+
+
+def record_inserted(db: Session, sms_ids: Iterable[int]):
+    """Log newly inserted messages in the caller's transaction"""
+    sms_ids = list(sms_ids)
+    if sms_ids:
+        _append(db, sms_ids, deleted=False)
+
+
+def record_deleted(db: Session, sms_ids: Iterable[int]):
+    """Replace the entries of deleted messages with tombstones in the caller's transaction"""
+    sms_ids = list(sms_ids)
+    if sms_ids:
+        db.execute(delete(SMSChange).where(SMSChange.sms_id.in_(sms_ids)))
+        _append(db, sms_ids, deleted=True)
+
+
+def latest_cursor(db: Session) -> int:
+    return db.execute(select(func.max(SMSChange.seq))).scalar() or 0
+
+
+def changes_since(db: Session, since: int = 0, limit: int = 500) -> Dict:
+    """Messages inserted and ids deleted after cursor `since`
+
+    Pages hold at most `limit` changes in log order; `cursor` is the value
+    to send next time and `has_more` says whether to ask again straight
+    away. A cursor from the future (the database was replaced) answers
+    `reset` so the client drops its copy and syncs from 0.
+    """
+    if since > latest_cursor(db):
+        return {'cursor': 0, 'changes': [], 'deleted': [], 'has_more': False, 'reset': True}
+
+    log = db.execute(
+        select(SMSChange.seq, SMSChange.sms_id, SMSChange.deleted)
+        .where(SMSChange.seq > since).order_by(SMSChange.seq).limit(limit + 1)
+    ).all()
+    has_more = len(log) > limit
+    log = log[:limit]
+
+    upserted = [entry.sms_id for entry in log if not entry.deleted]
+    messages = {
+        sms.id: sms for sms in db.execute(select(SMS).where(SMS.id.in_(upserted))).scalars()
+    } if upserted else {}
+    return {
+        'cursor': log[-1].seq if log else since,
+        # A message can be missing here if it was deleted outside the API
+        'changes': [messages[sms_id] for sms_id in upserted if sms_id in messages],
+        'deleted': [entry.sms_id for entry in log if entry.deleted],
+        'has_more': has_more,
+        'reset': False,
+    }
+
+
+def backfill(db: Session) -> int:
+    """Log every stored message once when the log is empty (first start after upgrade)
+
+    Returns the number of messages logged.
+    """
+    has_log = db.execute(select(SMSChange.seq).limit(1)).first() is not None
+    if has_log:
+        return 0
+    with serialized_write(db.get_bind()):
+        result = db.execute(
+            insert(SMSChange).from_select(
+                ['sms_id', 'deleted', 'changed_at'],
+                select(SMS.id, false(), literal(datetime.utcnow(), SMSChange.changed_at.type)).order_by(SMS.id),
+            )
+        )
+        db.commit()
+    return result.rowcount or 0
@@ -0,0 +1,154 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from sqlalchemy import bindparam, func, select, update
+from sqlalchemy.orm import Session
+from app.core.database import serialized_write
+from app.models.sms_model import SMS
+
+# Maximal runs of digits that are all ASCII; runs with other Unicode digits stay verbatim
+_DIGITS = re.compile(r'(?<!\d)[0-9]+(?!\d)')
+
+
+def _mask_digits(match: re.Match) -> str:
+    # The OTP rule counts runs of exactly 4-6 digits, so that length survives masking
+    return "<code>" if 4 <= len(match.group(0)) <= 6 else "<n>"
+
+
+def skeleton(body: str) -> str:
+    """Body with its digit runs masked: "Your OTP is <code>, valid <n> mins"
+
+    Everything a classification or threat rule can see is kept: case,
+    whitespace (`.` stops at newlines), separators such as the space in
+    "rs 500", and whether a run has 4-6 digits. Two bodies with the same
+    skeleton therefore get the same verdict. A literal "<" is doubled so
+    text can never be mistaken for a mask.
+    """
+    return _DIGITS.sub(_mask_digits, body.replace("<", "<<"))
+
+
+def template_id(body: str) -> str:
+    """Stable 16-hex-digit id of the body's skeleton"""
+    return hashlib.blake2b(skeleton(body).encode("utf-8"), digest_size=8).hexdigest()
+
+
+class TemplateCache:
+    """Bounded LRU of per-template analysis results"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: Dict):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'capacity': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+def group_by_template(db: Session, start=None, end=None, category: Optional[str] = None,
+                      limit: int = 20) -> List[Dict]:
+    """Most frequent templates in a window, each with a recent example"""
+    count = func.count(SMS.id)
+    stmt = (
+        select(SMS.template_id, count.label('count'), func.max(SMS.id).label('latest_id'),
+               func.count(func.distinct(SMS.sender)).label('senders'))
+        .where(SMS.template_id.is_not(None))
+        .group_by(SMS.template_id)
+        .order_by(count.desc(), SMS.template_id)
+        .limit(limit)
+    )
+    if start is not None:
+        stmt = stmt.where(SMS.timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(SMS.timestamp <= end)
+    if category:
+        stmt = stmt.where(SMS.category == category)
+
+    groups = db.execute(stmt).all()
+    examples = {
+        sms.id: sms
+        for sms in db.execute(select(SMS).where(SMS.id.in_([g.latest_id for g in groups]))).scalars()
+    }
+    results = []
+    for group in groups:
+        example = examples[group.latest_id]
+        results.append({
+            'template_id': group.template_id,
+            'count': group.count,
+            'senders': group.senders,
+            'category': example.category,
+            'is_threat': example.is_threat,
+            'example_sender': example.sender,
+            'example': example.body,
+            'last_seen': example.timestamp,
+        })
+    return results
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """Fill template_id on rows stored without one; returns rows updated
+
+    If the newest fingerprinted row no longer matches its body (the
+    skeleton rules changed since it was stored), every row is
+    fingerprinted again.
+    """
+    newest = db.execute(
+        select(SMS.body, SMS.template_id).where(SMS.template_id.is_not(None)).order_by(SMS.id.desc()).limit(1)
+    ).first()
+    if newest is not None and newest.template_id != template_id(newest.body or ""):
+        with serialized_write(db.get_bind()):
+            db.execute(update(SMS).values(template_id=None))
+            db.commit()
+
+    updated = 0
+    while True:
+        rows = db.execute(
+            select(SMS.id, SMS.body).where(SMS.template_id.is_(None)).order_by(SMS.id).limit(batch_size)
+        ).all()
+        if not rows:
+            return updated
+        values = [{'sms_id': row.id, 'tid': template_id(row.body or "")} for row in rows]
+        table = SMS.__table__
+        with serialized_write(db.get_bind()):
+            db.connection().execute(
+                update(table).where(table.c.id == bindparam('sms_id')).values(template_id=bindparam('tid')),
+                values,
+            )
+            db.commit()
+        updated += len(values)
@@ -0,0 +1,49 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.orm import sessionmaker
+from app.main import app
+from app.core.database import build_engine, get_db, init_db
+from app.services.digest_summarizer import digest_summarizer
+from app.services.read_cache import read_cache
+from app.services.retrieval import retrieval_index
+from app.services.sender_reputation import sender_reputation
+from app.services.sms_processor import sms_processor
+
+
+@pytest.fixture
+def session_factory(tmp_path):
+    """Sessions bound to a throwaway SQLite database"""
+    engine = build_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    init_db(engine)
+    sender_reputation.clear()
+    sms_processor.templates.clear()
+    digest_summarizer.clear()
+    read_cache.clear()
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    sender_reputation.clear()
+    sms_processor.templates.clear()
+    digest_summarizer.clear()
+    read_cache.clear()
+    engine.dispose()
+
+
+@pytest.fixture
+def api(session_factory):
+    """App with get_db pointed at the throwaway database"""
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = override_get_db
+    retrieval_index.clear()
+    yield app
+    app.dependency_overrides.clear()
+    retrieval_index.clear()
+
+
+@pytest.fixture
+def client(api):
+    return TestClient(api)
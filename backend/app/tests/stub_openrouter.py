@@ -0,0 +1,112 @@
+"""Local stand-in for the OpenRouter chat-completions endpoint"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):
+        payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        model = payload.get("model")
+        stub = self.server.stub
+        delay, status, content = stub.behaviors.get(model, stub.default)
+        with stub.lock:
+            stub.calls.append(model)
+            stub.prompts.append(payload["messages"][-1]["content"])
+            stub.client_ports.add(self.client_address[1])
+
+        if payload.get("stream") and status == 200:
+            self._stream(content, delay)
+            return
+
+        time.sleep(delay)
+        if status == 200:
+            body = {
+                "id": "stub",
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+            }
+        else:
+            body = {"error": {"code": status, "message": content}}
+        data = json.dumps(body).encode()
+
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            # Client cancelled (e.g. a losing hedged request)
+            pass
+
+    def _stream(self, content: str, delay: float):
+        """SSE chunks like OpenRouter's stream mode: a comment, reasoning deltas, then content word by word"""
+        def chunk(delta):
+            return {"id": "stub", "choices": [{"index": 0, "delta": delta}]}
+
+        events = [": OPENROUTER PROCESSING", chunk({"role": "assistant", "reasoning": "thinking..."})]
+        words = content.split(" ")
+        events += [chunk({"content": word if i == 0 else " " + word}) for i, word in enumerate(words)]
+        events += [
+            {"id": "stub", "choices": [], "usage": {"prompt_tokens": 10, "completion_tokens": len(words)}},
+            "[DONE]",
+        ]
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, event in enumerate(events):
+                if i == 2:
+                    time.sleep(delay)  # delay applies to the first answer token
+                line = event if isinstance(event, str) and event.startswith(":") else (
+                    f"data: {event if isinstance(event, str) else json.dumps(event)}"
+                )
+                data = (line + "\n\n").encode()
+                self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+
+class StubOpenRouter:
+    """Threaded HTTP server answering chat completions per model
+
+    behaviors maps a model name to (delay seconds, HTTP status, content).
+    Streamed requests get the delay before the first content token.
+    """
+
+    def __init__(self, default: Tuple[float, int, str] = (0.0, 200, "stub answer")):
+        self.behaviors: Dict[str, Tuple[float, int, str]] = {}
+        self.default = default
+        self.calls = []
+        self.prompts = []
+        self.client_ports = set()
+        self.lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}/api/v1/chat/completions"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
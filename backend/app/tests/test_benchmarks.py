@@ -0,0 +1,41 @@
+import json
+from datetime import date
+from benchmarks import run
+from benchmarks.generator import POOLS, generate_messages
+
+
+def test_generator_is_deterministic_and_uses_script_pools():
+    first = list(generate_messages(500, start=date(2025, 1, 1), days=3, seed=7))
+    assert first == list(generate_messages(500, start=date(2025, 1, 1), days=3, seed=7))
+
+    bodies = {body for pool in POOLS.values() for body in pool.bodies}
+    assert all(m["body"] in bodies for m in first)
+    assert {m["timestamp"].date() for m in first} == {date(2025, 1, 1), date(2025, 1, 2), date(2025, 1, 3)}
+    # Distinct (sender, body, timestamp) so content-hash dedup keeps every row
+    assert len({(m["sender"], m["body"], m["timestamp"]) for m in first}) == 500
+
+
+def test_run_writes_results_and_flags_regressions(tmp_path):
+    output = tmp_path / "results.json"
+    code = run.main([
+        "--micro-messages", "50", "--repeat", "1", "--messages", "40", "--sms-requests", "10",
+        "--read-requests", "5", "--query-requests", "3", "--llm-delay", "0", "--output", str(output),
+    ])
+    assert code == 0
+
+    results = json.loads(output.read_text())
+    assert set(results["micro"]) == {
+        "process_message", "process_many", "generate_digest", "prepare_context", "messages_orm", "messages_core",
+    }
+    assert results["micro"]["messages_core"]["identical"] is True
+    assert results["micro"]["messages_core"]["rows"] == 50
+    assert set(results["e2e"]) == {"sms", "upload_csv", "messages", "digest", "query"}
+    assert all(r["errors"] == 0 for r in results["e2e"].values())
+    assert results["e2e"]["query"]["llm_calls"] == 3
+
+    faster = json.loads(output.read_text())
+    faster["e2e"]["digest"]["ops_per_sec"] *= 10
+    assert run.compare(results, faster, tolerance=0.2) == [
+        f"e2e.digest: {results['e2e']['digest']['ops_per_sec']} ops/s "
+        f"(baseline {faster['e2e']['digest']['ops_per_sec']})"
+    ]
@@ -0,0 +1,59 @@
+import json
+from app.core.config import settings
+
+BACKUP = [
+    {"sender": "HDFC-BANK", "body": "INR 5000 debited from A/C XXXX1234", "timestamp": "2025-01-10T10:00:00"},
+    {"sender": "OTPVERIFY", "body": "Your OTP is 482913 for login.", "timestamp": "2025-01-10T10:05:00"},
+    {"sender": "IRCTC", "body": "PNR 6512347890 CONFIRMED", "message_id": "fwd-1"},
+]
+
+
+def test_reimport_is_idempotent(client):
+    first = client.post("/api/v1/upload-csv", json=BACKUP).json()
+    again = client.post("/api/v1/upload-csv", json=BACKUP).json()
+
+    assert (first["messages_imported"], first["duplicates"]) == (3, 0)
+    assert (again["messages_imported"], again["duplicates"]) == (0, 3)
+    assert len(client.get("/api/v1/messages").json()) == 3
+    assert client.get("/api/v1/digest", params={"date_filter": "2025-01-10"}).json()["total_messages"] == 2
+
+
+def test_chunked_counts_and_invalid_rows(client, monkeypatch):
+    monkeypatch.setattr(settings, "upload_chunk_size", 2)
+    rows = BACKUP + [{"sender": "missing body"}, BACKUP[0]]
+    result = client.post("/api/v1/upload-csv", json=rows).json()
+
+    assert result["status"] == "partial"
+    assert [(c["accepted"], c["duplicates"], c["failed"]) for c in result["chunks"]] == [(2, 0, 0), (1, 0, 1), (0, 1, 0)]
+
+
+def test_streamed_csv_with_multiline_body(client):
+    csv_body = (
+        "sender,body,timestamp,message_id\r\n"
+        'HDFC-BANK,"INR 5000 debited,\nAvl Bal INR 45,000",2025-01-10T10:00:00,\r\n'
+        "Mom,Call me when you see this.,2025-01-10T11:00:00,m-1\r\n"
+    )
+    result = client.post("/api/v1/upload-csv", content=csv_body.encode(), headers={"Content-Type": "text/csv"}).json()
+
+    assert result["messages_imported"] == 2
+    bodies = {m["body"] for m in client.get("/api/v1/messages").json()}
+    assert "INR 5000 debited,\nAvl Bal INR 45,000" in bodies
+
+
+def test_streamed_ndjson(client):
+    lines = [json.dumps(row) for row in BACKUP] + ["{not json"]
+    result = client.post(
+        "/api/v1/upload-csv",
+        content="\n".join(lines).encode(),
+        headers={"Content-Type": "application/x-ndjson"},
+    ).json()
+    assert (result["messages_imported"], result["failed"]) == (3, 1)
+
+
+def test_forwarder_retry_is_deduplicated(client):
+    payload = {"sender": "HDFC-BANK", "body": "INR 5000 debited", "message_id": "abc"}
+    first = client.post("/api/v1/sms", json=payload).json()
+    retry = client.post("/api/v1/sms", json=payload).json()
+
+    assert retry["status"] == "duplicate"
+    assert retry["message_id"] == first["message_id"]
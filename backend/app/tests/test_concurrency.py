@@ -0,0 +1,39 @@
+import asyncio
+import time
+import httpx
+from app.services.llm_client import llm_client
+
+LLM_DELAY = 0.5
+
+
+def test_ingest_latency_flat_while_queries_in_flight(api, monkeypatch):
+    async def slow_call_llm(query, messages, model):
+        await asyncio.sleep(LLM_DELAY)
+        return "stub answer", []
+
+    monkeypatch.setattr(llm_client, "enabled", True)
+    monkeypatch.setattr(llm_client, "_call_llm", slow_call_llm)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            queries = [
+                asyncio.create_task(ac.post("/api/v1/query", json={"query": "how many otps"}))
+                for _ in range(4)
+            ]
+            await asyncio.sleep(0.05)
+
+            latencies = []
+            for i in range(5):
+                started = time.perf_counter()
+                response = await ac.post("/api/v1/sms", json={"sender": "HDFC-BANK", "body": f"INR {i} debited"})
+                latencies.append(time.perf_counter() - started)
+                assert response.status_code == 200
+
+            answers = await asyncio.gather(*queries)
+            return latencies, answers
+
+    latencies, answers = asyncio.run(scenario())
+
+    assert all(r.status_code == 200 and r.json()["answer"] == "stub answer" for r in answers)
+    assert max(latencies) < LLM_DELAY / 2
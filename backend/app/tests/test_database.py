@@ -0,0 +1,43 @@
+import threading
+import pytest
+from app.core import database
+from app.core.config import settings
+from app.core.database import build_engine, storage_report
+
+
+def test_production_profile_applies_pragmas(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_profile", "production")
+    monkeypatch.setattr(settings, "sqlite_pragmas", {"busy_timeout": "7000"})
+    engine = build_engine(f"sqlite:///{tmp_path / 'tuned.db'}")
+
+    report = storage_report(engine)
+    assert report["journal_mode"] == "wal"
+    assert report["busy_timeout"] == 7000
+    assert report["pool_size"] == settings.db_pool_size
+    engine.dispose()
+
+
+def test_unknown_profile_rejected(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "storage_profile", "turbo")
+    with pytest.raises(ValueError):
+        build_engine(f"sqlite:///{tmp_path / 'x.db'}")
+
+
+def test_concurrent_writers_do_not_lock(client):
+    errors = []
+
+    def writer(n):
+        for i in range(10):
+            response = client.post("/api/v1/sms", json={"sender": f"W{n}", "body": f"INR {i} debited"})
+            if response.status_code != 200:
+                errors.append(response.text)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(client.get("/api/v1/messages").json()) == 40
+    assert database.serialized_write().locked() is False
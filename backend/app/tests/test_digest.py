@@ -0,0 +1,129 @@
+import asyncio
+import json
+from datetime import date
+from sqlalchemy import select
+from app.models.sms_model import DailyDigest, SMS
+from app.services import digest_store
+from app.services.digest_summarizer import DigestSummarizer, digest_summarizer
+from app.services.llm_client import LLMClient
+from app.services.sms_processor import sms_processor
+from app.tests.stub_openrouter import StubOpenRouter
+
+
+def test_digest_counts_ingest_and_upload(client):
+    client.post("/api/v1/sms", json={"sender": "OTPVERIFY", "body": "Your OTP is 482913 for login.", "timestamp": "2025-01-10T09:00:00"})
+    client.post("/api/v1/sms", json={"sender": "UNKNOWN", "body": "Dear customer, your account will be blocked. Verify now: http://bit.ly/x", "timestamp": "2025-01-10T10:00:00"})
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": "ZOMATO", "body": "Flat 60% OFF this weekend", "timestamp": "2025-01-10T11:00:00"},
+        {"sender": "PAYTM-OTP", "body": "OTP 663920 for transaction", "timestamp": "2025-01-10T12:00:00"},
+        {"sender": "ZOMATO", "body": "Flat 60% OFF this weekend", "timestamp": "2025-01-11T11:00:00"},
+    ])
+
+    digest = client.get("/api/v1/digest", params={"date_filter": "2025-01-10"}).json()
+    assert digest["total_messages"] == 4
+    assert digest["categories"][0] == {"category": "otp", "count": 2, "summary": "2 OTP and verification codes"}
+    assert digest["threat_count"] == 1
+    assert client.get("/api/v1/digest", params={"date_filter": "2025-01-11"}).json()["total_messages"] == 1
+
+
+def test_counters_match_full_scan_and_rebuild(client, session_factory):
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": s, "body": b, "timestamp": f"2025-02-0{d}T10:00:00"}
+        for d in (1, 2) for s, b in [
+            ("HDFC-BANK", "INR 5000 debited from A/C XXXX1234"),
+            ("CARE", "Pay 49 to release: http://scam.example/pay"),
+            ("Mom", "Call me when you see this."),
+        ]
+    ])
+    db = session_factory()
+    day = db.execute(select(SMS.timestamp)).scalars().first().date()
+    messages = db.query(SMS).filter(SMS.timestamp >= "2025-02-01", SMS.timestamp < "2025-02-02").all()
+    expected = sms_processor.generate_digest(messages, "2025-02-01")
+
+    counts, threats = digest_store.get_digest_counts(db, day)
+    assert sms_processor.digest_from_counts(counts, threats, "2025-02-01") == expected
+
+    before = sorted((r.date, r.category, r.count, r.threat_count) for r in db.query(DailyDigest))
+    db.query(DailyDigest).delete()
+    db.commit()
+    assert digest_store.ensure_backfilled(db) is True
+    after = sorted((r.date, r.category, r.count, r.threat_count) for r in db.query(DailyDigest))
+    assert after == before
+    db.close()
+
+
+SUMMARIES = {"otp": "Two login codes", "offers": "A weekend food discount", "finance": "Account block scam"}
+
+
+def stub_llm(stub):
+    llm = LLMClient()
+    llm.enabled = True
+    llm.base_url = stub.url
+    llm.models = ["stub/model"]
+    stub.default = (0.0, 200, "```json\n" + json.dumps(SUMMARIES) + "\n```")
+    return llm
+
+
+def refresh(summarizer, day):
+    async def run():
+        try:
+            return await summarizer.refresh(day)
+        finally:
+            await summarizer.llm.aclose()
+    return asyncio.run(run())
+
+
+def post_day(client, *bodies):
+    for i, (sender, body) in enumerate(bodies):
+        client.post("/api/v1/sms", json={"sender": sender, "body": body, "timestamp": f"2025-01-10T09:{i:02d}:00"})
+
+
+DAY_MESSAGES = [
+    ("OTPVERIFY", "Your OTP is 482913 for login."),
+    ("PAYTM-OTP", "OTP 663920 for transaction"),
+    ("ZOMATO", "Flat 60% OFF this weekend"),
+    ("UNKNOWN", "Dear customer, your account will be blocked. Verify now: http://bit.ly/x"),
+]
+
+
+def test_all_categories_summarized_in_one_request(client, session_factory):
+    post_day(client, *DAY_MESSAGES)
+    with StubOpenRouter() as stub:
+        summarizer = DigestSummarizer(stub_llm(stub), enabled=True, delay=0, samples=5, max_entries=10,
+                                      session_factory=session_factory)
+        day = date(2025, 1, 10)
+        assert refresh(summarizer, day) == 3
+        assert len(stub.calls) == 1
+        assert "## otp (2 messages)" in stub.prompts[0] and "## offers (1 messages)" in stub.prompts[0]
+        assert summarizer.lookup(day, "otp", 2) == ("Two login codes", False)
+
+        # Counts still in the same bucket: nothing to do
+        assert refresh(summarizer, day) == 0
+        assert len(stub.calls) == 1
+        assert summarizer.lookup(day, "otp", 3) == ("Two login codes", False)
+        assert summarizer.lookup(day, "otp", 4) == ("Two login codes", True)
+
+        # Unparseable replies leave the kept summaries alone
+        stub.default = (0.0, 200, "Sorry, I cannot help with that")
+        post_day(client, ("BANK-OTP", "OTP 100200 to confirm"), ("AMZN-OTP", "OTP 300400 for order"))
+        assert refresh(summarizer, day) == 0
+        assert summarizer.lookup(day, "otp", 4) == ("Two login codes", True)
+
+
+def test_digest_serves_kept_summaries_without_waiting(client, session_factory, monkeypatch):
+    post_day(client, *DAY_MESSAGES)
+    # No summary yet: rule-based text, and no stale flag in the response
+    digest = client.get("/api/v1/digest", params={"date_filter": "2025-01-10"}).json()
+    assert digest["categories"][0] == {"category": "otp", "count": 2, "summary": "2 OTP and verification codes"}
+
+    with StubOpenRouter() as stub:
+        monkeypatch.setattr(digest_summarizer, "llm", stub_llm(stub))
+        monkeypatch.setattr(digest_summarizer, "session_factory", session_factory)
+        refresh(digest_summarizer, date(2025, 1, 10))
+
+    digest = client.get("/api/v1/digest", params={"date_filter": "2025-01-10"}).json()
+    assert digest["categories"][0] == {"category": "otp", "count": 2, "summary": "Two login codes", "stale": False}
+
+    post_day(client, ("BANK-OTP", "OTP 100200 to confirm"), ("AMZN-OTP", "OTP 300400 for order"))
+    digest = client.get("/api/v1/digest", params={"date_filter": "2025-01-10"}).json()
+    assert digest["categories"][0] == {"category": "otp", "count": 4, "summary": "Two login codes", "stale": True}
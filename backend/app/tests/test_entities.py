@@ -0,0 +1,148 @@
+import json
+from datetime import datetime
+from sqlalchemy import select
+from app.models.sms_model import SMS, SMSEntity
+from app.services import entities
+
+DAY = "2025-02-01"
+MESSAGES = [
+    ("HDFC-BANK", "HDFC BANK: INR 5000 debited from A/C XXXX1234. Avl Bal INR 45,000."),
+    ("SBI-BANK", "SBI: Rs.2500 spent on your Credit Card at AMAZON. SMS BLOCK if not done by you."),
+    ("AXIS-BANK", "UPI: Rs.799 paid to ZOMATO via UPI Ref 123456789012"),
+    ("AXIS-BANK", "UPI: Rs.1,201.50 paid to ZOMATO via UPI Ref 998877665544"),
+    ("ICICI-BANK", "ICICI BANK: Salary Rs.62,500 credited to A/C ****8910. Avl bal Rs.1,24,300."),
+    ("PAYTM-OTP", "OTP 663920 for transaction of Rs.2500. Valid for 10 mins."),
+    ("IRCTC", "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC."),
+    ("MAKEMYTRIP", "MakeMyTrip: Flight 6E-123 to DEL at 07:15, Web check-in open."),
+    ("AJIO", "AJIO: Flat Rs.500 OFF on Rs.1999+ | Code AJ500"),
+]
+
+
+def ingest(client):
+    client.post("/api/v1/sms", json={"sender": MESSAGES[0][0], "body": MESSAGES[0][1], "timestamp": f"{DAY}T08:00:00"})
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": sender, "body": body, "timestamp": f"{DAY}T{9 + i:02d}:00:00"}
+        for i, (sender, body) in enumerate(MESSAGES[1:])
+    ])
+
+
+def summary(found):
+    return [(e["kind"], e["value"], e["direction"]) for e in found]
+
+
+def test_extract_parses_amounts_accounts_codes_and_merchants():
+    at = datetime(2025, 2, 1, 9, 0)
+    assert summary(entities.extract(MESSAGES[0][1], at, "finance")) == [
+        ("amount", "5000.00", "debit"), ("amount", "45000.00", "balance"), ("account", "1234", None),
+    ]
+    assert summary(entities.extract(MESSAGES[4][1], at, "finance")) == [
+        ("amount", "62500.00", "credit"), ("amount", "124300.00", "balance"), ("account", "8910", None),
+    ]
+    assert summary(entities.extract(MESSAGES[2][1], at, "finance"))[-1] == ("merchant", "ZOMATO", None)
+
+    # Only the transaction amount is a debit; card limits and dues are not spend
+    card = "Rs.1,250 spent on HDFC Bank Card XX1234 at AMAZON. Avl Lmt: Rs.48,750"
+    assert summary(entities.extract(card, at, "finance")) == [
+        ("amount", "1250.00", "debit"), ("amount", "48750.00", None), ("account", "1234", None),
+        ("merchant", "AMAZON", None),
+    ]
+    dues = "Rs.2000 paid to SWIGGY. Total outstanding Rs.15,000, min due Rs.750"
+    assert [e["direction"] for e in entities.extract(dues, at, "finance") if e["kind"] == "amount"] == [
+        "debit", None, None,
+    ]
+
+    otp = entities.extract(MESSAGES[5][1], at, "otp")
+    assert summary(otp) == [("amount", "2500.00", None), ("otp", "663920", None)]
+    assert otp[1]["valid_until"] == datetime(2025, 2, 1, 9, 10)
+    # Codes are only OTPs in OTP messages; prices without a debit get no merchant
+    assert summary(entities.extract(MESSAGES[8][1], at, "offers")) == [
+        ("amount", "500.00", None), ("amount", "1999.00", None),
+    ]
+    assert summary(entities.extract(MESSAGES[6][1], at, "travel")) == [("pnr", "6512347890", None)]
+    assert summary(entities.extract(MESSAGES[7][1], at, "travel")) == [("flight", "6E123", None)]
+
+
+def test_entities_and_spend_endpoints(client):
+    ingest(client)
+
+    merchants = client.get("/api/v1/entities", params={"kind": "merchant"}).json()
+    assert [(m["value"], m["sender"]) for m in merchants] == [
+        ("ZOMATO", "AXIS-BANK"), ("ZOMATO", "AXIS-BANK"), ("AMAZON", "SBI-BANK"),
+    ]
+    pnr = client.get("/api/v1/entities", params={"kind": "pnr", "value": "6512347890"}).json()
+    assert len(pnr) == 1 and pnr[0]["sender"] == "IRCTC"
+    assert client.get("/api/v1/entities", params={"kind": "iban"}).status_code == 422
+
+    spend = client.get("/api/v1/entities/spend", params={"date_filter": DAY}).json()
+    assert spend == [
+        {"date": DAY, "merchant": "UNKNOWN", "total": 5000.0, "count": 1},
+        {"date": DAY, "merchant": "AMAZON", "total": 2500.0, "count": 1},
+        {"date": DAY, "merchant": "ZOMATO", "total": 2000.5, "count": 2},
+    ]
+    credits = client.get("/api/v1/entities/spend", params={"date_filter": DAY, "direction": "credit"}).json()
+    assert [(c["merchant"], c["total"]) for c in credits] == [("UNKNOWN", 62500.0)]
+
+
+def test_factual_queries_are_answered_from_entities(client):
+    ingest(client)
+
+    def ask(query):
+        return client.post("/api/v1/query", json={"query": query, "date": DAY}).json()
+
+    upi = ask("How much did I spend on UPI?")
+    assert upi["answer"] == "You spent Rs.2,000.50 on UPI across 2 transactions."
+    assert len(upi["sources"]) == 2
+    assert ask("how much did I pay to Zomato")["answer"].startswith("You spent Rs.2,000.50 on ZOMATO")
+    assert ask("How much did I spend today?")["answer"] == "You spent Rs.9,500.50 across 4 transactions."
+    assert ask("how much was credited")["answer"] == "You received Rs.62,500 across 1 transaction."
+    assert ask("What's my PNR?")["answer"].startswith("Your latest PNR is 6512347890 (from IRCTC, 2025-02-01 14:00)")
+    assert ask("what is my otp")["answer"].endswith(", expired until 13:10.")
+    assert ask("Show my last PNR number")["answer"].startswith("Your latest PNR is 6512347890")
+
+    # Questions that only mention an OTP, PNR or flight are not lookups
+    for question in ("What should I do if someone asks for my OTP?", "Which messages look like OTP scams?",
+                     "Is my flight message a scam?"):
+        assert entities.answer_query(None, question) is None
+        assert "663920" not in ask(question)["answer"]
+
+    # Counting and listing questions still go to the LLM or the rule-based answer
+    # (the AJIO promo code counts as an OTP message for the classifier)
+    assert ask("how many otp")["answer"] == "You have 2 OTP messages."
+
+    response = client.post("/api/v1/query/stream", json={"query": "what's my flight", "date": DAY},
+                           headers={"Accept": "application/x-ndjson"})
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[2] == {"event": "delta", "text": events[2]["text"]}
+    assert "6E123" in events[2]["text"]
+    assert events[-1]["source"] == "entities"
+
+
+def test_backfill_extracts_existing_messages(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([
+            SMS(sender="IRCTC", body=MESSAGES[6][1], timestamp=datetime(2025, 2, 1), category="travel"),
+            SMS(sender="AXIS-BANK", body=MESSAGES[2][1], timestamp=datetime(2025, 2, 1), category="finance"),
+        ])
+        db.commit()
+        assert entities.backfill(db, batch_size=1) == 2
+        assert entities.backfill(db) == 0
+        kinds = sorted(db.execute(select(SMSEntity.kind)).scalars())
+        assert kinds == ["amount", "merchant", "pnr"]
+
+        # Amounts stored under older rules are extracted again
+        card = SMS(sender="HDFC-BANK", body="Rs.1,250 spent on Card XX1234. Avl Lmt: Rs.48,750",
+                   timestamp=datetime(2025, 2, 2), category="finance")
+        db.add(card)
+        db.flush()
+        db.add_all([
+            SMSEntity(sms_id=card.id, kind="amount", value=value, amount=float(value), currency="INR",
+                      direction="debit", timestamp=card.timestamp)
+            for value in ("1250.00", "48750.00")
+        ])
+        db.commit()
+        assert entities.backfill(db) == 3
+        debits = db.execute(select(SMSEntity.value).where(SMSEntity.direction == "debit")).scalars().all()
+        assert sorted(debits) == ["1250.00", "799.00"]
+    finally:
+        db.close()
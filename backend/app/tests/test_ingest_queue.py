@@ -0,0 +1,96 @@
+import asyncio
+import time
+from datetime import datetime
+import httpx
+from app.models.sms_model import SMS
+from app.services import bulk_ingest
+from app.services.ingest_queue import ingest_queue
+
+
+def run_queued(api, monkeypatch, session_factory, scenario, **config):
+    monkeypatch.setattr(ingest_queue, "enabled", True)
+    monkeypatch.setattr(ingest_queue, "session_factory", session_factory)
+    for name, value in config.items():
+        monkeypatch.setattr(ingest_queue, name, value)
+
+    async def main():
+        await ingest_queue.start()
+        try:
+            transport = httpx.ASGITransport(app=api)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+                return await scenario(ac)
+        finally:
+            await ingest_queue.stop()
+
+    return asyncio.run(main())
+
+
+def test_queued_ingest_acknowledges_and_flushes_in_batches(api, monkeypatch, session_factory):
+    before = ingest_queue.stats_counters['batches']
+
+    async def scenario(ac):
+        responses = [
+            await ac.post("/api/v1/sms", json={"sender": "OTPVERIFY", "body": f"Your OTP is 4829{i:02d}", "message_id": f"m{i}"})
+            for i in range(25)
+        ]
+        # A forwarder retry of an already-queued message
+        responses.append(await ac.post("/api/v1/sms", json={"sender": "OTPVERIFY", "body": "Your OTP is 482900", "message_id": "m0"}))
+        return responses
+
+    responses = run_queued(api, monkeypatch, session_factory, scenario, batch_size=10, batch_wait_ms=1000)
+
+    assert {r.status_code for r in responses} == {202}
+    db = session_factory()
+    assert db.query(SMS).count() == 25
+    db.close()
+    # 26 messages in batches of at most 10, flushed on stop
+    assert ingest_queue.stats_counters['batches'] - before >= 3
+
+
+def test_queued_retries_dedupe_on_what_the_forwarder_sent(api, monkeypatch, session_factory):
+    dated = {"sender": "HDFC-BANK", "body": "INR 500 debited from A/C XXXX1234", "timestamp": "2025-03-01T09:00:00"}
+    undated = {"sender": "Mom", "body": "Call me"}
+
+    async def scenario(ac):
+        for payload in (dated, dated, undated, undated):
+            await ac.post("/api/v1/sms", json=payload)
+
+    run_queued(api, monkeypatch, session_factory, scenario, batch_size=1)
+
+    db = session_factory()
+    rows = {sms.sender: sms for sms in db.query(SMS)}
+    counts = {sender: db.query(SMS).filter(SMS.sender == sender).count() for sender in rows}
+    db.close()
+    assert counts == {"HDFC-BANK": 1, "Mom": 2}
+    assert rows["HDFC-BANK"].content_hash == bulk_ingest.content_hash(
+        dated["sender"], dated["body"], datetime(2025, 3, 1, 9, 0))
+    # Like a direct write: no original timestamp, no dedup key
+    assert rows["Mom"].content_hash is None
+
+
+def test_full_queue_applies_backpressure(api, monkeypatch, session_factory):
+    write = ingest_queue._write
+
+    def slow_write(batch):
+        time.sleep(0.3)
+        return write(batch)
+
+    # A slow writer lets the queue fill up
+    monkeypatch.setattr(ingest_queue, "_write", slow_write)
+
+    async def scenario(ac):
+        return [
+            await ac.post("/api/v1/sms", json={"sender": "Mom", "body": f"Call me {i}"})
+            for i in range(6)
+        ]
+
+    responses = run_queued(api, monkeypatch, session_factory, scenario, maxsize=2, batch_size=1)
+
+    codes = [r.status_code for r in responses]
+    assert codes.count(202) >= 2 and 503 in codes
+    rejected = next(r for r in responses if r.status_code == 503)
+    assert rejected.headers["Retry-After"] == "1"
+
+    db = session_factory()
+    assert db.query(SMS).count() == codes.count(202)
+    db.close()
@@ -0,0 +1,270 @@
+import asyncio
+import json
+import time
+from datetime import datetime
+import pytest
+from app.core.config import settings
+from app.models.sms_model import SMS
+from app.services.llm_client import LLMClient, _ReasoningFilter
+from app.services.model_health import ModelHealthTracker
+from app.tests.stub_openrouter import StubOpenRouter
+
+PRIMARY, SECOND, THIRD = "primary/model", "second/model", "third/model"
+
+
+@pytest.fixture
+def stub():
+    with StubOpenRouter() as server:
+        yield server
+
+
+def make_client(stub, **overrides):
+    client = LLMClient()
+    client.enabled = True
+    client.api_key = "test-key"
+    client.base_url = stub.url
+    client.models = [PRIMARY, SECOND, THIRD]
+    for name, value in overrides.items():
+        setattr(client, name, value)
+    return client
+
+
+def ask(client, query="how many otps"):
+    async def run():
+        try:
+            answer, _ = await client.answer_query(query, [])
+            return answer
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_sequential_fallback_skips_failed_models(stub):
+    stub.behaviors[PRIMARY] = (0.0, 429, "rate limited")
+    stub.behaviors[SECOND] = (0.0, 500, "boom")
+    stub.behaviors[THIRD] = (0.0, 200, "third answer")
+
+    assert ask(make_client(stub)) == "third answer"
+    assert stub.calls == [PRIMARY, SECOND, THIRD]
+
+
+def test_pooled_client_reuses_connections(stub):
+    client = make_client(stub)
+
+    async def run():
+        try:
+            for i in range(5):
+                assert await client.answer_query(f"question {i}", []) == ("stub answer", [])
+        finally:
+            await client.aclose()
+
+    asyncio.run(run())
+    assert len(stub.calls) == 5
+    assert len(stub.client_ports) == 1
+
+
+def test_hedged_mode_takes_first_good_answer(stub):
+    stub.behaviors[PRIMARY] = (1.0, 200, "slow answer")
+    stub.behaviors[SECOND] = (0.0, 200, "fast answer")
+
+    started = time.perf_counter()
+    answer = ask(make_client(stub, hedge_delay=0.1))
+
+    assert answer == "fast answer"
+    assert time.perf_counter() - started < 0.8
+    assert stub.calls[:2] == [PRIMARY, SECOND]
+
+
+def test_hedged_mode_replaces_failures_immediately(stub):
+    stub.behaviors[PRIMARY] = (0.0, 503, "down")
+    stub.behaviors[SECOND] = (0.0, 200, "second answer")
+
+    assert ask(make_client(stub, hedge_delay=5.0)) == "second answer"
+
+
+def test_total_budget_falls_back_to_rules(stub):
+    stub.default = (2.0, 200, "too late")
+
+    started = time.perf_counter()
+    answer = ask(make_client(stub, total_budget=0.3))
+
+    assert time.perf_counter() - started < 1.5
+    assert answer == "You have 0 OTP messages."
+
+
+def test_rate_limited_model_is_skipped_until_cooldown(stub):
+    stub.behaviors[PRIMARY] = (0.0, 429, "rate limited")
+    client = make_client(stub)
+
+    async def run():
+        try:
+            first = await client.answer_query("first question", [])
+            second = await client.answer_query("second question", [])
+            return first, second
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == (("stub answer", []), ("stub answer", []))
+    assert stub.calls == [PRIMARY, SECOND, SECOND]
+    assert client.health.ranked(client.models) == [SECOND, THIRD]
+
+
+def test_health_tracker_prefers_fastest_healthy_model():
+    tracker = ModelHealthTracker(failure_threshold=2, cooldown=60)
+    tracker.record_success(PRIMARY, 3.0)
+    tracker.record_success(SECOND, 0.5)
+    assert tracker.ranked([PRIMARY, SECOND, THIRD]) == [SECOND, PRIMARY, THIRD]
+
+    tracker.record_failure(SECOND)
+    tracker.record_failure(SECOND)
+    assert tracker.ranked([PRIMARY, SECOND, THIRD]) == [PRIMARY, THIRD]
+    snapshot = {entry['model']: entry for entry in tracker.snapshot([PRIMARY, SECOND])}
+    assert snapshot[SECOND]['available'] is False
+    assert snapshot[PRIMARY]['avg_latency_ms'] == 3000.0
+
+
+def test_llm_health_endpoint(client):
+    response = client.get("/api/v1/llm/health")
+    assert response.status_code == 200
+    assert len(response.json()["models"]) == len(response.json()["routing_order"])
+
+
+def test_repeated_query_served_from_cache(stub):
+    client = make_client(stub)
+
+    async def run():
+        try:
+            first = await client.answer_query("How many OTPs today?", [])
+            second = await client.answer_query("how many otps today", [])
+            return first, second
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == (("stub answer", []), ("stub answer", []))
+    assert stub.calls == [PRIMARY]
+    assert client.cache.stats()['hits'] == 1
+
+
+def summarize(client, messages):
+    async def run():
+        try:
+            return await client.generate_summary("finance", messages)
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_summary_uses_model_routing(stub):
+    stub.behaviors[PRIMARY] = (0.0, 429, "rate limited")
+    stub.behaviors[SECOND] = (0.0, 200, "Two debits from HDFC")
+    messages = [
+        SMS(id=i, sender="HDFC-BANK", body=f"INR {amount} debited from A/C XX1234", category="finance",
+            is_threat=False, timestamp=datetime(2025, 2, 1, 10, i), template_id="t1")
+        for i, amount in enumerate((500, 1200))
+    ]
+
+    assert summarize(make_client(stub), messages) == "Two debits from HDFC"
+    assert stub.calls == [PRIMARY, SECOND]
+    assert "[amounts: INR 500, INR 1200]" in stub.prompts[-1]
+
+    stub.default = (0.0, 500, "down")
+    stub.behaviors.clear()
+    assert summarize(make_client(stub), messages[:1]) == "1 finance messages"
+
+
+def test_context_budget_follows_the_model(stub):
+    messages = [
+        SMS(id=i, sender=f"SHOP{i}", body=f"Sale {i}: " + "x" * 300, category="other", is_threat=False,
+            timestamp=datetime(2025, 2, 1, 10, i))
+        for i in range(20)
+    ]
+    client = make_client(stub, context_budgets={PRIMARY: 200, SECOND: 5000})
+    assert len(client._prepare_context(messages, PRIMARY)[0]) < len(client._prepare_context(messages, SECOND)[0])
+    assert client.context_budget(THIRD) == settings.llm_context_tokens
+
+    async def run(query):
+        try:
+            return await client.answer_query(query, messages)
+        finally:
+            await client.aclose()
+    _, sources = asyncio.run(run("any sales?"))
+    assert "more messages in" in stub.prompts[0]
+    # Sources are the messages in the answering model's prompt, not all retrieved
+    assert sources == client._prepare_context(messages, PRIMARY)[1]
+    assert 0 < len(sources) < len(messages)
+
+    stub.behaviors[PRIMARY] = (0.0, 500, "down")
+    assert asyncio.run(run("any offers?")) == ("stub answer", [m.id for m in messages])
+    assert stub.calls[-2:] == [PRIMARY, SECOND]
+    # Cached answers keep the sources they were given with
+    assert asyncio.run(run("Any offers?"))[1] == [m.id for m in messages]
+
+
+def stream(client, query="any sales?"):
+    async def run():
+        try:
+            return [event async for event in client.stream_answer(query, [])]
+        finally:
+            await client.aclose()
+    return asyncio.run(run())
+
+
+def test_stream_passes_deltas_and_drops_reasoning(stub):
+    stub.default = (0.0, 200, "<think>weighing the offers</think>Two sales this week")
+    client = make_client(stub)
+
+    events = stream(client)
+    assert events[:2] == [{"event": "sources", "sources": []}, {"event": "start", "model": PRIMARY}]
+    assert [e["text"] for e in events if e["event"] == "delta"] == ["Two", " sales", " this", " week"]
+    assert events[-1] == {"event": "done", "source": "llm", "model": PRIMARY, "complete": True}
+
+    # The streamed answer is cached for both endpoints
+    assert ask(client, "Any sales?") == "Two sales this week"
+    assert stub.calls == [PRIMARY]
+
+
+def test_stream_moves_on_when_first_token_is_late(stub):
+    stub.behaviors[PRIMARY] = (1.0, 200, "slow answer")
+    stub.behaviors[SECOND] = (0.0, 429, "rate limited")
+    stub.behaviors[THIRD] = (0.0, 200, "fast answer")
+
+    started = time.perf_counter()
+    events = stream(make_client(stub, first_token_timeout=0.2))
+    assert time.perf_counter() - started < 0.9
+    assert "".join(e["text"] for e in events if e["event"] == "delta") == "fast answer"
+    assert events[-1]["model"] == THIRD
+    assert stub.calls == [PRIMARY, SECOND, THIRD]
+
+
+def test_stream_falls_back_to_rules(stub):
+    stub.default = (0.0, 500, "down")
+    events = stream(make_client(stub), "how many otps")
+    assert events == [
+        {"event": "sources", "sources": []},
+        {"event": "start", "model": None},
+        {"event": "delta", "text": "You have 0 OTP messages."},
+        {"event": "done", "source": "fallback", "model": None, "complete": True},
+    ]
+
+
+def test_reasoning_filter_handles_split_tags():
+    reasoning = _ReasoningFilter()
+    pieces = ["Hi <th", "ink>secret</thi", "nk> there", " <", "b>"]
+    assert "".join(reasoning.feed(p) for p in pieces) + reasoning.flush() == "Hi  there <b>"
+
+
+def test_query_stream_endpoint(client):
+    client.post("/api/v1/sms", json={"sender": "OTPVERIFY", "body": "Your OTP is 482913 for login."})
+
+    response = client.post("/api/v1/query/stream", json={"query": "how many otp"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    blocks = [block.split("\n") for block in response.text.strip().split("\n\n")]
+    assert [lines[0] for lines in blocks] == ["event: sources", "event: start", "event: delta", "event: done"]
+    assert blocks[2][1] == 'data: {"text": "You have 1 OTP messages."}'
+
+    response = client.post("/api/v1/query/stream", json={"query": "how many otp"},
+                           headers={"Accept": "application/x-ndjson"})
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[0]["event"] == "sources" and len(lines[0]["sources"]) == 1
+    assert lines[-1] == {"event": "done", "source": "fallback", "model": None, "complete": True}
@@ -0,0 +1,84 @@
+from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import inspect
+from app.models.sms_model import SMS
+from app.schemas.sms import SMSResponse
+from app.services.read_cache import render_json
+
+
+def seed(client, count=7):
+    # Several messages share a timestamp so paging must tie-break on id
+    for i in range(count):
+        client.post("/api/v1/sms", json={
+            "sender": "HDFC-BANK",
+            "body": f"INR {i}00 debited from A/C XXXX1234",
+            "timestamp": f"2025-01-10T10:0{i // 2}:00",
+        })
+
+
+def test_unpaged_response_unchanged(client):
+    seed(client)
+    response = client.get("/api/v1/messages")
+    assert len(response.json()) == 7
+    assert "X-Next-Cursor" not in response.headers
+    assert set(response.json()[0]) == {
+        "id", "sender", "body", "timestamp", "category", "is_threat",
+        "threat_reason", "urls", "has_money_request", "has_otp",
+    }
+
+
+def test_keyset_pages_cover_every_row_once(client):
+    seed(client)
+    everything = [m["id"] for m in client.get("/api/v1/messages").json()]
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3}
+        if cursor:
+            params["cursor"] = cursor
+        response = client.get("/api/v1/messages", params=params)
+        seen += [m["id"] for m in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+
+    assert seen == everything
+
+
+def test_field_projection(client):
+    seed(client, 4)
+    response = client.get("/api/v1/messages", params={"fields": "sender,timestamp", "limit": 2})
+    rows = response.json()
+    assert [set(r) for r in rows] == [{"id", "sender", "timestamp"}] * 2
+
+    nxt = client.get("/api/v1/messages", params={
+        "fields": "sender", "limit": 2, "cursor": response.headers["X-Next-Cursor"]
+    }).json()
+    assert {r["id"] for r in nxt}.isdisjoint({r["id"] for r in rows})
+
+
+def test_fast_rendering_matches_model_serialization(client, session_factory):
+    seed(client, 3)
+    client.post("/api/v1/sms", json={
+        "sender": "VK-ALERT", "body": "Urgent: \"verify\" KYC at http://bit.ly/x ₹1 \u2028 now",
+        "timestamp": "2025-01-11T10:00:00.000005",
+    })
+    db = session_factory()
+    try:
+        stored = db.query(SMS).order_by(SMS.timestamp.desc(), SMS.id.desc()).all()
+        adapter = TypeAdapter(List[SMSResponse])
+        expected = render_json(adapter.dump_python(adapter.validate_python(stored, from_attributes=True), mode="json"))
+    finally:
+        db.close()
+    assert client.get("/api/v1/messages").content == expected
+
+
+def test_bad_fields_and_cursor_rejected(client):
+    assert client.get("/api/v1/messages", params={"fields": "password"}).status_code == 400
+    assert client.get("/api/v1/messages", params={"cursor": "garbage"}).status_code == 400
+
+
+def test_composite_index_exists(session_factory):
+    bind = session_factory.kw["bind"]
+    indexes = {ix["name"]: ix["column_names"] for ix in inspect(bind).get_indexes("sms")}
+    assert indexes["ix_sms_timestamp_id"] == ["timestamp", "id"]
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import datetime
+from app.core.metrics import MetricsRegistry, metrics
+from app.services.llm_client import LLMClient
+from app.tests.stub_openrouter import StubOpenRouter
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe('latency_seconds', 0.05, {'route': '/a'})
+    registry.observe('latency_seconds', 0.5, {'route': '/a'})
+    registry.observe('latency_seconds', 3.0, {'route': '/a'})
+    registry.inc('calls_total', {'model': 'm'}, 2)
+
+    text = registry.render()
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+    assert 'calls_total{model="m"} 2' in text
+
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+    with registry.stage('classify'):
+        pass
+    registry.timed('classify')(lambda: None)()
+    registry.inc('calls_total')
+    assert registry.render() == "\n"
+
+
+def test_metrics_endpoint_reports_routes_stages_and_gauges(client):
+    metrics.reset()
+    client.post("/api/v1/sms", json={
+        "sender": "HDFC-BANK", "body": "INR 500 debited from A/C XX1234", "timestamp": datetime.now().isoformat(),
+    })
+    client.get("/api/v1/messages")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_request_duration_seconds_count{method="POST",route="/api/v1/sms",status="200"} 1' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/api/v1/messages",status="200"} 1' in text
+    for stage in ('classify', 'threat_detection', 'db_commit'):
+        assert f'stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'ingest_queue_depth 0' in text
+    assert '# TYPE llm_cache_lookups_total counter' in text
+
+
+def test_llm_calls_record_latency_and_token_usage():
+    metrics.reset()
+    with StubOpenRouter() as stub:
+        client = LLMClient()
+        client.enabled = True
+        client.base_url = stub.url
+        client.models = ["stub/model"]
+
+        async def run():
+            try:
+                return await client.answer_query("metrics question", [])
+            finally:
+                await client.aclose()
+        assert asyncio.run(run()) == ("stub answer", [])
+
+    text = metrics.render()
+    assert 'llm_requests_total{model="stub/model",outcome="success"} 1' in text
+    assert 'llm_tokens_total{kind="prompt",model="stub/model"} 10' in text
+    assert 'llm_tokens_total{kind="completion",model="stub/model"} 5' in text
+    assert 'llm_request_duration_seconds_count{model="stub/model",outcome="success"} 1' in text
+    assert 'stage_duration_seconds_count{stage="context_preparation"} 1' in text
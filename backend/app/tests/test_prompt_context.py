@@ -0,0 +1,48 @@
+from datetime import datetime
+from app.models.sms_model import SMS
+from app.services.prompt_context import HEADER, build_context, estimate_tokens
+
+
+def sms(sender, body, category, minute, template_id=None, is_threat=False):
+    return SMS(id=minute, sender=sender, body=body, category=category, is_threat=is_threat,
+               timestamp=datetime(2025, 2, 1, 10, minute), template_id=template_id)
+
+
+def test_duplicate_templates_collapse_into_one_row():
+    context, ids = build_context([
+        sms("HDFC-BANK", "INR 500 debited from A/C XX1234", "finance", 1, "debit"),
+        sms("AXIS-BANK", "INR 1,200 debited from A/C XX9876", "finance", 3, "debit"),
+        sms("OTPVERIFY", "Your OTP is 482913 for login.", "otp", 2, "otp"),
+        sms("OTPVERIFY", "Your OTP is 118244 for login.", "otp", 4, "otp"),
+        sms("Unknown", "Verify now | http://bit.ly/x", "other", 5, is_threat=True),
+    ])
+    assert context.split("\n") == [
+        HEADER,
+        "2025-02-01 10:03|HDFC-BANK +1|finance|2||INR 1,200 debited from A/C XX9876 [amounts: INR 500, INR 1,200]",
+        "2025-02-01 10:04|OTPVERIFY|otp|2||Your OTP is 118244 for login.",
+        "2025-02-01 10:05|Unknown|other|1|threat|Verify now / http://bit.ly/x",
+    ]
+    assert ids == [1, 3, 2, 4, 5]
+
+
+def test_otp_and_offer_bodies_are_truncated_harder():
+    long_body = "word " * 60
+    rows = build_context([
+        sms("A", long_body, "otp", 1), sms("B", long_body + "b", "offers", 2), sms("C", long_body + "c", "finance", 3),
+    ])[0].split("\n")[1:]
+    lengths = [len(row.split("|")[-1]) for row in rows]
+    assert lengths == [60, 80, 160]
+    assert rows[0].endswith("…")
+
+
+def test_budget_limits_rows_and_reports_the_rest():
+    messages = [sms(f"S{i}", f"Message {i} " + "x" * 200, "other", i) for i in range(10)]
+    context, ids = build_context(messages, token_budget=150)
+    assert estimate_tokens(context) <= 180
+    assert context.startswith(HEADER + "\n2025-02-01 10:00|S0|")
+    assert context.endswith("more messages in 8 templates omitted")
+    assert ids == [0, 1]
+
+    # One row always fits, however small the budget
+    assert len(build_context(messages, token_budget=1)[0].split("\n")) == 3
+    assert build_context([]) == ("(no messages)", [])
@@ -0,0 +1,92 @@
+from datetime import date
+from starlette.requests import Request
+from app.services import read_cache as read_cache_module
+from app.services.read_cache import ReadCache, read_cache
+
+
+def ingest(client, body, timestamp):
+    client.post("/api/v1/sms", json={"sender": "HDFC-BANK", "body": body, "timestamp": timestamp})
+
+
+def test_hits_skip_the_database_until_the_next_write(client):
+    ingest(client, "INR 500 debited from A/C XXXX1234", "2025-03-01T09:00:00")
+    first = client.get("/api/v1/messages")
+    second = client.get("/api/v1/messages")
+    assert second.content == first.content
+    assert second.headers["ETag"] == first.headers["ETag"]
+    assert read_cache.stats()["hits"] == 1
+
+    ingest(client, "INR 75 debited from A/C XXXX1234", "2025-03-01T10:00:00")
+    third = client.get("/api/v1/messages")
+    assert len(third.json()) == 2
+    assert third.headers["ETag"] != first.headers["ETag"]
+
+
+def test_conditional_requests_answer_304(client):
+    ingest(client, "INR 500 debited from A/C XXXX1234", "2025-03-01T09:00:00")
+    first = client.get("/api/v1/digest", params={"date_filter": "2025-03-01"})
+    etag = first.headers["ETag"]
+
+    cached = client.get("/api/v1/digest", params={"date_filter": "2025-03-01"}, headers={"If-None-Match": etag})
+    assert (cached.status_code, cached.content, cached.headers["ETag"]) == (304, b"", etag)
+    assert client.get("/", headers={"If-None-Match": client.get("/").headers["ETag"]}).status_code == 304
+
+    ingest(client, "INR 75 debited from A/C XXXX1234", "2025-03-01T10:00:00")
+    changed = client.get("/api/v1/digest", params={"date_filter": "2025-03-01"}, headers={"If-None-Match": etag})
+    assert (changed.status_code, changed.json()["total_messages"]) == (200, 2)
+
+
+def test_writes_only_invalidate_their_day(client):
+    ingest(client, "INR 500 debited from A/C XXXX1234", "2025-03-01T09:00:00")
+    for _ in range(2):
+        client.get("/api/v1/digest", params={"date_filter": "2025-03-01"})
+        client.get("/api/v1/messages", params={"date_filter": "2025-03-01", "limit": 1})
+    assert read_cache.stats()["hits"] == 2
+
+    ingest(client, "INR 75 debited from A/C XXXX1234", "2025-03-02T10:00:00")
+    paged = client.get("/api/v1/messages", params={"date_filter": "2025-03-01", "limit": 1})
+    client.get("/api/v1/digest", params={"date_filter": "2025-03-01"})
+    assert read_cache.stats()["hits"] == 4
+    # Headers computed with the body are replayed on hits
+    assert "X-Next-Cursor" in paged.headers
+
+
+def test_entries_are_bounded_by_bytes():
+    cache = ReadCache(enabled=True, max_entries=10, max_bytes=10)
+    version = cache.version()
+    cache.store("a", version, b"123456")
+    cache.store("b", version, b"7890")
+    cache.store("c", version, b"abcdef")  # evicts a
+    cache.store("d", version, b"x" * 11)  # larger than the whole cache, not kept
+    assert (cache.get("a", version), len(cache), cache.stats()["bytes"]) == (None, 2, 10)
+
+    cache.bump([date(2025, 3, 1)], include_global=False)
+    assert cache.get("b", cache.version()) is not None
+    assert cache.version(date(2025, 3, 1))[0] > cache.version(date(2025, 3, 2))[0]
+
+
+def test_last_modified_is_only_sent_once_its_second_is_over(monkeypatch):
+    now = [1000.2]
+    monkeypatch.setattr(read_cache_module.time, "time", lambda: now[0])
+    cache = ReadCache(enabled=True, max_entries=10, max_bytes=1000)
+    body = iter([b"[1]", b"[1,2]"])
+
+    def get(headers=None):
+        request = Request({"type": "http", "method": "GET", "path": "/m", "query_string": b"",
+                           "headers": [(k.lower().encode(), v.encode()) for k, v in (headers or {}).items()]})
+        return cache.serve(request, lambda: (next(body), {}))
+
+    cache.bump([])
+    assert "Last-Modified" not in get().headers  # still the second of the write
+
+    now[0] = 1001.0
+    dated = get()
+    modified = dated.headers["Last-Modified"]
+    assert get({"If-Modified-Since": modified}).status_code == 304
+
+    # A later write can no longer share the advertised second
+    now[0] = 1001.3
+    cache.bump([])
+    changed = get({"If-Modified-Since": modified})
+    assert (changed.status_code, changed.body) == (200, b"[1,2]")
+    assert "Last-Modified" not in changed.headers
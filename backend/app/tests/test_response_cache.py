@@ -0,0 +1,39 @@
+import time
+from app.services.response_cache import ResponseCache, normalize_query
+
+
+def test_normalize_query_collapses_near_identical_questions():
+    assert normalize_query("How many OTPs today?") == normalize_query("  how many otps   today ")
+
+
+def test_lru_eviction_and_stats():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    assert cache.get("a") == "1"
+    cache.set("c", "3")  # evicts b, the least recently used
+
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 2)
+
+
+def test_byte_bound_and_ttl():
+    cache = ResponseCache(max_bytes=10, ttl=0.05)
+    cache.set("k1", "xxxx")
+    cache.set("k2", "yyyy")  # 12 bytes total, so k1 is evicted
+    assert cache.get("k1") is None
+    assert cache.stats()['bytes'] <= 10
+
+    time.sleep(0.06)
+    assert cache.get("k2") is None
+
+
+def test_disk_backing_survives_restart(tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(path=path).set("query|how many otps|3:1:3", "You have 2 OTPs")
+
+    restarted = ResponseCache(path=path)
+    assert restarted.get("query|how many otps|3:1:3") == "You have 2 OTPs"
+    assert restarted.stats()['disk_hits'] == 1
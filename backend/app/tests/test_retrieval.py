@@ -0,0 +1,39 @@
+from datetime import datetime, timedelta
+from app.services.retrieval import RetrievalIndex
+
+
+def test_search_ranks_relevant_messages_first():
+    index = RetrievalIndex()
+    now = datetime(2025, 1, 10, 12, 0)
+    index.add(1, "IRCTC", "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC.", now)
+    index.add(2, "OTPVERIFY", "Your OTP is 482913 for login. Do not share.", now)
+    index.add(3, "ZOMATO", "ZOMATO: Flat 60% OFF this weekend. Use code ZM60.", now + timedelta(hours=1))
+
+    assert index.search("what's my PNR", limit=1) == [1]
+    # Broad questions fall back to the newest messages
+    assert index.search("summarize", limit=2) == [3, 2]
+
+
+def test_search_respects_window_and_token_budget():
+    index = RetrievalIndex()
+    day = datetime(2025, 1, 10)
+    for i in range(1, 11):
+        index.add(i, "HDFC-BANK", f"INR {i}00 debited from A/C XXXX1234 at store {i}", day + timedelta(days=i % 2))
+
+    in_window = index.search("debited", start=day, end=day + timedelta(hours=23), limit=20)
+    assert sorted(in_window) == [2, 4, 6, 8, 10]
+    assert len(index.search("debited", limit=20, token_budget=60)) < 5
+
+
+def test_query_sources_are_retrieved_context(client):
+    for i in range(30):
+        client.post("/api/v1/sms", json={"sender": "Rahul", "body": f"Dinner at 8? ({i})"})
+    pnr = client.post("/api/v1/sms", json={
+        "sender": "IRCTC", "body": "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC."
+    }).json()["message_id"]
+
+    response = client.post("/api/v1/query", json={"query": "What is my PNR?"})
+    assert response.status_code == 200
+    sources = response.json()["sources"]
+    assert sources[0] == pnr
+    assert len(sources) <= 20
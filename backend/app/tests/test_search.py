@@ -0,0 +1,68 @@
+from sqlalchemy.orm import Session
+from app.models.sms_model import SMS
+from app.services import search as search_service
+
+
+def post(client, sender, body, timestamp=None):
+    payload = {"sender": sender, "body": body}
+    if timestamp:
+        payload["timestamp"] = timestamp
+    return client.post("/api/v1/sms", json=payload).json()["message_id"]
+
+
+def test_search_ranks_and_highlights(client):
+    post(client, "Rahul", "Dinner at 8? Shall I book a table?")
+    pnr = post(client, "IRCTC", "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC.")
+
+    body = client.get("/api/v1/search", params={"q": "PNR 6512347890"}).json()
+    assert [r["id"] for r in body["results"]] == [pnr]
+    assert "[6512347890]" in body["results"][0]["snippet"]
+    assert body["has_more"] is False
+
+
+def test_search_filters_and_pagination(client):
+    for i in range(5):
+        post(client, "HDFC-BANK", f"INR {i}00 debited from A/C XXXX1234", f"2025-01-0{i + 1}T10:00:00")
+    post(client, "SBI-BANK", "Rs.2500 debited on your Credit Card", "2025-01-03T10:00:00")
+
+    by_sender = client.get("/api/v1/search", params={"q": "debited", "sender": "SBI-BANK"}).json()
+    assert [r["sender"] for r in by_sender["results"]] == ["SBI-BANK"]
+
+    in_range = client.get("/api/v1/search", params={
+        "q": "debited", "date_from": "2025-01-02", "date_to": "2025-01-03"
+    }).json()
+    assert len(in_range["results"]) == 3
+
+    first = client.get("/api/v1/search", params={"q": "debited", "limit": 4}).json()
+    second = client.get("/api/v1/search", params={"q": "debited", "limit": 4, "offset": 4}).json()
+    assert first["has_more"] and not second["has_more"]
+    assert len({r["id"] for r in first["results"] + second["results"]}) == 6
+
+
+def test_search_tracks_updates_and_deletes(client, session_factory):
+    sms_id = post(client, "Mom", "Please pick up milk on your way.")
+    db: Session = session_factory()
+    sms = db.get(SMS, sms_id)
+    sms.body = "Please pick up bread on your way."
+    db.commit()
+    assert client.get("/api/v1/search", params={"q": "milk"}).json()["results"] == []
+    assert len(client.get("/api/v1/search", params={"q": "bread"}).json()["results"]) == 1
+
+    db.delete(sms)
+    db.commit()
+    db.close()
+    assert client.get("/api/v1/search", params={"q": "bread"}).json()["results"] == []
+
+
+def test_search_like_fallback(client, monkeypatch):
+    post(client, "IRCTC", "IRCTC: PNR 6512347890 CONFIRMED.")
+    monkeypatch.setattr(search_service, "fts_available", lambda db: False)
+
+    result = client.get("/api/v1/search", params={"q": "pnr"}).json()["results"]
+    assert len(result) == 1 and result[0]["rank"] is None
+
+    # "_" in a term is a literal underscore, not a LIKE wildcard
+    post(client, "HDFC-BANK", "Ref a_b1 processed")
+    post(client, "HDFC-BANK", "Ref aXb1 processed")
+    matches = client.get("/api/v1/search", params={"q": "a_b1"}).json()["results"]
+    assert [m["snippet"] for m in matches] == ["Ref a_b1 processed"]
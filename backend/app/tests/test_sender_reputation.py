@@ -0,0 +1,165 @@
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models.sms_model import SMS, SenderStats
+from app.services.sender_reputation import SenderReputationStore, sender_reputation
+from app.services.sms_processor import SMSProcessor
+
+BASE = datetime(2025, 3, 1, 9, 0)
+LINK_BODY = "HDFC BANK: Statement for A/C XX1234 is ready https://hdfcbank.com/s/abc"
+PHISHING_BODY = "Dear customer, your account will be blocked. Verify now: http://bit.ly/verify-acc"
+
+
+def post(client, sender, body, minutes):
+    response = client.post("/api/v1/sms", json={
+        "sender": sender, "body": body, "timestamp": (BASE + timedelta(minutes=minutes)).isoformat(),
+    })
+    assert response.status_code == 200
+    return response.json()
+
+
+def ingest(store, session_factory, rows):
+    db = session_factory()
+    try:
+        store.record(db, rows)
+        db.commit()
+        store.refresh(db, rows)
+    finally:
+        db.close()
+
+
+def history_store(session_factory, sender, count, threats=0):
+    store = SenderReputationStore(max_entries=10, min_messages=5, max_threat_rate=0.0)
+    ingest(store, session_factory, [
+        {'sender': sender, 'category': 'finance', 'is_threat': i < threats, 'timestamp': BASE,
+         'threat_reason': "Requests money transfer or urgent payment" if i < threats else None}
+        for i in range(count)
+    ])
+    return store
+
+
+def test_ingest_builds_reputation_and_endpoints_expose_it(client):
+    for i in range(3):
+        post(client, "HDFC-BANK", "INR 500 debited from A/C XX1234", i)
+    post(client, "HDFC-BANK", "Upto 70% SALE live now!", 10)
+    post(client, "UNKNOWN", PHISHING_BODY, 5)
+
+    senders = client.get("/api/v1/senders").json()
+    assert [s["sender"] for s in senders] == ["HDFC-BANK", "UNKNOWN"]
+    hdfc = senders[0]
+    assert hdfc["message_count"] == 4
+    assert hdfc["categories"] == {"finance": 3, "offers": 1}
+    assert hdfc["first_seen"] == BASE.isoformat()
+    assert hdfc["last_seen"] == (BASE + timedelta(minutes=10)).isoformat()
+
+    assert client.get("/api/v1/senders", params={"sort": "threats"}).json()[0]["sender"] == "UNKNOWN"
+    unknown = client.get("/api/v1/senders/UNKNOWN").json()
+    assert unknown["threat_count"] == 1 and unknown["threat_rate"] == 1.0
+    assert client.get("/api/v1/senders/NOBODY").status_code == 404
+
+    # Bulk ingest updates the same counters
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": "HDFC-BANK", "body": "INR 900 credited", "timestamp": (BASE + timedelta(hours=1)).isoformat()},
+    ])
+    assert client.get("/api/v1/senders/HDFC-BANK").json()["message_count"] == 5
+    assert sender_reputation.lookup("HDFC-BANK").message_count == 5
+
+
+def test_trusted_sender_links_are_not_flagged(client):
+    # A clean history earns trust: plain links stop counting
+    for i in range(sender_reputation.min_messages):
+        assert post(client, "HDFCBK", "INR 500 debited from A/C XX1234", i)["is_threat"] is False
+    assert client.get("/api/v1/senders/HDFCBK").json()["status"] == "trusted"
+    assert post(client, "HDFCBK", LINK_BODY, 100)["is_threat"] is False
+
+    # Strong signals still count, and each one erodes the trust
+    phishing = post(client, "HDFCBK", PHISHING_BODY, 101)
+    assert phishing["is_threat"] is True
+    assert client.get("/api/v1/senders/HDFCBK").json()["status"] == "established"
+    assert post(client, "HDFCBK", LINK_BODY, 102)["is_threat"] is True
+
+
+def test_short_code_bank_sending_plain_links_earns_trust(client):
+    # Flagged for its links and sender ID while new, but neither counts against trust
+    results = [post(client, "AX-HDFCBK", LINK_BODY, i) for i in range(sender_reputation.min_messages)]
+    assert all(result["is_threat"] for result in results)
+    bank = client.get("/api/v1/senders/AX-HDFCBK").json()
+    assert (bank["threat_rate"], bank["status"]) == (1.0, "trusted")
+    assert post(client, "AX-HDFCBK", LINK_BODY, 100)["is_threat"] is False
+
+
+def test_flagged_sender_stays_on_full_rules(client):
+    results = [post(client, "AB-SCAM", PHISHING_BODY, i) for i in range(sender_reputation.min_messages + 5)]
+    assert all(result["is_threat"] for result in results)
+    scam = client.get("/api/v1/senders/AB-SCAM").json()
+    assert (scam["threat_rate"], scam["status"]) == (1.0, "established")
+    assert post(client, "AB-SCAM", LINK_BODY, 100)["is_threat"] is True
+
+
+def test_processor_weights_by_reputation(session_factory):
+    # Enough history but a high threat rate: full rules
+    established = SMSProcessor(reputation=history_store(session_factory, "AX-HDFCBK", count=10, threats=3))
+    assert established.analyze("AX-HDFCBK", LINK_BODY)["threat_reason"] == (
+        "Contains suspicious shortened URL; Suspicious sender ID"
+    )
+
+    # A clean history drops plain links and the sender-ID pattern only
+    trusted = SMSProcessor(reputation=history_store(session_factory, "VM-ICICIB", count=10))
+    assert trusted.analyze("VM-ICICIB", LINK_BODY)["is_threat"] is False
+    result = trusted.analyze("VM-ICICIB", "Update KYC: http://bit.ly/x")
+    assert result["threat_reason"] == (
+        "Contains suspicious shortened URL; Possible account impersonation or phishing"
+    )
+    spoofed = trusted.analyze("VM-ICICIB", "Your account suspended http://bit.ly/x urgent payment money")
+    assert spoofed["is_threat"] is True
+    assert "Requests money transfer or urgent payment" in spoofed["threat_reason"]
+
+    # Too little history: rules only
+    new = SMSProcessor(reputation=history_store(session_factory, "JD-SBIBNK", count=2))
+    assert new.analyze("JD-SBIBNK", LINK_BODY)["threat_reason"] == (
+        "Contains suspicious shortened URL; Suspicious sender ID"
+    )
+
+
+def test_cache_is_bounded_lru(session_factory):
+    store = SenderReputationStore(max_entries=2, min_messages=5, max_threat_rate=0.0)
+    row = lambda sender: {'sender': sender, 'category': 'finance', 'is_threat': False, 'timestamp': BASE}
+    ingest(store, session_factory, [row("A"), row("B")])
+    store.lookup("A")
+    ingest(store, session_factory, [row("C")])
+    assert len(store) == 2
+    assert store.lookup("B") is None
+    assert store.lookup("A") is not None and store.lookup("C") is not None
+
+
+def test_rebuild_and_warm_from_sms_table(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([
+            SMS(sender="IRCTC", body="PNR confirmed", timestamp=BASE, category="travel", is_threat=False),
+            SMS(sender="IRCTC", body="Train late", timestamp=BASE + timedelta(days=1), category="travel", is_threat=False),
+            SMS(sender="CARE", body="Pay now", timestamp=BASE, category="finance", is_threat=True,
+                threat_reason="Requests money transfer or urgent payment"),
+            SMS(sender="CARE", body="Bill http://care.in/b", timestamp=BASE, category="finance", is_threat=True,
+                threat_reason="Contains suspicious shortened URL", urls=["http://care.in/b"]),
+            SMS(sender="CARE", body="Pay http://bit.ly/x", timestamp=BASE, category="finance", is_threat=True,
+                threat_reason="Contains suspicious shortened URL", urls=["http://BIT.ly/x"]),
+        ])
+        db.commit()
+        store = SenderReputationStore(max_entries=10, min_messages=5, max_threat_rate=0.0)
+        assert store.ensure_backfilled(db) is True
+        assert store.ensure_backfilled(db) is False
+        assert store.warm(db) == 2
+
+        irctc = store.lookup("IRCTC")
+        assert irctc.message_count == 2
+        assert irctc.last_seen == BASE + timedelta(days=1)
+        care = store.lookup("CARE")
+        assert (care.threat_count, care.strong_threat_count) == (3, 2)
+
+        # Stats written before strong threats were counted are rebuilt once
+        db.execute(update(SenderStats).values(strong_threat_count=None))
+        db.commit()
+        assert store.ensure_backfilled(db) is True
+        assert store.ensure_backfilled(db) is False
+    finally:
+        db.close()
@@ -0,0 +1,110 @@
+import re
+import pytest
+from app.services.sms_processor import SMSProcessor, sms_processor
+
+SAMPLES = [
+    ("Rahul", "Hey, reached safely. Call me when free."),
+    ("Mom", "EMI reminder came, please check once."),
+    ("HR-Acme", "Your profile shortlisted. Zoom link: https://zoom.us/j/9345123456 Passcode: 927351"),
+    ("HR-Stark", "Reminder: Tech interview at 3 PM. JD attached. Meet: https://meet.google.com/qwe-rtas-yui"),
+    ("HDFC-BANK", "HDFC BANK: INR 5000 debited from A/C XXXX1234. Avl Bal INR 45,000. If not you, call 1800-xxx."),
+    ("SBI-BANK", "SBI: Rs.2500 spent on your Credit Card at AMAZON. SMS BLOCK if not done by you."),
+    ("KOTAK", "UPI: Rs.799 paid to ZOMATO via UPI Ref 123456789012"),
+    ("OTPVERIFY", "Your OTP is 482913 for login. Do not share."),
+    ("PAYTM-OTP", "OTP 663920 for transaction of Rs.2500. Valid for 10 mins."),
+    ("GMAIL-VERIF", "Verification code: 560091"),
+    ("ZOMATO", "ZOMATO: Flat 60% OFF this weekend. Use code ZM60."),
+    ("MYNTRA", "MYNTRA: Upto 70% SALE live now!"),
+    ("IRCTC", "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC."),
+    ("AMAZN", "AMAZON: Your order #171-123 delivered. Rate your experience."),
+    ("UNKNOWN", "Dear customer, your account will be blocked. Verify now: http://bit.ly/verify-acc"),
+    ("NOTICE", "URGENT: KYC expired. Update details at http://tinyurl.com/kyc-update"),
+    ("CARE", "Your package is on hold. Pay 49 to release: http://scam.example/pay http://goo.gl/x"),
+    ("AX-SCAM", "Urgent: send money immediately to claim your reward"),
+    ("9876543210", "Click this link to verify your account"),
+    ("INFO", ""),
+]
+
+
+def _reference_process(sender, body):
+    """Uncompiled per-call implementation the engine must stay equivalent to"""
+    p = SMSProcessor
+    body_lower = body.lower()
+
+    category = None
+    for pattern in p.CATEGORY_KEYWORDS['otp']:
+        if re.search(pattern, body_lower, re.IGNORECASE):
+            category = 'otp'
+            break
+    if category is None:
+        scores = {}
+        for cat, patterns in p.CATEGORY_KEYWORDS.items():
+            if cat == 'otp':
+                continue
+            score = sum(1 for pattern in patterns if re.search(pattern, body_lower, re.IGNORECASE))
+            if score > 0:
+                scores[cat] = score
+        category = max(scores, key=scores.get) if scores else 'promotional'
+
+    urls = re.findall(p.URL_PATTERN, body)
+    reasons = []
+    for url in urls:
+        for pattern in p.THREAT_PATTERNS['suspicious_links']:
+            if re.search(pattern, url, re.IGNORECASE):
+                reasons.append("Contains suspicious shortened URL")
+                break
+    money = any(re.search(pt, body_lower, re.IGNORECASE) for pt in p.THREAT_PATTERNS['money_request'])
+    if money:
+        reasons.append("Requests money transfer or urgent payment")
+    if any(re.search(pt, body_lower, re.IGNORECASE) for pt in p.THREAT_PATTERNS['impersonation']):
+        reasons.append("Possible account impersonation or phishing")
+    if any(re.match(pt, sender) for pt in p.SUSPICIOUS_SENDERS):
+        reasons.append("Suspicious sender ID")
+
+    return {
+        'category': category,
+        'is_threat': bool(reasons),
+        'threat_reason': "; ".join(reasons) if reasons else None,
+        'urls': urls or None,
+        'has_money_request': money,
+        'has_otp': any(re.search(pt, body_lower, re.IGNORECASE) for pt in p.CATEGORY_KEYWORDS['otp']),
+    }
+
+
+@pytest.mark.parametrize("sender,body", SAMPLES)
+def test_process_message_matches_reference(sender, body):
+    processed = sms_processor.process_message(sender, body)
+    expected = _reference_process(sender, body)
+    for key, value in expected.items():
+        assert processed[key] == value, key
+
+
+@pytest.mark.parametrize("sender,body", SAMPLES)
+def test_public_helpers_agree_with_analyze(sender, body):
+    result = sms_processor.analyze(sender, body)
+    assert sms_processor.classify(body) == result['category']
+    assert sms_processor.extract_urls(body) == result['urls']
+    assert sms_processor.detect_threat(sender, body) == (result['is_threat'], result['threat_reason'])
+    assert sms_processor.has_money_request(body) == result['has_money_request']
+    assert sms_processor.has_otp(body) == result['has_otp']
+
+
+def test_process_many_matches_process_message():
+    batch = [(sender, body, None) for sender, body in SAMPLES] * 3
+    results = sms_processor.process_many(batch)
+    assert len(results) == len(batch)
+    for (sender, body, _), processed in zip(batch, results):
+        expected = sms_processor.process_message(sender, body)
+        for key in expected:
+            if key != 'timestamp':
+                assert processed[key] == expected[key], key
+
+
+def test_process_many_process_pool():
+    processor = SMSProcessor()
+    processor.PARALLEL_MIN_BODIES = 1
+    batch = [(sender, f"{body} #{i}", None) for i in range(4) for sender, body in SAMPLES]
+    pooled = processor.process_many(batch, workers=2)
+    serial = processor.process_many(batch, workers=0)
+    strip = lambda rows: [{k: v for k, v in r.items() if k != 'timestamp'} for r in rows]
+    assert strip(pooled) == strip(serial)
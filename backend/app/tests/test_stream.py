@@ -0,0 +1,105 @@
+import asyncio
+import json
+import time
+import httpx
+from app.core.config import settings
+from app.services.event_bus import EventBus, event_bus
+
+
+async def read_events(app, query_string=b"", headers=(), count=1, timeout=5.0):
+    """Drive the SSE endpoint directly and return the first `count` events"""
+    disconnect = asyncio.Event()
+    events, buffer = [], ""
+
+    async def receive():
+        if not hasattr(receive, "sent"):
+            receive.sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await disconnect.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal buffer
+        if message["type"] != "http.response.body":
+            return
+        buffer += message.get("body", b"").decode()
+        while "\n\n" in buffer:
+            block, buffer = buffer.split("\n\n", 1)
+            fields = dict(line.split(": ", 1) for line in block.splitlines() if ": " in line and not line.startswith(":"))
+            if "event" in fields:
+                events.append(fields)
+        if len(events) >= count:
+            disconnect.set()
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/api/v1/stream", "raw_path": b"/api/v1/stream",
+        "query_string": query_string, "root_path": "", "server": ("test", 80), "client": ("test", 1),
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+    }
+    await asyncio.wait_for(app(scope, receive, send), timeout)
+    return events
+
+
+def test_stream_pushes_ingested_messages_and_resumes(api, monkeypatch):
+    monkeypatch.setattr(settings, "stream_keepalive_seconds", 0.05)
+
+    async def scenario():
+        reader = asyncio.create_task(read_events(api, count=3))
+        while event_bus.subscriber_count == 0:
+            await asyncio.sleep(0.01)
+
+        transport = httpx.ASGITransport(app=api)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            await ac.post("/api/v1/sms", json={
+                "sender": "UNKNOWN",
+                "body": "Dear customer, your account will be blocked. Verify now: http://bit.ly/x",
+            })
+        live = await reader
+
+        # Reconnect after the first event: the rest is replayed from history
+        replay = await read_events(api, headers=[("Last-Event-ID", live[0]["id"])], count=2)
+        return live, replay
+
+    live, replay = asyncio.run(scenario())
+
+    assert [e["event"] for e in live] == ["sms", "threat", "digest"]
+    assert json.loads(live[0]["data"])["sender"] == "UNKNOWN"
+    assert json.loads(live[2]["data"])["count_delta"] == 1
+    assert [e["id"] for e in replay] == [live[1]["id"], live[2]["id"]]
+
+
+def test_bus_overflow_and_lost_history():
+    bus = EventBus(history=2, queue_size=1)
+
+    async def scenario():
+        queue, backlog, lost = bus.subscribe()
+        for i in range(3):
+            bus.publish("sms", {"n": i})
+        await asyncio.sleep(0)
+        _, _, lost_after = bus.subscribe(last_event_id=0)
+        return queue, lost_after
+
+    queue, lost_after = asyncio.run(scenario())
+    assert queue.qsize() == 1  # overflow marker replaced the backlog
+    assert lost_after is True
+
+
+def test_ids_from_before_a_restart_count_as_lost():
+    before = EventBus()
+    old_ids = [before.publish("sms", {"n": i}) for i in range(5)]
+    time.sleep(0.01)  # more milliseconds than the old process published events
+    bus = EventBus()
+
+    async def scenario():
+        new_ids = [bus.publish("sms", {"n": i}) for i in range(10)]
+        current = bus.subscribe(last_event_id=new_ids[-1])
+        restarted = bus.subscribe(last_event_id=old_ids[2])
+        future = bus.subscribe(last_event_id=new_ids[-1] + 40)
+        return current[1:], restarted[1:], future[1:]
+
+    current, restarted, future = asyncio.run(scenario())
+    assert current == ([], False)
+    # The new process's own events are replayed, with a reset for what came before
+    assert (len(restarted[0]), restarted[1]) == (10, True)
+    assert future == ([], True)
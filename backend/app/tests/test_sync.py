@@ -0,0 +1,81 @@
+from datetime import datetime
+from app.models.sms_model import SMS
+from app.services import sync_log
+from app.services.retrieval import retrieval_index
+
+
+def ingest(client, body, timestamp, sender="HDFC-BANK"):
+    return client.post("/api/v1/sms", json={"sender": sender, "body": body, "timestamp": timestamp}).json()
+
+
+def test_sync_returns_only_changes_after_the_cursor(client):
+    first = ingest(client, "INR 500 debited from A/C XXXX1234", "2025-03-01T09:00:00")["message_id"]
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": "AXIS-BANK", "body": "INR 42 debited from A/C XXXX5555", "timestamp": "2025-03-01T10:00:00"},
+        {"sender": "OTPVERIFY", "body": "Your OTP is 482913 for login.", "timestamp": "2025-03-01T11:00:00"},
+    ])
+
+    full = client.get("/api/v1/sync").json()
+    assert [m["id"] for m in full["changes"]][0] == first
+    assert len(full["changes"]) == 3
+    assert set(full["changes"][0]) == {
+        "id", "sender", "body", "timestamp", "category", "is_threat",
+        "threat_reason", "urls", "has_money_request", "has_otp",
+    }
+    assert (full["deleted"], full["has_more"], full["reset"]) == ([], False, False)
+
+    assert client.get("/api/v1/sync", params={"since": full["cursor"]}).json()["changes"] == []
+    newer = ingest(client, "INR 75 debited from A/C XXXX1234", "2025-03-02T09:00:00")["message_id"]
+    delta = client.get("/api/v1/sync", params={"since": full["cursor"]}).json()
+    assert [m["id"] for m in delta["changes"]] == [newer]
+    assert delta["cursor"] > full["cursor"]
+
+
+def test_delete_leaves_a_tombstone_and_fixes_counters(client):
+    kept = ingest(client, "INR 500 debited from A/C XXXX1234", "2025-03-01T09:00:00")["message_id"]
+    gone = ingest(client, "Rs.250 paid to ZOMATO via UPI", "2025-03-01T10:00:00")["message_id"]
+    cursor = client.get("/api/v1/sync").json()["cursor"]
+
+    assert client.delete(f"/api/v1/messages/{gone}").json() == {"status": "deleted", "message_id": gone}
+    assert client.delete(f"/api/v1/messages/{gone}").status_code == 404
+
+    delta = client.get("/api/v1/sync", params={"since": cursor}).json()
+    assert (delta["changes"], delta["deleted"]) == ([], [gone])
+    # A fresh client never sees the deleted row, only its tombstone
+    full = client.get("/api/v1/sync").json()
+    assert ([m["id"] for m in full["changes"]], full["deleted"]) == ([kept], [gone])
+
+    assert client.get("/api/v1/digest", params={"date_filter": "2025-03-01"}).json()["total_messages"] == 1
+    assert client.get("/api/v1/senders/HDFC-BANK").json()["message_count"] == 1
+    assert client.get("/api/v1/entities", params={"kind": "merchant"}).json() == []
+    assert gone not in [m["id"] for m in client.get("/api/v1/messages").json()]
+    assert len(retrieval_index) == 1
+
+
+def test_paging_and_unknown_cursor(client):
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": "KOTAK", "body": f"Rs.{i}00 credited", "timestamp": f"2025-03-01T10:0{i}:00"} for i in range(5)
+    ])
+    seen, cursor = [], 0
+    while True:
+        page = client.get("/api/v1/sync", params={"since": cursor, "limit": 2}).json()
+        seen += [m["id"] for m in page["changes"]]
+        cursor = page["cursor"]
+        if not page["has_more"]:
+            break
+    assert len(seen) == len(set(seen)) == 5
+
+    reset = client.get("/api/v1/sync", params={"since": cursor + 100}).json()
+    assert (reset["reset"], reset["cursor"], reset["changes"]) == (True, 0, [])
+
+
+def test_backfill_logs_existing_rows_once(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([SMS(sender="KOTAK", body=f"Rs.{i} credited", timestamp=datetime(2025, 1, i)) for i in (1, 2)])
+        db.commit()
+        assert sync_log.backfill(db) == 2
+        assert sync_log.backfill(db) == 0
+        assert [m.body for m in sync_log.changes_since(db)["changes"]] == ["Rs.1 credited", "Rs.2 credited"]
+    finally:
+        db.close()
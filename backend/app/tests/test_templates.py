@@ -0,0 +1,119 @@
+import random
+import re
+from datetime import datetime
+from sqlalchemy import select, update
+from benchmarks.generator import POOLS
+from app.models.sms_model import SMS
+from app.services import templates
+from app.services.sms_processor import SMSProcessor, sms_processor
+
+
+def tid(body):
+    return templates.template_id(body)
+
+
+# Pairs that a coarser skeleton merged although the rules tell them apart
+COLLISIONS = [
+    ("INR 500 debited from A/C XXXX1234. Never share OTP", "INR 5000 debited from A/C XXXX1234. Never share OTP"),
+    ("Please pay rs500 now", "Please pay rs 500 now"),
+    ("Your code **12", "Your code **1234"),
+    ("otp 1234", "otp\n1234"),
+    ("flat <n> off", "flat 5 off"),
+    ("code 12٣45", "code 123٣4567"),
+]
+
+
+def scan_fields(scan):
+    return {key: scan[key] for key in ("category", "has_otp", "has_money_request", "body_reasons")}
+
+
+def test_skeleton_masks_only_digit_runs():
+    assert templates.skeleton("HDFC BANK: INR 5000 debited from A/C XXXX1234. Avl Bal INR 45,000.50") == (
+        "HDFC BANK: INR <code> debited from A/C XXXX<code>. Avl Bal INR <n>,<n>.<n>"
+    )
+    assert templates.skeleton("Your OTP is 482913 for login. Ref 12") == "Your OTP is <code> for login. Ref <n>"
+    assert templates.skeleton("a <n> b") == "a <<n> b"
+
+    assert tid("UPI: Rs.799 paid to ZOMATO") == tid("UPI: Rs.250 paid to ZOMATO")
+    assert tid("Join: https://zoom.us/j/111") == tid("Join: https://zoom.us/j/222")
+    for first, second in COLLISIONS:
+        assert tid(first) != tid(second)
+
+
+def test_memoized_scan_matches_a_fresh_scan():
+    rng = random.Random(7)
+
+    def variants(body):
+        # Same text with every digit run redrawn at a random length
+        for _ in range(5):
+            yield re.sub(r"[0-9]+", lambda m: "".join(rng.choice("0123456789") for _ in range(rng.randint(1, 8))), body)
+
+    bodies = [body for pool in POOLS.values() for body in pool.bodies]
+    bodies += [variant for body in list(bodies) for variant in variants(body)]
+    bodies += [body for pair in COLLISIONS for body in pair]
+
+    cached, reference = SMSProcessor(), SMSProcessor()
+    for body in bodies + bodies:
+        fresh = reference._analyze_body(body)
+        reference._body_reasons(fresh)
+        assert scan_fields(cached._scan(body)) == scan_fields(fresh), body
+    assert cached.templates.stats()["hits"] >= len(bodies)
+
+
+def test_processing_is_memoized_per_template():
+    processor = SMSProcessor()
+    first = processor.process_message("HDFC-BANK", "INR 5000 debited from A/C XXXX1234")
+    second = processor.process_message("HDFC-BANK", "INR 7300 debited from A/C XXXX9876")
+    assert first["template_id"] == second["template_id"]
+    assert processor.templates.stats()["hits"] == 1
+
+    records = processor.process_many([
+        ("OTPVERIFY", f"Your OTP is {code} for login. Do not share.", None) for code in (482913, 118244, 560091)
+    ])
+    assert len({r["template_id"] for r in records}) == 1
+    assert all(r["category"] == "otp" for r in records)
+    assert len(processor.templates) == 2
+
+    # URLs are per message even when the analysis comes from the cache
+    links = [processor.process_message("HR-Acme", f"Join: https://zoom.us/j/{n}") for n in (111, 222)]
+    assert [r["urls"] for r in links] == [["https://zoom.us/j/111"], ["https://zoom.us/j/222"]]
+
+
+def test_templates_endpoint_groups_messages(client):
+    for i, amount in enumerate((500, 120, 75)):
+        client.post("/api/v1/sms", json={
+            "sender": "HDFC-BANK", "body": f"INR {amount} debited from A/C XXXX1234",
+            "timestamp": f"2025-02-01T10:0{i}:00",
+        })
+    client.post("/api/v1/upload-csv", json=[
+        {"sender": "AXIS-BANK", "body": "INR 42 debited from A/C XXXX5555", "timestamp": "2025-02-01T11:00:00"},
+        {"sender": "OTPVERIFY", "body": "Your OTP is 482913 for login.", "timestamp": "2025-02-01T11:01:00"},
+    ])
+
+    groups = client.get("/api/v1/templates", params={"date_filter": "2025-02-01"}).json()
+    assert [(g["count"], g["senders"]) for g in groups] == [(4, 2), (1, 1)]
+    assert groups[0]["example"] == "INR 42 debited from A/C XXXX5555"
+    assert groups[0]["category"] == "finance"
+    assert client.get("/api/v1/templates", params={"category": "otp"}).json()[0]["count"] == 1
+    assert client.get("/api/v1/templates", params={"date_filter": "2025-03-01"}).json() == []
+
+
+def test_backfill_fingerprints_old_rows(session_factory):
+    db = session_factory()
+    try:
+        db.add_all([
+            SMS(sender="KOTAK", body="Rs.100 credited", timestamp=datetime(2025, 1, 1)),
+            SMS(sender="KOTAK", body="Rs.250 credited", timestamp=datetime(2025, 1, 2)),
+        ])
+        db.commit()
+        assert templates.backfill(db, batch_size=1) == 2
+        assert templates.backfill(db) == 0
+        assert set(db.execute(select(SMS.template_id)).scalars()) == {tid("Rs.100 credited")}
+
+        # Ids written by an older skeleton are all recomputed
+        db.execute(update(SMS).values(template_id="0123456789abcdef"))
+        db.commit()
+        assert templates.backfill(db) == 2
+        assert set(db.execute(select(SMS.template_id)).scalars()) == {tid("Rs.100 credited")}
+    finally:
+        db.close()
@@ -0,0 +1,176 @@
+"""Synthetic SMS traffic built from the load-more-sample-data.ps1 content pools
+
+Usage:
+    python -m benchmarks.generator --count 1000000 --format ndjson > messages.ndjson
+"""
+import argparse
+import csv
+import json
+import random
+import sys
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+NAMES = [
+    "Mom", "Dad", "Rahul", "Priya", "Sandeep", "Anita", "Karthik", "Neha", "Akash", "Vikram",
+    "Aisha", "Shreya", "Rohan", "Ishita", "Varun", "Arjun", "Deepa", "Kiran", "Sameer", "Meera",
+]
+
+PERSONAL_TEXTS = [
+    "Hey, reached safely. Call me when free.",
+    "Dinner at 8? Shall I book a table?",
+    "Where are you? I'm waiting downstairs.",
+    "Don't forget to bring the documents tomorrow.",
+    "Happy Birthday! Have an amazing day!",
+    "Traffic is crazy. Will be 15 mins late.",
+    "Sent you the photos on WhatsApp.",
+    "Meeting got postponed to Monday.",
+    "Doctor appointment confirmed for 5 PM.",
+    "Call me when you see this.",
+    "EMI reminder came, please check once.",
+    "Shall we go trekking next weekend?",
+    "Interview went well! Fingers crossed.",
+    "Please pick up milk on your way.",
+    "WiFi not working, can you restart router?",
+]
+
+INTERVIEW_TEXTS = [
+    "Interview scheduled for 11:30 AM tomorrow. Join: https://meet.google.com/abc-defg-hij",
+    "Your profile shortlisted. Zoom link: https://zoom.us/j/9345123456 Passcode: 927351",
+    "Coding round at 6 PM today. HackerRank link: https://www.hackerrank.com/test/xyz",
+    "HR from AcmeCorp: Please confirm availability for discussion. Teams: https://teams.microsoft.com/l/meetup-join/19%3ameeting",
+    "Reminder: Tech interview at 3 PM. JD attached. Meet: https://meet.google.com/qwe-rtas-yui",
+]
+
+FINANCE_TEXTS = [
+    "HDFC BANK: INR 5000 debited from A/C XXXX1234. Avl Bal INR 45,000. If not you, call 1800-xxx.",
+    "SBI: Rs.2500 spent on your Credit Card at AMAZON. SMS BLOCK if not done by you.",
+    "PAYTM: Rs.1500 cashback credited. Wallet balance Rs.2500.",
+    "ICICI BANK: Salary Rs.62,500 credited to A/C ****8910. Avl bal Rs.1,24,300.",
+    "UPI: Rs.799 paid to ZOMATO via UPI Ref 123456789012",
+]
+
+OTP_TEXTS = [
+    "Your OTP is 482913 for login. Do not share.",
+    "Use 927351 as OTP to verify your number.",
+    "OTP 663920 for transaction of Rs.2500. Valid for 10 mins.",
+    "Do not share this code: 118244",
+    "Verification code: 560091",
+]
+
+OFFER_TEXTS = [
+    "FLIPKART: Big Billion Days! Up to 80% OFF on electronics. Shop now.",
+    "ZOMATO: Flat 60% OFF this weekend. Use code ZM60.",
+    "SWIGGY: 50% OFF on your next order. Use code SAVE50.",
+    "MYNTRA: Upto 70% SALE live now!",
+    "AJIO: Flat Rs.500 OFF on Rs.1999+ | Code AJ500",
+]
+
+TRAVEL_TEXTS = [
+    "IRCTC: PNR 6512347890 CONFIRMED. Train departs 18:40 from SBC.",
+    "MakeMyTrip: Flight 6E-123 to DEL at 07:15, Web check-in open.",
+    "GOIBIBO: Hotel booking CONFIRMED, Check-in 2 PM today.",
+    "Uber: Your ride with Ravi arrives in 3 mins.",
+    "RedBus: Boarding point updated. Bus at 10:20 PM.",
+]
+
+TRANSACTIONAL_TEXTS = [
+    "AMAZON: Your order #171-123 delivered. Rate your experience.",
+    "FLIPKART: Order dispatched. Tracking ID: FK123456789.",
+    "SWIGGY: Order confirmed. Arriving in 26 mins.",
+    "ZOMATO: Delivery partner picked up your order.",
+    "NYKAA: Order packed and ready to ship.",
+]
+
+THREAT_TEXTS = [
+    "Dear customer, your account will be blocked. Verify now: http://bit.ly/verify-acc",
+    "URGENT: KYC expired. Update details at http://tinyurl.com/kyc-update",
+    "Your package is on hold. Pay 49 to release: http://scam.example/pay",
+    "Bank Notice: Suspicious login. Click to secure: https://short.ly/secure",
+    "ATM card blocked. Reactivate here: http://goo.gl/r3activ8",
+]
+
+HR_SENDERS = ["HR-" + company for company in ("Acme", "Innotech", "Globex", "Soylent", "Umbrella", "Stark", "Wayne")]
+
+
+class Pool(NamedTuple):
+    weight: int  # messages per 100, as in the PowerShell script
+    senders: Sequence[str]
+    bodies: Sequence[str]
+    hours: Tuple[int, int]  # Get-Random -Minimum/-Maximum (upper bound exclusive)
+
+
+POOLS: Dict[str, Pool] = {
+    "personal": Pool(27, NAMES, PERSONAL_TEXTS, (8, 22)),
+    "interview": Pool(12, HR_SENDERS, INTERVIEW_TEXTS, (9, 20)),
+    "finance": Pool(18, ["HDFC-BANK", "SBI-BANK", "ICICI-BANK", "AXIS-BANK", "KOTAK"], FINANCE_TEXTS, (0, 23)),
+    "otp": Pool(8, ["OTPVERIFY", "AMAZN-OTP", "PAYTM-OTP", "GMAIL-VERIF"], OTP_TEXTS, (0, 23)),
+    "offers": Pool(12, ["FLIPKART", "ZOMATO", "SWIGGY", "MYNTRA", "AJIO", "NYKAA"], OFFER_TEXTS, (8, 22)),
+    "travel": Pool(8, ["IRCTC", "MAKEMYTRIP", "GOIBIBO", "UBER", "REDBUS"], TRAVEL_TEXTS, (5, 23)),
+    "transactional": Pool(10, ["AMAZN", "FLIPKART", "SWIGGY", "ZOMATO", "NYKAA"], TRANSACTIONAL_TEXTS, (7, 23)),
+    "threat": Pool(5, ["UNKNOWN", "INFO", "NOTICE", "CARE", "SERVICE"], THREAT_TEXTS, (0, 23)),
+}
+
+
+def generate_messages(
+    count: int,
+    start: Optional[date] = None,
+    days: int = 1,
+    seed: int = 42,
+) -> Iterator[Dict]:
+    """Yield `count` messages spread over `days` days starting at `start` (default today)
+
+    The pool mix and hour ranges follow the PowerShell script. Output is
+    deterministic for a given seed, and every message gets a distinct
+    microsecond so the content-hash dedup never collapses generated rows.
+    Messages are produced lazily, so millions can be streamed.
+    """
+    rng = random.Random(seed)
+    start = start or date.today()
+    pools = list(POOLS.values())
+    weights = [pool.weight for pool in pools]
+
+    for i in range(count):
+        pool = rng.choices(pools, weights)[0]
+        day = start + timedelta(days=rng.randrange(days))
+        timestamp = datetime(
+            day.year, day.month, day.day,
+            rng.randrange(*pool.hours), rng.randrange(59), rng.randrange(60), i % 1_000_000,
+        )
+        yield {
+            "sender": rng.choice(pool.senders),
+            "body": rng.choice(pool.bodies),
+            "timestamp": timestamp,
+        }
+
+
+def to_ndjson(messages: Iterator[Dict]) -> Iterator[str]:
+    for message in messages:
+        yield json.dumps({**message, "timestamp": message["timestamp"].isoformat()}) + "\n"
+
+
+def write_csv(messages: Iterator[Dict], out) -> None:
+    writer = csv.writer(out)
+    writer.writerow(["sender", "body", "timestamp"])
+    for message in messages:
+        writer.writerow([message["sender"], message["body"], message["timestamp"].isoformat()])
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Generate synthetic SMS traffic")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--start", type=date.fromisoformat, help="First day (YYYY-MM-DD), default today")
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--format", choices=["ndjson", "csv"], default="ndjson")
+    args = parser.parse_args(argv)
+
+    messages = generate_messages(args.count, args.start, args.days, args.seed)
+    if args.format == "csv":
+        write_csv(messages, sys.stdout)
+    else:
+        sys.stdout.writelines(to_ndjson(messages))
+
+
+if __name__ == "__main__":
+    main()
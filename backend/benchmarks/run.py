@@ -0,0 +1,357 @@
+"""Micro-benchmarks and end-to-end load runs for the backend hot paths
+
+The end-to-end runs drive the ASGI app in-process against a throwaway
+SQLite database, with the LLM pointed at a local stub server, and write
+everything to one JSON file. Pass a previous file as --baseline to fail
+on regressions.
+
+Usage (from backend/):
+    python -m benchmarks.run --output results.json
+    python -m benchmarks.run --baseline last-release.json --tolerance 0.25
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import logging
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from pydantic import TypeAdapter
+from sqlalchemy import insert, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import build_engine, get_db, init_db
+from app.main import app
+from app.models.sms_model import SMS
+from app.schemas.sms import SMSResponse
+from app.services.llm_client import llm_client
+from app.services.model_health import ModelHealthTracker
+from app.services.read_cache import render_json, render_rows
+from app.services.response_cache import ResponseCache
+from app.services.retrieval import retrieval_index
+from app.services.sender_reputation import sender_reputation
+from app.services.sms_processor import sms_processor
+from app.tests.stub_openrouter import StubOpenRouter
+from benchmarks.generator import generate_messages, to_ndjson
+
+QUERIES = [
+    "how many otps did I get",
+    "show bank transactions",
+    "any suspicious messages",
+    "what interviews are scheduled",
+    "summarize my offers",
+    "did my salary get credited",
+    "which orders were delivered",
+    "travel bookings this week",
+]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize_latencies(latencies: List[float], elapsed: float, errors: int = 0, items: Optional[int] = None) -> Dict:
+    ordered = sorted(latencies)
+    ms = lambda seconds: round(seconds * 1000, 3)
+    result = {
+        'requests': len(latencies),
+        'errors': errors,
+        'elapsed_s': round(elapsed, 4),
+        'ops_per_sec': round((items or len(latencies)) / elapsed, 1) if elapsed else 0.0,
+        'latency_ms': {
+            'mean': ms(sum(ordered) / len(ordered)) if ordered else 0.0,
+            'p50': ms(percentile(ordered, 50)),
+            'p95': ms(percentile(ordered, 95)),
+            'p99': ms(percentile(ordered, 99)),
+            'max': ms(ordered[-1]) if ordered else 0.0,
+        },
+    }
+    if items is not None:
+        result['items'] = items
+    return result
+
+
+def time_best(fn: Callable[[], object], calls: int, repeat: int) -> Dict:
+    """Best-of-`repeat` timing of `calls` invocations"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        best = min(best, time.perf_counter() - started)
+    return {
+        'calls': calls,
+        'repeat': repeat,
+        'best_s': round(best, 6),
+        'us_per_call': round(best / calls * 1e6, 3),
+        'ops_per_sec': round(calls / best, 1),
+    }
+
+
+# Micro-benchmarks
+
+def run_micro(count: int, repeat: int) -> Dict:
+    raw = list(generate_messages(count))
+    records = [sms_processor.process_message(m['sender'], m['body'], m['timestamp']) for m in raw]
+    messages = [SMS(id=i + 1, **record) for i, record in enumerate(records)]
+    day = date.today().isoformat()
+
+    iterator = iter(())
+
+    def next_message():
+        nonlocal iterator
+        message = next(iterator, None)
+        if message is None:
+            iterator = iter(raw)
+            message = next(iterator)
+        sms_processor.process_message(message['sender'], message['body'], message['timestamp'])
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = {
+            'process_message': time_best(next_message, count, repeat),
+            'process_many': {
+                **time_best(lambda: sms_processor.process_many(
+                    (m['sender'], m['body'], m['timestamp']) for m in raw
+                ), 1, repeat),
+                'messages': count,
+            },
+            'generate_digest': {
+                **time_best(lambda: sms_processor.generate_digest(messages, day), 1, repeat),
+                'messages': count,
+            },
+            'prepare_context': time_best(lambda: llm_client._prepare_context(messages), 1000, repeat),
+        }
+    results['process_many']['messages_per_sec'] = round(count / results['process_many']['best_s'], 1)
+    results['generate_digest']['messages_per_sec'] = round(count / results['generate_digest']['best_s'], 1)
+    results.update(run_message_rendering(records, repeat))
+    return results
+
+
+def run_message_rendering(records: List[Dict], repeat: int) -> Dict:
+    """GET /messages body for every row: ORM + SMSResponse validation (before) vs Core tuples (after)"""
+    fields = list(SMSResponse.model_fields)
+    adapter = TypeAdapter(List[SMSResponse])
+    ordering = (SMS.timestamp.desc(), SMS.id.desc())
+
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'render.db'}")
+        init_db(engine)
+        columns = set(SMS.__table__.columns.keys())
+        with engine.begin() as conn:
+            conn.execute(insert(SMS), [{k: v for k, v in record.items() if k in columns} for record in records])
+        db = sessionmaker(bind=engine)()
+        try:
+            def orm():
+                messages = db.query(SMS).order_by(*ordering).all()
+                body = render_json(adapter.dump_python(adapter.validate_python(messages, from_attributes=True),
+                                                       mode="json"))
+                db.expunge_all()
+                return body
+
+            def core():
+                rows = db.execute(select(*[getattr(SMS, f) for f in fields]).order_by(*ordering)).all()
+                return render_rows(fields, rows)
+
+            results = {
+                'messages_orm': time_best(orm, 1, repeat),
+                'messages_core': time_best(core, 1, repeat),
+            }
+            identical = orm() == core()
+        finally:
+            db.close()
+            engine.dispose()
+
+    for result in results.values():
+        result['rows'] = len(records)
+        result['rows_per_sec'] = round(len(records) / result['best_s'], 1)
+    results['messages_core']['identical'] = identical
+    results['messages_core']['speedup'] = round(
+        results['messages_orm']['best_s'] / results['messages_core']['best_s'], 2
+    )
+    return results
+
+
+# End-to-end runs
+
+async def drive(client: httpx.AsyncClient, requests: List[Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]],
+                concurrency: int, items: Optional[int] = None) -> Dict:
+    """Issue `requests` with at most `concurrency` in flight; collect latencies"""
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies: List[float] = []
+    errors = 0
+
+    async def one(send):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            response = await send(client)
+            latencies.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(send) for send in requests))
+    return summarize_latencies(latencies, time.perf_counter() - started, errors, items)
+
+
+async def run_e2e_async(base_url: str, args) -> Dict:
+    today = date.today().isoformat()
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        posts = list(generate_messages(args.sms_requests, seed=args.seed + 1))
+        results['sms'] = await drive(client, [
+            (lambda c, m=m: c.post("/api/v1/sms", json={**m, "timestamp": m['timestamp'].isoformat()}))
+            for m in posts
+        ], args.concurrency)
+
+        body = "".join(to_ndjson(generate_messages(args.messages, seed=args.seed))).encode()
+        results['upload_csv'] = await drive(client, [
+            lambda c: c.post("/api/v1/upload-csv", content=body, headers={"Content-Type": "application/x-ndjson"})
+        ], 1, items=args.messages)
+
+        results['messages'] = await drive(client, [
+            (lambda c: c.get("/api/v1/messages", params={"limit": 100})) for _ in range(args.read_requests)
+        ], args.concurrency)
+        results['digest'] = await drive(client, [
+            (lambda c: c.get("/api/v1/digest", params={"date_filter": today})) for _ in range(args.read_requests)
+        ], args.concurrency)
+        # Distinct wording per request so the response cache does not answer
+        results['query'] = await drive(client, [
+            (lambda c, i=i: c.post("/api/v1/query", json={"query": f"{QUERIES[i % len(QUERIES)]} #{i}"}))
+            for i in range(args.query_requests)
+        ], args.concurrency)
+    await llm_client.aclose()
+    return results
+
+
+def run_e2e(args) -> Dict:
+    """Run every endpoint against a fresh database and a stub LLM"""
+    patched = ('enabled', 'api_key', 'base_url', 'models', 'cache', 'health')
+    saved = {name: getattr(llm_client, name) for name in patched}
+
+    with tempfile.TemporaryDirectory() as tmp, StubOpenRouter(default=(args.llm_delay, 200, "stub answer")) as stub:
+        engine = build_engine(f"sqlite:///{Path(tmp) / 'bench.db'}")
+        init_db(engine)
+        session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+        def override_get_db():
+            db = session_factory()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        retrieval_index.clear()
+        sender_reputation.clear()
+        llm_client.enabled = True
+        llm_client.api_key = "benchmark"
+        llm_client.base_url = stub.url
+        llm_client.models = llm_client.models[:1]
+        llm_client.cache = ResponseCache(ttl=0)
+        llm_client.health = ModelHealthTracker()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = asyncio.run(run_e2e_async("http://bench", args))
+            results['query']['llm_calls'] = len(stub.calls)
+            return results
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            retrieval_index.clear()
+            sender_reputation.clear()
+            for name, value in saved.items():
+                setattr(llm_client, name, value)
+            engine.dispose()
+
+
+# Reporting
+
+def environment() -> Dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'started_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+    }
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Regressions against a previous results file: throughput down or p95 latency up by > tolerance"""
+    regressions = []
+    for section in ('micro', 'e2e'):
+        for name, now in current.get(section, {}).items():
+            before = baseline.get(section, {}).get(name)
+            if not before:
+                continue
+            if before.get('ops_per_sec') and now['ops_per_sec'] < before['ops_per_sec'] * (1 - tolerance):
+                regressions.append(
+                    f"{section}.{name}: {now['ops_per_sec']} ops/s (baseline {before['ops_per_sec']})"
+                )
+            p95, base_p95 = now.get('latency_ms', {}).get('p95'), before.get('latency_ms', {}).get('p95')
+            if p95 and base_p95 and p95 > base_p95 * (1 + tolerance):
+                regressions.append(f"{section}.{name}: p95 {p95} ms (baseline {base_p95} ms)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the SmartSense Inbox backend")
+    parser.add_argument("--suite", choices=["all", "micro", "e2e"], default="all")
+    parser.add_argument("--micro-messages", type=int, default=10000, help="Messages for the micro-benchmarks")
+    parser.add_argument("--repeat", type=int, default=3, help="Micro-benchmark repetitions (best is kept)")
+    parser.add_argument("--messages", type=int, default=5000, help="Rows sent to /upload-csv")
+    parser.add_argument("--sms-requests", type=int, default=500, help="Single POST /sms requests")
+    parser.add_argument("--read-requests", type=int, default=200, help="GET /messages and /digest requests each")
+    parser.add_argument("--query-requests", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--llm-delay", type=float, default=0.05, help="Stub LLM response time in seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--baseline", help="Previous results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    # Per-request client logging would dominate the timings
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    results = {'environment': environment(), 'parameters': vars(args)}
+    if args.suite in ("all", "micro"):
+        results['micro'] = run_micro(args.micro_messages, args.repeat)
+    if args.suite in ("all", "e2e"):
+        results['e2e'] = run_e2e(args)
+
+    Path(args.output).write_text(json.dumps(results, indent=2))
+    for section in ('micro', 'e2e'):
+        for name, result in results.get(section, {}).items():
+            p95 = result.get('latency_ms', {}).get('p95')
+            print(f"{section:5} {name:16} {result['ops_per_sec']:>12} ops/s" + (f"  p95 {p95} ms" if p95 else ""))
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
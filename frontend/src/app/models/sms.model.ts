@@ -11,10 +11,20 @@ export interface Sms {
   has_otp: boolean;
 }
 
+// GET /sync: changes after a cursor, for the local (IndexedDB) copy
+export interface SyncResponse {
+  cursor: number;
+  changes: Sms[];
+  deleted: number[];
+  has_more: boolean;
+  reset: boolean;  // cursor unknown to the server; drop the copy and sync from 0
+}
+
 export interface CategoryDigest {
   category: string;
   count: number;
   summary: string;
+  stale?: boolean;  // only set for LLM summaries
 }
 
 export interface DigestResponse {
@@ -28,3 +38,30 @@ export interface QueryResponse {
   answer: string;
   sources?: number[];
 }
+
+// NDJSON events of POST /query/stream
+export type QueryStreamEvent =
+  | { event: 'sources'; sources: number[] }
+  | { event: 'start'; model: string | null }
+  | { event: 'delta'; text: string }
+  | { event: 'done'; source: 'llm' | 'cache' | 'fallback' | 'entities'; model: string | null; complete: boolean };
+
+export interface DigestDelta {
+  date: string;
+  category: string;
+  count_delta: number;
+  threat_delta: number;
+}
+
+export interface ThreatAlert {
+  id: number;
+  sender: string;
+  threat_reason?: string;
+  timestamp: string;
+}
+
+export type StreamEvent =
+  | { type: 'sms'; data: Sms }
+  | { type: 'digest'; data: DigestDelta }
+  | { type: 'threat'; data: ThreatAlert }
+  | { type: 'reset'; data: {} };
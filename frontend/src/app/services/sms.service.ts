@@ -1,7 +1,14 @@
 import { Injectable } from '@angular/core';
 import { HttpClient, HttpParams } from '@angular/common/http';
 import { Observable } from 'rxjs';
-import { Sms, DigestResponse, QueryResponse } from '../models/sms.model';
+import {
+  Sms,
+  DigestResponse,
+  QueryResponse,
+  QueryStreamEvent,
+  StreamEvent,
+  SyncResponse,
+} from '../models/sms.model';
 import { environment } from '../../environments/environment';
 
 @Injectable({
@@ -26,6 +33,14 @@ export class SmsService {
     return this.http.get<Sms[]>(`${this.apiUrl}/messages`, { params });
   }
 
+  // Delta sync: pass the cursor of the previous response, repeat while has_more
+  sync(since: number = 0, limit?: number): Observable<SyncResponse> {
+    let params = new HttpParams().set('since', since);
+    if (limit) params = params.set('limit', limit);
+
+    return this.http.get<SyncResponse>(`${this.apiUrl}/sync`, { params });
+  }
+
   // Get daily digest
   getDigest(dateFilter?: string): Observable<DigestResponse> {
     let params = new HttpParams();
@@ -34,6 +49,23 @@ export class SmsService {
     return this.http.get<DigestResponse>(`${this.apiUrl}/digest`, { params });
   }
 
+  // Live feed of new messages, digest deltas and threat alerts (SSE).
+  // EventSource reconnects on its own and resumes via Last-Event-ID.
+  stream(): Observable<StreamEvent> {
+    return new Observable<StreamEvent>((subscriber) => {
+      const source = new EventSource(`${this.apiUrl}/stream`);
+      const forward = (type: StreamEvent['type']) => (event: MessageEvent) =>
+        subscriber.next({ type, data: JSON.parse(event.data) } as StreamEvent);
+
+      source.addEventListener('sms', forward('sms'));
+      source.addEventListener('digest', forward('digest'));
+      source.addEventListener('threat', forward('threat'));
+      source.addEventListener('reset', forward('reset'));
+
+      return () => source.close();
+    });
+  }
+
   // Query messages with natural language
   queryMessages(query: string, date?: string): Observable<QueryResponse> {
     return this.http.post<QueryResponse>(`${this.apiUrl}/query`, {
@@ -42,6 +74,44 @@ export class SmsService {
     });
   }
 
+  // Streamed answer: emits events as tokens arrive (fetch, since EventSource cannot POST)
+  queryMessagesStream(query: string, date?: string): Observable<QueryStreamEvent> {
+    return new Observable<QueryStreamEvent>((subscriber) => {
+      const controller = new AbortController();
+
+      (async () => {
+        const response = await fetch(`${this.apiUrl}/query/stream`, {
+          method: 'POST',
+          headers: { 'Content-Type': 'application/json', Accept: 'application/x-ndjson' },
+          body: JSON.stringify({ query, date }),
+          signal: controller.signal,
+        });
+        if (!response.ok || !response.body) {
+          throw new Error(`Query failed with status ${response.status}`);
+        }
+
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffered = '';
+        while (true) {
+          const { done, value } = await reader.read();
+          if (done) break;
+          buffered += decoder.decode(value, { stream: true });
+          const lines = buffered.split('\n');
+          buffered = lines.pop() ?? '';
+          for (const line of lines) {
+            if (line.trim()) subscriber.next(JSON.parse(line));
+          }
+        }
+        subscriber.complete();
+      })().catch((error) => {
+        if (!controller.signal.aborted) subscriber.error(error);
+      });
+
+      return () => controller.abort();
+    });
+  }
+
   // Upload CSV (fallback method)
   uploadCSV(messages: any[]): Observable<any> {
     return this.http.post(`${this.apiUrl}/upload-csv`, messages);